@@ -0,0 +1,94 @@
+import asyncio
+import os
+import tempfile
+import time
+from typing import Awaitable, Callable
+
+import aiofiles
+from aiohttp import web
+from src.config import DOWNLOAD_CHUNK_SIZE
+from src.http_client import HttpClient, RequestKind
+from src.transfer import download_resumable
+
+#: Размеры скачиваемых архивов в мегабайтах.
+SIZES_MB = (16, 256)
+
+#: Количество замеров каждого способа, берётся лучший.
+REPEAT = 3
+
+Download = Callable[[HttpClient, str, str], Awaitable[None]]
+
+
+async def download_by_chunks(http: HttpClient, url: str, path: str) -> None:
+    """Прежнее скачивание: запись каждых 16 КБ через aiofiles."""
+    async with http.get(url, RequestKind.TRANSFER) as response:
+        response.raise_for_status()
+        async with aiofiles.open(path, "wb") as file:
+            while True:
+                content = await response.content.read(DOWNLOAD_CHUNK_SIZE)
+                if not content:
+                    break
+                await file.write(content)
+
+
+async def download_with_writer(http: HttpClient, url: str, path: str) -> None:
+    """Скачивание через `ArchiveWriter` в заранее выделенный файл."""
+    await download_resumable(http, url, path, "v1", segments=1)
+
+
+async def measure(download: Download, size: int, folder: str) -> float:
+    """Лучшее время скачивания архива с локального сервера в секундах."""
+    payload = os.urandom(1024 * 1024) * (size // (1024 * 1024))
+
+    async def handle(request: web.Request) -> web.Response:
+        return web.Response(body=payload, headers={"Accept-Ranges": "bytes"})
+
+    app = web.Application()
+    app.router.add_get("/archive.zip", handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    url = "http://127.0.0.1:%d/archive.zip" % runner.addresses[0][1]
+    path = os.path.join(folder, "archive.zip")
+    timings = []
+    try:
+        async with HttpClient() as http:
+            for _ in range(REPEAT):
+                started_at = time.perf_counter()
+                await download(http, url, path)
+                timings.append(time.perf_counter() - started_at)
+                assert os.path.getsize(path) == len(payload)
+                os.remove(path)
+    finally:
+        await runner.cleanup()
+    return min(timings)
+
+
+def main() -> None:
+    """Сравнение скорости записи скачиваемых архивов на диск.
+
+    Архивы отдаются локальным сервером, поэтому замеряется не сеть, а
+    чтение ответа и запись файла.
+
+    Запуск: `python -m benchmarks.archive_writer`.
+    """
+    print("%-10s %14s %14s %8s" % ("Размер", "16 КБ, МБ/с", "блоки, МБ/с", "x"))
+    with tempfile.TemporaryDirectory() as folder:
+        for size_mb in SIZES_MB:
+            size = size_mb * 1024 * 1024
+            chunks = asyncio.run(measure(download_by_chunks, size, folder))
+            writer = asyncio.run(measure(download_with_writer, size, folder))
+            print(
+                "%-10s %14.1f %14.1f %8.2f"
+                % (
+                    "%d МБ" % size_mb,
+                    size_mb / chunks,
+                    size_mb / writer,
+                    chunks / writer,
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+
+from benchmarks.stand_in import (
+    BULK_METADATA_PATH,
+    MOD_PAGE_PATH,
+    StandInServer,
+    StandInSettings,
+)
+from src.downloader import Downloader
+from src.game_cfg import GameConfig
+from src.http_client import HttpClient
+from src.logging import console
+from src.session import DownloadSession, Endpoints
+
+#: Файл с сохранёнными результатами замеров.
+BASELINES_PATH = Path(__file__).parent / "baselines" / "end_to_end.json"
+
+#: Допустимое замедление относительно сохранённого результата.
+DEFAULT_TOLERANCE = 0.25
+
+#: Допустимый рост времени на мод в сценарии с большим количеством модов
+#: относительно такого же сценария с меньшим. Больший рост означает, что
+#: время растёт быстрее количества модов.
+DEFAULT_SCALING_TOLERANCE = 0.5
+
+#: ID первого мода сценария.
+_FIRST_MOD_ID = 1000000
+
+_KIB = 1024
+_MIB = _KIB * _KIB
+
+
+class Scenario(NamedTuple):
+    """Сценарий замера: моды и поведение локального сервера."""
+
+    #: Количество модов.
+    mods: int
+    #: Размер архива каждого мода в байтах.
+    archive_size: int
+    #: Время подготовки мода к скачиванию в секундах.
+    prepare_delay: float = 0
+    #: Задержка каждого ответа сервера в секундах.
+    latency: float = 0
+    #: Скорость отдачи одного архива в байтах в секунду.
+    bandwidth: Optional[int] = None
+    #: Доля ответов 503.
+    error_rate: float = 0
+
+
+#: Сценарии замеров по названиям.
+SCENARIOS = {
+    "10 больших": Scenario(10, 32 * _MIB),
+    "10 маленьких": Scenario(10, 16 * _KIB),
+    "200 маленьких": Scenario(200, 16 * _KIB),
+    "1000 маленьких": Scenario(1000, 16 * _KIB),
+    "200 с задержками": Scenario(
+        200, 256 * _KIB, prepare_delay=0.2, latency=0.02
+    ),
+    "200 с ошибками": Scenario(200, 256 * _KIB, error_rate=0.05),
+}
+
+
+class Result(NamedTuple):
+    """Результат одного замера."""
+
+    #: Время скачивания и установки всех модов в секундах.
+    wall_time: float
+    #: Скорость в мегабайтах отданных сервером архивов в секунду.
+    throughput: float
+    #: Количество запросов к серверу по методам.
+    requests: Dict[str, int]
+    #: Количество повторов шагов после ошибок.
+    retries: int
+    #: Время на один мод в миллисекундах.
+    per_mod: float
+
+
+async def run_scenario(scenario: Scenario) -> Result:
+    """Скачивание и установка модов сценария с локального сервера.
+
+    Запускается в текущей папке: кеши, хранилище архивов и установленные
+    моды создаются в ней.
+
+    Args:
+        scenario: Сценарий.
+
+    Returns:
+        Результат замера.
+    """
+    settings = StandInSettings(
+        prepare_delay=scenario.prepare_delay,
+        latency=scenario.latency,
+        bandwidth=scenario.bandwidth,
+        error_rate=scenario.error_rate,
+        archive_size=scenario.archive_size,
+    )
+    mod_ids = set(range(_FIRST_MOD_ID, _FIRST_MOD_ID + scenario.mods))
+    async with StandInServer(settings) as server:
+        for mod_id in mod_ids:
+            server.archive(mod_id)  # Архивы создаются до начала замера
+        endpoints = Endpoints(
+            metadata_backend="bulk",
+            mod_page_url=server.url + MOD_PAGE_PATH,
+            bulk_metadata_url=server.url + BULK_METADATA_PATH,
+            download_backends=[("steamworkshopdownloader.io", server.url)],
+        )
+        # Ограничение частоты запросов к серверу замерялось бы вместо
+        # загрузчика, поэтому оно снимается
+        http = HttpClient(rate=1e6, burst=10**6)
+        session = DownloadSession(endpoints=endpoints, http=http)
+        config = GameConfig("mods", mod_ids, "benchmark")
+        started_at = time.perf_counter()
+        async with session:
+            await Downloader(config, session).run()
+        wall_time = time.perf_counter() - started_at
+    return Result(
+        wall_time=wall_time,
+        throughput=server.bytes_sent / _MIB / wall_time,
+        requests=dict(server.requests),
+        retries=session.retry.retries,
+        per_mod=wall_time * 1000 / scenario.mods,
+    )
+
+
+def measure(scenario: Scenario) -> Result:
+    """Замер сценария в отдельной временной папке."""
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as folder:
+        os.chdir(folder)
+        try:
+            os.mkdir(".temp")
+            return asyncio.run(run_scenario(scenario))
+        finally:
+            os.chdir(cwd)
+
+
+Baseline = Dict[str, float]
+
+
+def load_baselines() -> Dict[str, Baseline]:
+    """Сохранённые результаты сценариев по их названиям.
+
+    Результат - время сценария в секундах (`wall_time`) и время на мод в
+    миллисекундах (`per_mod`).
+    """
+    if not BASELINES_PATH.exists():
+        return {}
+    with open(BASELINES_PATH, encoding="utf-8") as baselines_file:
+        return json.load(baselines_file)
+
+
+def save_baselines(baselines: Dict[str, Baseline]) -> None:
+    """Сохранение результатов сценариев.
+
+    Args:
+        baselines: Результаты сценариев по их названиям.
+    """
+    BASELINES_PATH.parent.mkdir(exist_ok=True)
+    with open(BASELINES_PATH, "w", encoding="utf-8") as baselines_file:
+        json.dump(baselines, baselines_file, ensure_ascii=False, indent=2)
+        baselines_file.write("\n")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Разбор аргументов командной строки."""
+    parser = argparse.ArgumentParser(
+        description="Замер скачивания модов с локального сервера.",
+    )
+    parser.add_argument(
+        "--scenario",
+        action="append",
+        choices=list(SCENARIOS),
+        help="сценарий; можно указать несколько (по умолчанию все)",
+    )
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="сохранить результаты для сравнения со следующими замерами",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=DEFAULT_TOLERANCE,
+        help="допустимое замедление, доля (по умолчанию %(default)s)",
+    )
+    parser.add_argument(
+        "--scaling-tolerance",
+        type=float,
+        default=DEFAULT_SCALING_TOLERANCE,
+        help=(
+            "допустимый рост времени на мод с ростом количества модов, доля "
+            "(по умолчанию %(default)s)"
+        ),
+    )
+    return parser.parse_args(argv)
+
+
+def find_superlinear(results: Dict[str, Result], tolerance: float) -> List[str]:
+    """Поиск сценариев, время которых растёт быстрее количества модов.
+
+    Сравниваются сценарии, отличающиеся только количеством модов: время на
+    мод в большем из них не должно превышать время на мод в меньшем больше,
+    чем на `tolerance`.
+
+    Args:
+        results: Результаты сценариев по их названиям.
+        tolerance: Допустимый рост времени на мод, доля.
+
+    Returns:
+        Описания пар сценариев с ростом больше допустимого.
+    """
+    groups: Dict[Scenario, List[str]] = {}
+    for name in results:
+        scenario = SCENARIOS[name]
+        groups.setdefault(scenario._replace(mods=0), []).append(name)
+    superlinear = []
+    for names in groups.values():
+        names.sort(key=lambda name: SCENARIOS[name].mods)
+        for smaller, larger in zip(names, names[1:]):
+            growth = results[larger].per_mod / results[smaller].per_mod
+            print("Время на мод: %s / %s = %.2f" % (larger, smaller, growth))
+            if growth > 1 + tolerance:
+                superlinear.append("%s / %s" % (larger, smaller))
+    return superlinear
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Замер скачивания и установки модов загрузчиком от начала до конца.
+
+    Сервер информации о модах и источник скачивания заменяются локальным
+    сервером, поэтому замеряется сам загрузчик: его запросы, ожидание
+    подготовки модов, запись и распаковка архивов. Результаты сравниваются
+    с сохранёнными в `benchmarks/baselines/end_to_end.json`, а время на мод
+    в сценариях, отличающихся только количеством модов, - между собой.
+
+    Запуск: `python -m benchmarks.end_to_end`.
+
+    Returns:
+        Код завершения: 1, если какой-то сценарий замедлился больше
+        допустимого или время растёт быстрее количества модов.
+    """
+    args = parse_args(argv)
+    console.quiet = True
+    baselines = load_baselines()
+    results: Dict[str, Result] = {}
+    regressions = []
+    print(
+        "%-18s %9s %9s %9s %9s %9s %9s"
+        % (
+            "Сценарий",
+            "Время, с",
+            "МБ/с",
+            "мс/мод",
+            "Запросы",
+            "Повторы",
+            "Было, с",
+        )
+    )
+    for name in args.scenario or SCENARIOS:
+        result = measure(SCENARIOS[name])
+        results[name] = result
+        baseline = baselines.get(name)
+        print(
+            "%-18s %9.2f %9.1f %9.1f %9d %9d %9s"
+            % (
+                name,
+                result.wall_time,
+                result.throughput,
+                result.per_mod,
+                sum(result.requests.values()),
+                result.retries,
+                "-" if baseline is None else "%.2f" % baseline["wall_time"],
+            )
+        )
+        for path, count in sorted(result.requests.items()):
+            print("    %-50s %6d" % (path, count))
+        if baseline is not None:
+            if result.wall_time > baseline["wall_time"] * (1 + args.tolerance):
+                regressions.append(name)
+
+    superlinear = find_superlinear(results, args.scaling_tolerance)
+    if args.save_baseline and not superlinear:
+        for name, result in results.items():
+            baselines[name] = {
+                "wall_time": round(result.wall_time, 3),
+                "per_mod": round(result.per_mod, 2),
+            }
+        save_baselines(baselines)
+    elif args.save_baseline:
+        print("Результаты не сохранены: время растёт быстрее количества модов")
+    if regressions:
+        print("Замедлились: %s" % ", ".join(regressions))
+    if superlinear:
+        print(
+            "Время растёт быстрее количества модов: %s" % ", ".join(superlinear)
+        )
+    return 1 if regressions or superlinear else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
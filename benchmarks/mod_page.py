@@ -0,0 +1,72 @@
+import re
+import timeit
+from pathlib import Path
+from typing import Callable, Tuple
+
+from bs4 import BeautifulSoup
+from src.mod_page import parse_mod_page
+
+FIXTURES = Path(__file__).parent.parent / "tests" / "fixtures" / "mod_pages"
+
+
+def parse_with_soup(html: str) -> Tuple[str, str]:
+    """Прежний разбор страницы мода через BeautifulSoup."""
+    soup = BeautifulSoup(html, "html.parser")
+
+    error_elem = soup.find("div", "basic_errors")
+    if error_elem:
+        raise ValueError(error_elem.text)
+
+    links = soup.find_all("a")
+    title_elem = next(filter(lambda elem: "title" in elem.attrs, links))
+    last_update_elem = soup.find("div", "short-story")
+    last_update_match = re.search("Update:.*", last_update_elem.text)
+    return title_elem.attrs["title"], last_update_match[0][8:]  # type: ignore
+
+
+def parse_with_scanner(html: str) -> Tuple[str, str]:
+    return tuple(parse_mod_page(html))  # type: ignore
+
+
+def measure(parse: Callable[[str], Tuple[str, str]], html: str) -> float:
+    """Среднее время разбора страницы в миллисекундах."""
+    number = 20
+    best = min(timeit.repeat(lambda: parse(html), number=number, repeat=5))
+    return best / number * 1000
+
+
+def main() -> None:
+    """Сравнение разбора страниц модов через BeautifulSoup и сканером.
+
+    Запуск: `python -m benchmarks.mod_page`.
+    """
+    print("%-20s %12s %12s %8s" % ("Страница", "bs4, мс", "сканер, мс", "x"))
+    for path in sorted(FIXTURES.glob("*.html")):
+        html = path.read_text(encoding="utf-8")
+        if path.stem != "error":
+            assert parse_with_soup(html) == parse_with_scanner(html)
+            soup_time = measure(parse_with_soup, html)
+            scanner_time = measure(parse_with_scanner, html)
+        else:
+            soup_time = measure(_ignore_errors(parse_with_soup), html)
+            scanner_time = measure(_ignore_errors(parse_with_scanner), html)
+        print(
+            "%-20s %12.3f %12.3f %8.1f"
+            % (path.name, soup_time, scanner_time, soup_time / scanner_time)
+        )
+
+
+def _ignore_errors(
+    parse: Callable[[str], Tuple[str, str]],
+) -> Callable[[str], Tuple[str, str]]:
+    def wrapper(html: str) -> Tuple[str, str]:
+        try:
+            return parse(html)
+        except ValueError:
+            return ("", "")
+
+    return wrapper
+
+
+if __name__ == "__main__":
+    main()
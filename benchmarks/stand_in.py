@@ -0,0 +1,243 @@
+import asyncio
+import io
+import json
+import os
+import random
+import uuid
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from types import TracebackType
+from typing import Awaitable, Callable, Dict, Optional, Tuple, Type
+from zipfile import ZIP_STORED, ZipFile
+
+from aiohttp import web
+from src.metadata import LAST_UPDATE_FORMAT
+
+#: Путь метода `GetPublishedFileDetails` на локальном сервере.
+BULK_METADATA_PATH = "/ISteamRemoteStorage/GetPublishedFileDetails/v1/"
+
+#: Шаблон пути страницы мода на локальном сервере.
+MOD_PAGE_PATH = "/download/view/{}"
+
+#: Дата последнего обновления всех модов локального сервера.
+LAST_UPDATE = datetime(2021, 4, 24, 8, 50, tzinfo=timezone.utc)
+
+#: Размер части архива, отдаваемой за раз при ограничении скорости.
+_SEND_CHUNK_SIZE = 64 * 1024
+
+_MOD_PAGE = """<html><body>
+<div class="title"><a href="/download/view/{mod_id}" title="{title}">{title}</a>
+</div>
+<div class="short-story">Size: {size} bytes
+Update: {last_update}
+</div>
+</body></html>
+"""
+
+
+@dataclass
+class StandInSettings:
+    """Поведение локального сервера."""
+
+    #: Время подготовки мода к скачиванию после запроса в секундах.
+    prepare_delay: float = 0
+    #: Задержка каждого ответа в секундах.
+    latency: float = 0
+    #: Скорость отдачи одного архива в байтах в секунду. None - без
+    #: ограничения.
+    bandwidth: Optional[int] = None
+    #: Доля запросов, на которые сервер отвечает 503.
+    error_rate: float = 0
+    #: Размер архива мода в байтах.
+    archive_size: int = 64 * 1024
+    #: Размеры архивов отдельных модов по их ID.
+    archive_sizes: Dict[int, int] = field(default_factory=dict)
+    #: Зерно генератора ошибок.
+    seed: int = 0
+
+
+class StandInServer:
+    """Локальная замена серверов информации о модах и их скачивания.
+
+    Отвечает как steamworkshop.download (`view/{id}`), Steam Web API
+    (`GetPublishedFileDetails`) и steamworkshopdownloader.io
+    (`/api/download/request`, `/api/download/status`,
+    `/api/download/transmit`). Архивы - настоящие zip архивы заданного
+    размера. Считает запросы к каждому методу и отданные байты.
+    """
+
+    def __init__(self, settings: Optional[StandInSettings] = None) -> None:
+        """Создание сервера. Он запускается при входе в контекст.
+
+        Args:
+            settings: Поведение сервера.
+        """
+        self.settings = settings or StandInSettings()
+        #: Количество запросов по методам.
+        self.requests: "Counter[str]" = Counter()
+        #: Количество ответов 503.
+        self.errors = 0
+        #: Количество отданных байт архивов.
+        self.bytes_sent = 0
+        self.url = ""
+        self._random = random.Random(self.settings.seed)
+        self._archives: Dict[int, bytes] = {}
+        #: ID мода и время запроса на скачивание по UUID запроса.
+        self._download_requests: Dict[str, Tuple[int, float]] = {}
+        self._runner: Optional[web.AppRunner] = None
+
+    async def __aenter__(self) -> "StandInServer":
+        """Запуск сервера на свободном порту."""
+        app = web.Application(middlewares=[self._middleware])
+        app.router.add_get("/download/view/{mod_id}", self._view)
+        app.router.add_post(BULK_METADATA_PATH, self._bulk_details)
+        app.router.add_post("/api/download/request", self._request)
+        app.router.add_post("/api/download/status", self._status)
+        app.router.add_get("/api/download/transmit", self._transmit)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        self.url = "http://127.0.0.1:%d" % self._runner.addresses[0][1]
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        """Остановка сервера."""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def archive(self, mod_id: int) -> bytes:
+        """Архив мода.
+
+        Args:
+            mod_id: ID мода.
+
+        Returns:
+            Содержимое zip архива.
+        """
+        archive = self._archives.get(mod_id)
+        if archive is None:
+            size = self.settings.archive_sizes.get(
+                mod_id, self.settings.archive_size
+            )
+            buffer = io.BytesIO()
+            with ZipFile(buffer, "w", ZIP_STORED) as zip_file:
+                zip_file.writestr("Mod.modinfo", "<Mod id='%d'/>" % mod_id)
+                # Заголовки и каталог архива занимают около 200 байт
+                zip_file.writestr(
+                    "Data/mod.bin", os.urandom(max(0, size - 200))
+                )
+            archive = buffer.getvalue()
+            self._archives[mod_id] = archive
+        return archive
+
+    @web.middleware
+    async def _middleware(
+        self,
+        request: web.Request,
+        handler: Callable[[web.Request], Awaitable[web.StreamResponse]],
+    ) -> web.StreamResponse:
+        resource = request.match_info.route.resource
+        self.requests[
+            resource.canonical if resource is not None else request.path
+        ] += 1
+        if self.settings.latency:
+            await asyncio.sleep(self.settings.latency)
+        if self._random.random() < self.settings.error_rate:
+            self.errors += 1
+            return web.Response(status=503)
+        return await handler(request)
+
+    async def _view(self, request: web.Request) -> web.Response:
+        mod_id = int(request.match_info["mod_id"])
+        page = _MOD_PAGE.format(
+            mod_id=mod_id,
+            title="Stand-in mod %d" % mod_id,
+            size=len(self.archive(mod_id)),
+            last_update=LAST_UPDATE.strftime(LAST_UPDATE_FORMAT),
+        )
+        return web.Response(text=page, content_type="text/html")
+
+    async def _bulk_details(self, request: web.Request) -> web.Response:
+        form = await request.post()
+        items = []
+        for index in range(int(str(form["itemcount"]))):
+            mod_id = int(str(form["publishedfileids[%d]" % index]))
+            items.append(
+                {
+                    "result": 1,
+                    "publishedfileid": str(mod_id),
+                    "title": "Stand-in mod %d" % mod_id,
+                    "time_updated": int(LAST_UPDATE.timestamp()),
+                    "file_size": str(len(self.archive(mod_id))),
+                    "consumer_app_id": 289070,
+                }
+            )
+        return web.json_response({"response": {"publishedfiledetails": items}})
+
+    async def _request(self, request: web.Request) -> web.Response:
+        data = json.loads(await request.text())
+        request_uuid = str(uuid.uuid4())
+        loop = asyncio.get_running_loop()
+        self._download_requests[request_uuid] = (
+            int(data["publishedFileId"]),
+            loop.time(),
+        )
+        return web.json_response({"uuid": request_uuid})
+
+    async def _status(self, request: web.Request) -> web.Response:
+        data = json.loads(await request.text())
+        now = asyncio.get_running_loop().time()
+        statuses = {}
+        for request_uuid in data["uuids"]:
+            download_request = self._download_requests.get(request_uuid)
+            if download_request is None:
+                continue
+            prepared = now - download_request[1] >= self.settings.prepare_delay
+            statuses[request_uuid] = {
+                "status": "prepared" if prepared else "queued",
+                "progressText": "processed!" if prepared else "queued",
+            }
+        return web.json_response(statuses)
+
+    async def _transmit(self, request: web.Request) -> web.StreamResponse:
+        download_request = self._download_requests.get(
+            request.query.get("uuid", "")
+        )
+        if download_request is None:
+            return web.Response(status=404)
+        archive = self.archive(download_request[0])
+        start, end = 0, len(archive) - 1
+        status = 200
+        headers = {"Accept-Ranges": "bytes"}
+        range_header = request.headers.get("Range")
+        if range_header:
+            first, last = range_header[len("bytes=") :].split("-")
+            start = int(first)
+            end = min(end, int(last)) if last else end
+            status = 206
+            headers["Content-Range"] = "bytes %d-%d/%d" % (
+                start,
+                end,
+                len(archive),
+            )
+        body = memoryview(archive)[start : end + 1]
+        headers["Content-Length"] = str(len(body))
+        response = web.StreamResponse(status=status, headers=headers)
+        await response.prepare(request)
+        bandwidth = self.settings.bandwidth
+        for offset in range(0, len(body), _SEND_CHUNK_SIZE):
+            chunk = body[offset : offset + _SEND_CHUNK_SIZE]
+            await response.write(chunk)
+            self.bytes_sent += len(chunk)
+            if bandwidth:
+                await asyncio.sleep(len(chunk) / bandwidth)
+        await response.write_eof()
+        return response
@@ -0,0 +1,67 @@
+import statistics
+import subprocess  # noqa: S404
+import sys
+import time
+from pathlib import Path
+from typing import List, Optional
+
+ROOT = Path(__file__).parent.parent
+
+#: Команды запуска программы, время которых замеряется.
+COMMANDS = {
+    "main.py --version": ["main.py", "--version"],
+    "main.py --help": ["main.py", "--help"],
+    "main.py CONFIG (нет конфига)": [
+        "main.py",
+        "--no-version-check",
+        "--configs-dir",
+        "benchmarks",
+        "missing",
+    ],
+}
+
+#: Модули, импорт которых откладывается до момента, когда они нужны.
+DEFERRED_MODULES = ("src.downloader", "requests", "PyInquirer", "rich.console")
+
+
+def run(args: List[str], repeat: int = 10) -> Optional[float]:
+    """Медианное время выполнения команды Python в миллисекундах.
+
+    Returns:
+        Время или None, если команда завершилась с ошибкой импорта.
+    """
+    timings = []
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        completed = subprocess.run(  # noqa: S603
+            [sys.executable, *args], cwd=ROOT, capture_output=True
+        )
+        timings.append(time.perf_counter() - started_at)
+        if b"ImportError" in completed.stderr:
+            return None
+    return statistics.median(timings) * 1000
+
+
+def main() -> None:
+    """Замер времени запуска программы и импорта отложенных модулей.
+
+    Запуск: `python -m benchmarks.startup`.
+    """
+    baseline = run(["-c", "pass"]) or 0
+    print("%-32s %10s" % ("Команда", "мс"))
+    print("%-32s %10.1f" % ("python -c pass", baseline))
+    for name, args in COMMANDS.items():
+        print("%-32s %10.1f" % (name, run(args) or 0))
+
+    print()
+    print("%-32s %10s" % ("Отложенный импорт", "мс"))
+    for module in DEFERRED_MODULES:
+        elapsed = run(["-c", "import %s" % module])
+        if elapsed is None:
+            print("%-32s %10s" % (module, "недоступен"))
+        else:
+            print("%-32s %10.1f" % (module, elapsed - baseline))
+
+
+if __name__ == "__main__":
+    main()
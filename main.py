@@ -1,74 +1,314 @@
-import asyncio
+import argparse
 import os
 import shutil
+import sys
+from typing import List, Optional
 
-from PyInquirer import prompt
 from src.config import TEMP_DOWNLOAD_PATH, VERSION
-from src.downloader import Downloader
-from src.game_cfg import get_configs
+from src.game_cfg import GameConfig, find_config_names, get_configs
 from src.logging import console
-from update import handle_update, is_running_latest_version
+from update import (
+    check_latest_version_in_background,
+    get_cached_latest_version,
+    handle_update,
+)
 
+# PyInquirer, aiohttp и загрузчик импортируются только там, где нужны:
+# без них программа запускается в разы быстрее, а `--help`, `--version` и
+# запуск без интерактивного режима вообще не загружают PyInquirer.
 
-def remake_temp_dir() -> None:
-    """Пересоздание временной папки для скачивания модов."""
-    clean_temp_dir()
+
+def make_temp_dir() -> None:
+    """Создание временной папки для скачивания модов.
+
+    Недокачанные в прошлый раз архивы не удаляются - их скачивание будет
+    продолжено.
+    """
     if not os.path.exists(TEMP_DOWNLOAD_PATH):
         os.mkdir(TEMP_DOWNLOAD_PATH)
 
 
 def clean_temp_dir() -> None:
-    """Удаление временной папки для скачивания модов."""
-    if os.path.exists(TEMP_DOWNLOAD_PATH):
-        shutil.rmtree(TEMP_DOWNLOAD_PATH)
+    """Удаление скачанных архивов из временной папки.
+
+    Недокачанные архивы остаются, чтобы продолжить их скачивание при
+    следующем запуске.
+    """
+    from src.transfer import PARTIAL_SUFFIX, RECORD_SUFFIX  # noqa: WPS433
+
+    if not os.path.exists(TEMP_DOWNLOAD_PATH):
+        return
+    for entry in os.scandir(TEMP_DOWNLOAD_PATH):
+        if entry.name.endswith((PARTIAL_SUFFIX, RECORD_SUFFIX)):
+            continue
+        if entry.is_dir():
+            shutil.rmtree(entry.path)
+        else:
+            os.remove(entry.path)
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Разбор аргументов командной строки.
+
+    Args:
+        argv: Аргументы без названия программы. None - `sys.argv[1:]`.
+
+    Returns:
+        Аргументы.
+    """
+    parser = argparse.ArgumentParser(
+        description=(
+            "Скачивание модов Steam Workshop по конфигурациям. Без названий "
+            "конфигураций и --all запускается в интерактивном режиме."
+        ),
+    )
+    parser.add_argument(
+        "configs",
+        nargs="*",
+        metavar="CONFIG",
+        help="названия конфигураций в папке конфигов без расширения",
+    )
+    parser.add_argument(
+        "--all",
+        action="store_true",
+        help="обработать все конфигурации",
+    )
+    parser.add_argument(
+        "--configs-dir",
+        default="configs/",
+        help="папка конфигов (по умолчанию configs/)",
+    )
+    parser.add_argument(
+        "--force-refresh",
+        action="store_true",
+        help="запросить информацию о модах заново, не используя кеш",
+    )
+    parser.add_argument(
+        "--verify",
+        action="store_true",
+        help=(
+            "проверить файлы установленных модов и переустановить "
+            "повреждённые и удалённые"
+        ),
+    )
+    parser.add_argument(
+        "--prune",
+        action="store_true",
+        help="удалить лишние папки модов, оставшиеся после смены их названия",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help=(
+            "не завершаться, а устанавливать обновления модов по мере их "
+            "выхода; требует названий конфигураций или --all"
+        ),
+    )
+    parser.add_argument(
+        "--no-version-check",
+        action="store_true",
+        help="не проверять наличие новой версии программы",
+    )
+    parser.add_argument(
+        "--version", action="version", version="%(prog)s " + VERSION
+    )
+    return parser.parse_args(argv)
+
+
+def download_mods(
+    configs: List[GameConfig],
+    force_refresh: bool,
+    verify: bool = False,
+    prune: bool = False,
+) -> None:
+    """Загрузка модов конфигураций.
+
+    Args:
+        configs: Конфигурации.
+        force_refresh: Запрашивать информацию о модах, не используя кеш.
+        verify: Проверять файлы установленных модов.
+        prune: Удалять лишние папки модов.
+    """
+    import asyncio  # noqa: WPS433
+
+    from src.downloader import download_configs  # noqa: WPS433
+
+    make_temp_dir()
+    asyncio.run(download_configs(configs, force_refresh, verify, prune))
+
+    clean_temp_dir()
+    console.print("[cyan]Завершено!")
+
+
+def select_configs(configs_dir: str) -> List[GameConfig]:
+    """Выбор конфигураций в интерактивном режиме.
+
+    Читаются только выбранные конфигурации.
 
+    Args:
+        configs_dir: Папка конфигов.
 
-def download_mods() -> None:
-    configs = get_configs()
+    Returns:
+        Выбранные конфигурации.
+    """
+    from PyInquirer import prompt  # noqa: WPS433
 
-    selected_configs = []
-    selectable_configs = [{"name": config.name} for config in configs]
+    selectable_configs = [
+        {"name": name} for name in find_config_names(configs_dir)
+    ]
     if len(selectable_configs) == 0:
         console.print(
             "Не найдено конфигураций. Создайте новую.\n"
             "Посмотрите [cyan]README.md[/cyan], чтобы узнать подробнее",
             style="warning",
         )
-        return
+        return []
 
     questions = [
         {
-            "type": "list",
+            "type": "checkbox",
             "name": "selected_configs",
-            "message": "Выберите конфиг:",
+            "message": "Выберите конфигурации:",
             "choices": selectable_configs,
         }
     ]
     answers = prompt(questions)
     if not answers:
         console.print("Завершение программы", style="warning")
-        return
-
-    selected_configs = list(
-        filter(lambda cfg: cfg.name in answers["selected_configs"], configs)
-    )
+        return []
 
-    remake_temp_dir()
-    downloaders = [Downloader(cfg) for cfg in selected_configs]
-    if len(downloaders) == 0:
+    if len(answers["selected_configs"]) == 0:
         console.print(
             "Никакой конфигурации выбрано не было. Завершение программы",
             style="warning",
         )
-        return
+        return []
+    return get_configs(configs_dir, answers["selected_configs"])
 
-    asyncio.run(downloaders[0].run())
 
-    clean_temp_dir()
-    console.print("[cyan]Завершено!")
+def offer_update(latest_version: Optional[str]) -> bool:
+    """Предложение обновиться, если прошлая проверка нашла новую версию.
+
+    Args:
+        latest_version: Последняя версия по результату прошлой проверки.
+
+    Returns:
+        True, если программа обновилась и работу нужно завершить.
+    """
+    if latest_version is None:
+        return False
+    if latest_version == VERSION:
+        console.print("Установлена последняя версия программы", style="info")
+        return False
+
+    from PyInquirer import prompt  # noqa: WPS433
+
+    questions = [
+        {
+            "type": "confirm",
+            "name": "update",
+            "message": "Обновиться до последней версии программы (%s)?"
+            % latest_version,
+            "default": False,
+        }
+    ]
+    answer = prompt(questions)
+    if answer and answer["update"]:
+        handle_update()
+        return True
+    return False
+
+
+def watch_mods(args: argparse.Namespace) -> None:
+    """Режим наблюдения до нажатия Ctrl+C.
+
+    Args:
+        args: Аргументы командной строки.
+    """
+    import asyncio  # noqa: WPS433
+
+    from src.watch import watch_configs  # noqa: WPS433
+
+    make_temp_dir()
+    names = None if args.all else args.configs
+    try:
+        asyncio.run(
+            watch_configs(
+                args.configs_dir,
+                names,
+                args.force_refresh,
+                args.verify,
+                args.prune,
+            )
+        )
+    except KeyboardInterrupt:
+        console.print("Завершение режима наблюдения", style="warning")
+    finally:
+        clean_temp_dir()
+
+
+def run_headless(
+    args: argparse.Namespace, latest_version: Optional[str]
+) -> int:
+    """Запуск без вопросов пользователю, например из cron или CI.
+
+    Args:
+        args: Аргументы командной строки.
+        latest_version: Последняя версия по результату прошлой проверки.
+
+    Returns:
+        Код завершения: 1, если какая-то из конфигураций не найдена или не
+        прошла проверку.
+    """
+    names = None if args.all else args.configs
+    configs = get_configs(args.configs_dir, names)
+    if names is not None and len(configs) != len(names):
+        return 1
+    if args.watch:
+        # Без конфигураций с --all наблюдение ждёт их появления в папке
+        watch_mods(args)
+        return 0
+    if len(configs) == 0:
+        console.print("Не найдено конфигураций", style="warning")
+        return 1
+
+    if latest_version is not None and latest_version != VERSION:
+        console.print(
+            "Доступна новая версия программы: %s" % latest_version,
+            style="warning",
+        )
+    download_mods(configs, args.force_refresh, args.verify, args.prune)
+    return 0
 
 
-def main() -> None:
+def main(argv: Optional[List[str]] = None) -> int:
+    """Точка входа.
+
+    Проверка версии не задерживает запуск: используется результат прошлой
+    проверки, а устаревший результат обновляется в фоне.
+
+    Args:
+        argv: Аргументы без названия программы. None - `sys.argv[1:]`.
+
+    Returns:
+        Код завершения.
+    """
+    args = parse_args(argv)
+    latest_version = None
+    if not args.no_version_check:
+        latest_version = get_cached_latest_version()
+        if latest_version is None:
+            check_latest_version_in_background()
+
+    if args.configs or args.all:
+        return run_headless(args, latest_version)
+    if args.watch:
+        console.print(
+            "Для --watch укажите названия конфигураций или --all",
+            style="error",
+        )
+        return 2
+
     console.print(
         f"steam-workshop-downloader {VERSION}",
         style="black on yellow",
@@ -79,25 +319,15 @@ def main() -> None:
         style="italic red on yellow",
         justify="center",
     )
-    if is_running_latest_version():
-        console.print("Установлена последняя версия программы", style="info")
-    else:
-        questions = [
-            {
-                "type": "confirm",
-                "name": "update",
-                "message": "Обновиться до последней версии программы?",
-                "default": False,
-            }
-        ]
-        answer = prompt(questions)
-        if answer and answer["update"]:
-            handle_update()
-            return
-
-    download_mods()
+    if offer_update(latest_version):
+        return 0
+
+    configs = select_configs(args.configs_dir)
+    if configs:
+        download_mods(configs, args.force_refresh, args.verify, args.prune)
     console.input("\nНажмите [cyan]Enter[/cyan], чтобы выйти.")
+    return 0
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
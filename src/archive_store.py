@@ -0,0 +1,292 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple, Union
+
+from .config import ARCHIVE_STORE_DIR, ARCHIVE_STORE_MAX_SIZE
+from .logging import console
+
+#: Размер буфера при подсчёте хеша архива.
+_HASH_BUFFER_SIZE = 1024 * 1024
+
+
+class ArchiveStore:
+    """Общее для всех конфигураций хранилище скачанных архивов модов.
+
+    Архивы хранятся под ключом из ID мода, даты его последнего обновления и
+    хеша содержимого. Когда общий размер архивов превышает `max_size`,
+    удаляются давно не использовавшиеся. Также хранятся пути, по которым
+    моды были установлены, чтобы не распаковывать одну и ту же версию мода
+    в разные папки заново.
+
+    Индекс хранилища держится в памяти, а в файл записывается методом
+    `dump` - один раз за запуск, а не при каждом добавлении архива.
+
+    Архивы, выданные методами `find`, `add` и `add_data`, не удаляются до
+    вызова `release`: их может распаковывать этот запуск. Поэтому во время
+    запуска размер хранилища может превышать `max_size`.
+
+    Методы блокирующие и потокобезопасные, вызываются в пуле потоков.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, os.PathLike] = ARCHIVE_STORE_DIR,
+        max_size: int = ARCHIVE_STORE_MAX_SIZE,
+    ) -> None:
+        """Открытие хранилища.
+
+        Args:
+            path: Папка хранилища.
+            max_size: Максимальный общий размер архивов в байтах.
+        """
+        self._path = Path(path)
+        self._index_path = self._path / "index.json"
+        self._max_size = max_size
+        self._lock = threading.Lock()
+        self._index = self._load_index()
+        #: Ключи архивов по ID мода и дате его последнего обновления.
+        self._keys: Dict[Tuple[int, str], List[str]] = {}
+        for key, entry in self._index["archives"].items():
+            self._keys.setdefault(
+                (entry["mod_id"], entry["version"]), []
+            ).append(key)
+        self._size = sum(
+            entry["size"] for entry in self._index["archives"].values()
+        )
+        #: Индекс изменился с последней записи в файл.
+        self._dirty = False
+        #: Ключи архивов, выданных с последнего вызова `release`.
+        self._in_use: Set[str] = set()
+
+    def find(self, mod_id: int, version: str) -> Optional[str]:
+        """Поиск архива мода.
+
+        Args:
+            mod_id: ID мода.
+            version: Дата последнего обновления мода.
+
+        Returns:
+            Путь к архиву или None, если его нет в хранилище. Архив, файл
+            которого удалён не хранилищем, убирается из индекса.
+        """
+        with self._lock:
+            for key in list(self._keys.get((mod_id, version), [])):
+                archive_path = self._path / key
+                if not archive_path.exists():
+                    self._forget(key)
+                    continue
+                self._index["archives"][key]["last_used"] = time.time()
+                self._dirty = True
+                self._in_use.add(key)
+                return str(archive_path)
+        return None
+
+    def add(self, mod_id: int, version: str, archive_path: str) -> str:
+        """Перенос скачанного архива в хранилище.
+
+        Args:
+            mod_id: ID мода.
+            version: Дата последнего обновления мода.
+            archive_path: Путь к скачанному архиву.
+
+        Returns:
+            Путь к архиву. Если архив больше всего хранилища, то он остаётся
+            на месте.
+        """
+        size = os.path.getsize(archive_path)
+        if size > self._max_size:
+            return archive_path
+        digest = _file_sha256(archive_path)
+        key = _archive_key(mod_id, version, digest)
+
+        os.makedirs(self._path, exist_ok=True)
+        stored_path = self._path / key
+        shutil.move(archive_path, stored_path)
+        self._register(key, mod_id, version, digest, size)
+        return str(stored_path)
+
+    def add_data(
+        self, mod_id: int, version: str, data: bytes, archive_path: str
+    ) -> str:
+        """Запись архива, скачанного в память, в хранилище.
+
+        Args:
+            mod_id: ID мода.
+            version: Дата последнего обновления мода.
+            data: Содержимое архива.
+            archive_path: Путь, по которому архив записывается, если он
+                больше всего хранилища.
+
+        Returns:
+            Путь к архиву.
+        """
+        if len(data) > self._max_size:
+            with open(archive_path, "wb") as archive_file:
+                archive_file.write(data)
+            return archive_path
+        digest = hashlib.sha256(data).hexdigest()
+        key = _archive_key(mod_id, version, digest)
+
+        os.makedirs(self._path, exist_ok=True)
+        stored_path = self._path / key
+        tmp_path = str(stored_path) + ".tmp"
+        with open(tmp_path, "wb") as archive_file:
+            archive_file.write(data)
+        os.replace(tmp_path, stored_path)
+        self._register(key, mod_id, version, digest, len(data))
+        return str(stored_path)
+
+    def add_install(
+        self, mod_id: int, version: str, path: str, manifest_path: str
+    ) -> None:
+        """Запись о том, что мод установлен в папку.
+
+        Args:
+            mod_id: ID мода.
+            version: Дата последнего обновления мода.
+            path: Папка мода.
+            manifest_path: Путь к манифесту установленных файлов мода.
+        """
+        with self._lock:
+            installs: List[Dict[str, Any]] = [
+                install
+                for install in self._index["installs"].get(str(mod_id), [])
+                if install["path"] != path
+            ]
+            installs.append(
+                {"version": version, "path": path, "manifest": manifest_path}
+            )
+            self._index["installs"][str(mod_id)] = installs
+            self._dirty = True
+
+    def find_install(
+        self, mod_id: int, version: str, exclude_path: str
+    ) -> Optional[Dict[str, Any]]:
+        """Поиск другой папки, в которую установлена та же версия мода.
+
+        Args:
+            mod_id: ID мода.
+            version: Дата последнего обновления мода.
+            exclude_path: Папка, которая не рассматривается.
+
+        Returns:
+            Запись об установке с ключами `path` и `manifest` или None.
+        """
+        with self._lock:
+            for install in self._index["installs"].get(str(mod_id), []):
+                if (
+                    install["version"] == version
+                    and install["path"] != exclude_path
+                    and os.path.isdir(install["path"])
+                    and os.path.exists(install["manifest"])
+                ):
+                    return dict(install)
+        return None
+
+    def release(self) -> None:
+        """Разрешение удалять выданные архивы.
+
+        Вызывается, когда запуск закончил распаковку. Давно не
+        использовавшиеся архивы сверх размера хранилища удаляются.
+        """
+        with self._lock:
+            self._in_use.clear()
+            if self._size > self._max_size:
+                self._evict()
+
+    def dump(self) -> None:
+        """Запись индекса хранилища в файл, если он изменился."""
+        with self._lock:
+            if not self._dirty:
+                return
+            os.makedirs(self._path, exist_ok=True)
+            tmp_path = str(self._index_path) + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as index_file:
+                json.dump(self._index, index_file, indent=4, sort_keys=True)
+            os.replace(tmp_path, self._index_path)
+            self._dirty = False
+
+    def _register(
+        self, key: str, mod_id: int, version: str, digest: str, size: int
+    ) -> None:
+        with self._lock:
+            archives = self._index["archives"]
+            previous = archives.get(key)
+            if previous is None:
+                self._keys.setdefault((mod_id, version), []).append(key)
+            else:
+                self._size -= previous["size"]
+            archives[key] = {
+                "mod_id": mod_id,
+                "version": version,
+                "sha256": digest,
+                "size": size,
+                "last_used": time.time(),
+            }
+            self._size += size
+            self._dirty = True
+            self._in_use.add(key)
+            if self._size > self._max_size:
+                self._evict()
+
+    def _evict(self) -> None:
+        """Удаление давно не использовавшихся архивов сверх размера.
+
+        Выданные архивы не удаляются.
+        """
+        archives = self._index["archives"]
+        for key in sorted(archives, key=lambda key: archives[key]["last_used"]):
+            if self._size <= self._max_size:
+                return
+            if key in self._in_use:
+                continue
+            self._forget(key)
+            console.print(
+                "Удаление архива [cyan]%s[/cyan] из хранилища" % key,
+                style="debug",
+            )
+            archive_path = self._path / key
+            if archive_path.exists():
+                os.remove(archive_path)
+
+    def _forget(self, key: str) -> None:
+        """Удаление архива из индекса."""
+        entry = self._index["archives"].pop(key)
+        self._size -= entry["size"]
+        self._keys[(entry["mod_id"], entry["version"])].remove(key)
+        self._dirty = True
+
+    def _load_index(self) -> Dict[str, Dict[str, Any]]:
+        index: Dict[str, Dict[str, Any]] = {"archives": {}, "installs": {}}
+        if not self._index_path.exists():
+            return index
+        try:
+            with open(self._index_path, encoding="utf-8") as index_file:
+                index.update(json.load(index_file))
+        except ValueError:
+            console.print(
+                "Индекс хранилища архивов повреждён и будет пересоздан",
+                style="warning",
+            )
+        return index
+
+
+def _archive_key(mod_id: int, version: str, digest: str) -> str:
+    safe_version = "_".join(re.findall("[0-9a-zA-Z]+", version))
+    return "%d_%s_%s.zip" % (mod_id, safe_version, digest[:16])
+
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        while True:
+            data = file.read(_HASH_BUFFER_SIZE)
+            if not data:
+                return digest.hexdigest()
+            digest.update(data)
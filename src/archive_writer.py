@@ -0,0 +1,131 @@
+import asyncio
+import os
+from types import TracebackType
+from typing import IO, Optional, Type, cast
+
+from .config import DOWNLOAD_WRITE_BUFFER_SIZE
+from .stream_unzip import StreamingExtractor
+
+#: Граница от начала файла, по которой выравниваются записи в файл.
+WRITE_ALIGNMENT = 64 * 1024  # noqa: WPS432
+
+
+def preallocate(file: IO[bytes], size: int) -> None:
+    """Выделение места под файл заранее.
+
+    Там, где есть `posix_fallocate`, место выделяется на диске сразу, и
+    файл, записываемый по частям, не фрагментируется. Иначе файл только
+    увеличивается до нужного размера.
+
+    Args:
+        file: Файл, открытый на запись.
+        size: Размер файла в байтах.
+    """
+    fd = file.fileno()
+    if os.fstat(fd).st_size >= size:
+        return
+    if hasattr(os, "posix_fallocate"):
+        try:
+            os.posix_fallocate(fd, 0, size)
+        except OSError:
+            pass  # Файловая система не поддерживает выделение места
+        else:
+            return
+    file.truncate(size)
+
+
+class ArchiveWriter:
+    """Запись скачиваемого архива большими блоками.
+
+    Части, полученные из сети, копятся в буфере и пишутся в файл блоками
+    не меньше `buffer_size`, конец которых выровнен по `WRITE_ALIGNMENT`.
+    Запись идёт в пуле потоков, поэтому переход в поток происходит раз на
+    блок, а не на каждую полученную часть. Распаковщику блок передаётся в
+    том же переходе. При выходе из контекста, в том числе из-за ошибки,
+    записывается остаток буфера.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        offset: int = 0,
+        truncate: bool = False,
+        extractor: Optional[StreamingExtractor] = None,
+        buffer_size: int = DOWNLOAD_WRITE_BUFFER_SIZE,
+    ) -> None:
+        """Создание записи. Файл открывается при входе в контекст.
+
+        Args:
+            path: Путь к файлу. Создаётся, если его нет.
+            offset: Позиция в файле, с которой начинается запись.
+            truncate: Обрезать файл до `offset`.
+            extractor: Распаковщик, которому передаются записанные байты.
+            buffer_size: Минимальный размер записываемого блока.
+        """
+        self._path = path
+        self._truncate = truncate
+        self._extractor = extractor
+        self._buffer_size = buffer_size
+        self._buffer = bytearray()
+        self._file: Optional[IO[bytes]] = None
+        #: Позиция в файле, до которой данные записаны.
+        self.flushed = offset
+
+    @property
+    def position(self) -> int:
+        """Позиция в файле с учётом ещё не записанных данных."""
+        return self.flushed + len(self._buffer)
+
+    async def __aenter__(self) -> "ArchiveWriter":
+        """Открытие файла."""
+        loop = asyncio.get_running_loop()
+        self._file = await loop.run_in_executor(None, self._open)
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        """Запись остатка буфера и закрытие файла."""
+        loop = asyncio.get_running_loop()
+        try:
+            if self._buffer:
+                await self._flush(len(self._buffer))
+        finally:
+            if self._file is not None:
+                await loop.run_in_executor(None, self._file.close)
+
+    async def write(self, data: bytes) -> None:
+        """Добавление полученных байт.
+
+        Args:
+            data: Следующие байты файла.
+        """
+        self._buffer += data
+        if len(self._buffer) >= self._buffer_size:
+            await self._flush(
+                len(self._buffer) - self.position % WRITE_ALIGNMENT
+            )
+
+    async def _flush(self, size: int) -> None:
+        block = self._buffer
+        self._buffer = block[size:]
+        del block[size:]
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._write_block, block)
+        self.flushed += len(block)
+
+    def _open(self) -> IO[bytes]:
+        mode = "r+b" if os.path.exists(self._path) else "w+b"
+        file = open(self._path, mode)  # noqa: WPS515
+        if self._truncate:
+            file.truncate(self.flushed)
+        file.seek(self.flushed)
+        return file
+
+    def _write_block(self, block: bytearray) -> None:
+        cast(IO[bytes], self._file).write(block)
+        if self._extractor is not None:
+            self._extractor.feed(bytes(block))
@@ -0,0 +1,451 @@
+import asyncio
+import json
+import math
+import re
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from contextlib import AsyncExitStack
+from types import TracebackType
+from typing import Callable, Deque, Dict, List, Optional, Tuple, Type
+
+from .config import (
+    BACKEND_EWMA_ALPHA,
+    BACKEND_HEDGE_DEFAULT_DELAY,
+    BACKEND_HEDGE_MIN_SAMPLES,
+    BACKEND_HEDGE_PERCENTILE,
+    BACKEND_MIN_HEALTH,
+    BACKEND_PROBE_INTERVAL,
+    DOWNLOAD_BACKENDS,
+    REQUEST_SIMULTANEOUS_MAX_COUNT,
+)
+from .http_client import HttpClient, RequestKind
+from .logging import console
+from .status_poller import StatusPoller
+
+#: Количество последних задержек источника, по которым считается перцентиль.
+_LATENCY_WINDOW = 50
+
+#: Ссылка на архив в ответе steamworkshop.download.
+_DOWNLOAD_LINK = re.compile(r"""<a\s[^>]*?href\s*=\s*["']([^"']+)["']""")
+
+
+class BackendError(Exception):
+    """Источник не смог подготовить мод к скачиванию."""
+
+
+class UnsupportedModError(BackendError):
+    """Источник не умеет скачивать этот мод. Не влияет на его здоровье."""
+
+
+class DownloadBackend(ABC):
+    """Источник скачивания модов.
+
+    Хранит оценку здоровья источника (от 0 до 1) и экспоненциальное
+    скользящее среднее времени подготовки мода.
+    """
+
+    def __init__(self, name: str) -> None:
+        """Создание источника.
+
+        Args:
+            name: Название источника для логов.
+        """
+        self.name = name
+        self.health = 1.0
+        #: Скользящее среднее времени подготовки мода в секундах.
+        self.latency: Optional[float] = None
+        self.prepared = 0
+        self.failures = 0
+        self._latencies: Deque[float] = deque(maxlen=_LATENCY_WINDOW)
+        self._last_failure = 0.0
+
+    async def __aenter__(self) -> "DownloadBackend":
+        """Вход в контекст."""
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        """Выход из контекста."""
+
+    @abstractmethod
+    async def prepare(self, mod_id: int, app_id: Optional[int]) -> str:
+        """Подготовка мода к скачиванию.
+
+        Args:
+            mod_id: ID мода.
+            app_id: ID игры мода, если известен.
+
+        Raises:
+            BackendError: Мод не удалось подготовить.
+
+        Returns:
+            Адрес архива мода.
+        """
+
+    @property
+    def healthy(self) -> bool:
+        """Можно ли отправлять моды в источник.
+
+        Нездоровому источнику раз в `BACKEND_PROBE_INTERVAL` даётся мод на
+        проверку.
+        """
+        if self.health >= BACKEND_MIN_HEALTH:
+            return True
+        return time.monotonic() - self._last_failure >= BACKEND_PROBE_INTERVAL
+
+    def hedge_delay(self) -> float:
+        """Время, после которого стоит продублировать запрос в другой источник.
+
+        Returns:
+            Перцентиль `BACKEND_HEDGE_PERCENTILE` последних задержек
+            источника или `BACKEND_HEDGE_DEFAULT_DELAY`, если их мало.
+        """
+        if len(self._latencies) < BACKEND_HEDGE_MIN_SAMPLES:
+            return BACKEND_HEDGE_DEFAULT_DELAY
+        latencies = sorted(self._latencies)
+        index = int(BACKEND_HEDGE_PERCENTILE * (len(latencies) - 1))
+        return latencies[index]
+
+    def record_success(self, latency: float) -> None:
+        """Учёт успешной подготовки мода.
+
+        Args:
+            latency: Время подготовки в секундах.
+        """
+        self.prepared += 1
+        self.health += BACKEND_EWMA_ALPHA * (1 - self.health)
+        self._latencies.append(latency)
+        if self.latency is None:
+            self.latency = latency
+        else:
+            self.latency += BACKEND_EWMA_ALPHA * (latency - self.latency)
+
+    def record_failure(self) -> None:
+        """Учёт ошибки источника."""
+        self.failures += 1
+        self.health -= BACKEND_EWMA_ALPHA * self.health
+        self._last_failure = time.monotonic()
+
+
+class SteamWorkshopDownloaderIoBackend(DownloadBackend):
+    """Источник steamworkshopdownloader.io.
+
+    Создаётся запрос на скачивание, после чего сервер скачивает мод из
+    Steam, а его статус опрашивается общим `StatusPoller`.
+    """
+
+    def __init__(self, name: str, http: HttpClient, base_url: str) -> None:
+        """Создание источника.
+
+        Args:
+            name: Название источника для логов.
+            http: Общий HTTP клиент.
+            base_url: Адрес сервера.
+        """
+        super().__init__(name)
+        self._http = http
+        self._base_url = base_url
+        self._status_poller = StatusPoller(
+            http, base_url + "/api/download/status"
+        )
+        self._request_semaphore: Optional[asyncio.Semaphore] = None
+
+    async def __aexit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        """Остановка опроса статусов."""
+        await self._status_poller.__aexit__(exc_type, exc, traceback)
+
+    async def prepare(self, mod_id: int, app_id: Optional[int]) -> str:
+        """Создание запроса и ожидание подготовки мода на сервере.
+
+        Args:
+            mod_id: ID мода.
+            app_id: ID игры мода, не используется.
+
+        Returns:
+            Адрес архива мода.
+        """
+        # GET Request:
+        # https://backend-03-prd.steamworkshopdownloader.io/api/download/transmit?uuid=995afa62-18fe-4d94-9147-eb1d28b74f39
+        #
+        # Response:
+        # Content of a zip-archive
+        if self._request_semaphore is None:
+            self._request_semaphore = asyncio.Semaphore(
+                REQUEST_SIMULTANEOUS_MAX_COUNT
+            )
+        async with self._request_semaphore:
+            request_uuid = await self._make_request(mod_id)
+        await self._status_poller.wait_prepared(request_uuid)
+        return "%s/api/download/transmit?uuid=%s" % (
+            self._base_url,
+            request_uuid,
+        )
+
+    @property
+    def status_requests_sent(self) -> int:
+        """Количество запросов статуса."""
+        return self._status_poller.requests_sent
+
+    async def _make_request(self, mod_id: int) -> str:
+        # POST Request:
+        # https://backend-03-prd.steamworkshopdownloader.io/api/download/request
+        # {
+        #   "publishedFileId": 2266952591,
+        #   "collectionId": null,
+        #   "extract": true,
+        #   "hidden": false,
+        #   "direct": false,
+        #   "autodownload": false
+        # }
+        #
+        # Response:
+        # {"uuid": "995afa62-18fe-4d94-9147-eb1d28b74f39"}
+        data = {
+            "publishedFileId": mod_id,
+            "collectionId": None,
+            "extract": False,
+            "hidden": False,
+            "direct": False,
+            "autodownload": False,
+        }
+        data_dumped = json.dumps(data)
+        headers = {
+            "Content-Type": "text/plain",
+            "Content-Length": str(len(data_dumped)),
+        }
+        async with self._http.post(
+            self._base_url + "/api/download/request",
+            RequestKind.API,
+            data=data_dumped,
+            headers=headers,
+        ) as response:
+            response.raise_for_status()
+            text = await response.text()
+        return json.loads(text)["uuid"]
+
+
+class SteamWorkshopDownloadBackend(DownloadBackend):
+    """Источник steamworkshop.download.
+
+    Отдаёт ссылку на архив сразу, но ему нужен ID игры мода.
+    """
+
+    def __init__(self, name: str, http: HttpClient, base_url: str) -> None:
+        """Создание источника.
+
+        Args:
+            name: Название источника для логов.
+            http: Общий HTTP клиент.
+            base_url: Адрес сервера.
+        """
+        super().__init__(name)
+        self._http = http
+        self._base_url = base_url
+
+    async def prepare(self, mod_id: int, app_id: Optional[int]) -> str:
+        """Получение ссылки на архив мода.
+
+        Args:
+            mod_id: ID мода.
+            app_id: ID игры мода.
+
+        Raises:
+            UnsupportedModError: ID игры мода неизвестен.
+            BackendError: Сервер не вернул ссылку.
+
+        Returns:
+            Адрес архива мода.
+        """
+        if app_id is None:
+            raise UnsupportedModError("Неизвестен ID игры мода")
+        async with self._http.post(
+            self._base_url + "/online/steamonline.php",
+            RequestKind.API,
+            data={"item": str(mod_id), "app": str(app_id)},
+        ) as response:
+            response.raise_for_status()
+            text = await response.text()
+        link_match = _DOWNLOAD_LINK.search(text)
+        if link_match is None:
+            raise BackendError("Сервер не вернул ссылку на скачивание")
+        return link_match[1]
+
+
+#: Типы источников по названиям, используемым в `DOWNLOAD_BACKENDS`.
+BACKEND_TYPES: Dict[str, Callable[[str, HttpClient, str], DownloadBackend]] = {
+    "steamworkshopdownloader.io": SteamWorkshopDownloaderIoBackend,
+    "steamworkshop.download": SteamWorkshopDownloadBackend,
+}
+
+
+class BackendPool:
+    """Выбор источника для каждого мода.
+
+    Мод отправляется в самый быстрый здоровый источник. Если подготовка
+    затянулась дольше обычного для источника, то запрос дублируется в
+    следующий источник, и используется тот, что ответит первым - второй
+    запрос отменяется. При ошибке источника мод отправляется в следующий.
+    """
+
+    def __init__(self, backends: List[DownloadBackend]) -> None:
+        """Создание пула.
+
+        Args:
+            backends: Источники в порядке предпочтения.
+        """
+        self.backends = backends
+        #: Количество продублированных запросов.
+        self.hedges = 0
+        self._exit_stack = AsyncExitStack()
+
+    @classmethod
+    def from_config(
+        cls,
+        http: HttpClient,
+        backends: Optional[List[Tuple[str, str]]] = None,
+    ) -> "BackendPool":
+        """Создание пула из источников `DOWNLOAD_BACKENDS`.
+
+        Args:
+            http: Общий HTTP клиент.
+            backends: Тип источника и адрес его сервера вместо
+                `DOWNLOAD_BACKENDS`.
+
+        Returns:
+            Пул источников.
+        """
+        if backends is None:
+            backends = DOWNLOAD_BACKENDS
+        return cls(
+            [
+                BACKEND_TYPES[backend_type](
+                    "%s (%s)" % (backend_type, base_url), http, base_url
+                )
+                for backend_type, base_url in backends
+            ]
+        )
+
+    async def __aenter__(self) -> "BackendPool":
+        """Вход в контекст всех источников."""
+        for backend in self.backends:
+            await self._exit_stack.enter_async_context(backend)
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        """Выход из контекста всех источников."""
+        await self._exit_stack.aclose()
+
+    async def prepare(
+        self, mod_id: int, app_id: Optional[int]
+    ) -> Tuple[DownloadBackend, str]:
+        """Подготовка мода к скачиванию в лучшем доступном источнике.
+
+        Args:
+            mod_id: ID мода.
+            app_id: ID игры мода, если известен.
+
+        Raises:
+            BackendError: Ни один источник не подготовил мод.
+
+        Returns:
+            Источник, подготовивший мод, и адрес архива.
+        """
+        tried: List[DownloadBackend] = []
+        running: Dict["asyncio.Task[str]", DownloadBackend] = {}
+        last_error: Optional[Exception] = None
+        hedge_due = False
+        try:
+            while True:
+                if not running or hedge_due:
+                    hedge_due = False
+                    backend = self._choose(tried)
+                    if backend is not None:
+                        if running:
+                            self.hedges += 1
+                        tried.append(backend)
+                        task = asyncio.create_task(
+                            self._prepare_on(backend, mod_id, app_id)
+                        )
+                        running[task] = backend
+                if not running:
+                    raise BackendError(
+                        "Ни один источник не подготовил мод. %s" % last_error
+                    )
+
+                timeout = None
+                if len(running) == 1 and self._choose(tried) is not None:
+                    timeout = next(iter(running.values())).hedge_delay()
+                done, _ = await asyncio.wait(
+                    running,
+                    timeout=timeout,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                hedge_due = not done
+                for task in done:
+                    backend = running.pop(task)
+                    try:
+                        return backend, task.result()
+                    except Exception as err:
+                        last_error = err
+                        console.print(
+                            "Источник [cyan]%s[/cyan] не подготовил мод "
+                            "[cyan]%d[/cyan]. %s" % (backend.name, mod_id, err),
+                            style="warning",
+                        )
+        finally:
+            for task in running:
+                task.cancel()
+            await asyncio.gather(*running, return_exceptions=True)
+
+    def _choose(
+        self, exclude: List[DownloadBackend]
+    ) -> Optional[DownloadBackend]:
+        """Самый быстрый здоровый источник из неиспользованных."""
+        candidates = [
+            backend
+            for backend in self.backends
+            if backend.healthy and backend not in exclude
+        ]
+        if not candidates:
+            return None
+        return min(candidates, key=_expected_latency)
+
+    async def _prepare_on(
+        self, backend: DownloadBackend, mod_id: int, app_id: Optional[int]
+    ) -> str:
+        started_at = time.monotonic()
+        try:
+            url = await backend.prepare(mod_id, app_id)
+        except UnsupportedModError:
+            raise
+        except Exception:
+            backend.record_failure()
+            raise
+        backend.record_success(time.monotonic() - started_at)
+        return url
+
+
+def _expected_latency(backend: DownloadBackend) -> float:
+    """Задержка источника с поправкой на его здоровье.
+
+    Источник, задержка которого ещё неизвестна, выбирается первым, пока у
+    него не было ошибок.
+    """
+    if backend.latency is None:
+        return 0 if backend.failures == 0 else math.inf
+    return backend.latency / max(backend.health, 1e-6)
@@ -1,19 +1,42 @@
 import json
 import os
-from typing import Dict, TypedDict, Union
+import sqlite3
+import threading
+from typing import Dict, List, Optional, TypedDict, Union
 
-from schema import And, Schema, SchemaError, Use
+from schema import And
+from schema import Optional as SchemaOptional
+from schema import Schema, SchemaError, Use
 
+from .config import MOD_CACHE_DB_PATH
 from .logging import console
 
+#: Суффикс, который получает файл кеша JSON после переноса в базу.
+MIGRATED_SUFFIX = ".migrated"
 
-class ModCache(TypedDict):
-    """Кешированные данные о моде."""
 
+class _ModCacheRequired(TypedDict):
     last_update_date: str
 
 
-cache_schema = Schema({Use(int): {"last_update_date": And(str, len)}})
+class ModCache(_ModCacheRequired, total=False):
+    """Кешированные данные о моде."""
+
+    #: Даты прошлых обновлений мода, от старых к новым, включая последнюю.
+    #: По ним оценивается, как часто мод обновляется.
+    update_history: List[str]
+    #: Время последнего обновления, unix time, если оно известно.
+    time_updated: int
+
+
+cache_schema = Schema(
+    {
+        Use(int): {
+            "last_update_date": And(str, len),
+            SchemaOptional("update_history"): [And(str, len)],
+        }
+    }
+)
 
 
 def load_cache(path: Union[str, os.PathLike]) -> Dict[int, ModCache]:
@@ -43,15 +66,156 @@ def load_cache(path: Union[str, os.PathLike]) -> Dict[int, ModCache]:
         return {}
 
 
-def dump_cache(
-    cache: Dict[int, ModCache], path: Union[str, os.PathLike]
-) -> None:
-    """Запись кеша в файл.
+class ModCacheStore:
+    """Кеш установленных модов всех конфигураций в базе SQLite.
 
-    Args:
-        cache: Кеш.
-        path: Путь к файлу, куда будет записан кеш.
+    Одна строка на мод конфигурации. Каждый мод записывается отдельной
+    транзакцией сразу после установки, поэтому прерванный запуск не теряет
+    уже установленные моды. База в режиме WAL: запись не блокирует чтение.
+    Соединение открывается при первом обращении.
     """
-    console.print("Кеширование [cyan]%s" % path, style="info")
-    with open(path, "w") as cache_file:
-        json.dump(cache, cache_file, indent=4, sort_keys=True)
+
+    def __init__(
+        self, path: Union[str, os.PathLike] = MOD_CACHE_DB_PATH
+    ) -> None:
+        """Создание хранилища.
+
+        Args:
+            path: Путь к файлу базы.
+        """
+        self._path = path
+        self._connection: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def load(
+        self,
+        config: str,
+        legacy_path: Optional[Union[str, os.PathLike]] = None,
+    ) -> Dict[int, ModCache]:
+        """Загрузка кеша конфигурации.
+
+        Если в базе нет данных конфигурации, а есть её файл кеша JSON
+        прошлых версий, то он переносится в базу и переименовывается.
+
+        Args:
+            config: Название конфигурации.
+            legacy_path: Путь к файлу кеша JSON конфигурации.
+
+        Returns:
+            Кеш по ID модов.
+        """
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT mod_id, last_update_date, update_history, "
+                "time_updated FROM mods WHERE config = ?",
+                (config,),
+            )
+            cache: Dict[int, ModCache] = {}
+            for mod_id, last_update_date, update_history, time_updated in rows:
+                entry: ModCache = {"last_update_date": last_update_date}
+                if update_history is not None:
+                    entry["update_history"] = json.loads(update_history)
+                if time_updated is not None:
+                    entry["time_updated"] = time_updated
+                cache[mod_id] = entry
+        if cache:
+            return cache
+        if legacy_path is not None and os.path.exists(legacy_path):
+            return self._migrate(config, legacy_path)
+        console.print(
+            "Кеш отсутствует. Все моды будут заново скачаны", style="warning"
+        )
+        return {}
+
+    def put(self, config: str, mod_id: int, entry: ModCache) -> None:
+        """Запись данных мода конфигурации отдельной транзакцией.
+
+        Args:
+            config: Название конфигурации.
+            mod_id: ID мода.
+            entry: Данные мода.
+        """
+        self.put_many(config, {mod_id: entry})
+
+    def put_many(self, config: str, cache: Dict[int, ModCache]) -> None:
+        """Запись данных нескольких модов конфигурации одной транзакцией.
+
+        Args:
+            config: Название конфигурации.
+            cache: Данные модов по ID модов.
+        """
+        rows = [
+            (
+                config,
+                mod_id,
+                entry["last_update_date"],
+                (
+                    json.dumps(entry["update_history"])
+                    if "update_history" in entry
+                    else None
+                ),
+                entry.get("time_updated"),
+            )
+            for mod_id, entry in cache.items()
+        ]
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.executemany(
+                    "INSERT OR REPLACE INTO mods "
+                    "(config, mod_id, last_update_date, update_history, "
+                    "time_updated) VALUES (?, ?, ?, ?, ?)",
+                    rows,
+                )
+
+    def close(self) -> None:
+        """Закрытие соединения с базой."""
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def _migrate(
+        self, config: str, legacy_path: Union[str, os.PathLike]
+    ) -> Dict[int, ModCache]:
+        try:
+            cache = load_cache(legacy_path)
+        except (OSError, ValueError) as err:
+            console.print(
+                "Не удалось прочитать кеш [cyan]%s[/cyan], он не будет "
+                "перенесён. Все моды будут заново скачаны. %s"
+                % (legacy_path, err),
+                style="warning",
+            )
+            return {}
+        self.put_many(config, cache)
+        os.replace(legacy_path, str(legacy_path) + MIGRATED_SUFFIX)
+        console.print(
+            "Кеш [cyan]%s[/cyan] перенесён в [cyan]%s"
+            % (legacy_path, self._path),
+            style="info",
+        )
+        return cache
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is not None:
+            return self._connection
+        os.makedirs(os.path.dirname(self._path) or ".", exist_ok=True)
+        # Соединение общее для цикла событий и пулов потоков, доступ к нему
+        # защищён блокировкой
+        connection = sqlite3.connect(self._path, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        # В режиме WAL транзакция с NORMAL не теряется при падении программы,
+        # а запись не ждёт сброса на диск
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS mods ("
+            "config TEXT NOT NULL, "
+            "mod_id INTEGER NOT NULL, "
+            "last_update_date TEXT NOT NULL, "
+            "update_history TEXT, "
+            "time_updated INTEGER, "
+            "PRIMARY KEY (config, mod_id))"
+        )
+        self._connection = connection
+        return connection
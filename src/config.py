@@ -1,5 +1,5 @@
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional, Tuple
 
 #: Версия
 VERSION = "1.0.3"
@@ -7,24 +7,286 @@ VERSION = "1.0.3"
 #: Буфер в байтах для скачивания файлов с сервера.
 DOWNLOAD_CHUNK_SIZE = 16 * 1024  # noqa: WPS432
 
+#: Минимальный размер блока, которым скачиваемый архив пишется на диск.
+#: Полученные части копятся в памяти, пока не наберётся блок.
+DOWNLOAD_WRITE_BUFFER_SIZE = 1024 * 1024  # noqa: WPS432
+
 #: Папка, в которой будут создаваться файлы кешей конфигураций модов,
 #: хранящие информацию о дате последнего обновления модов.
 CACHE_DIR = Path(".cache")
 
-#: Путь к временной папке для скачивания модов, которая будет потом удалена.
+#: Источник информации о модах: "bulk" - запрос информации о многих модах
+#: сразу через `GetPublishedFileDetails`, "page" - разбор страницы каждого
+#: мода на steamworkshop.download. Моды, о которых "bulk" не вернул
+#: информацию, запрашиваются по страницам.
+METADATA_BACKEND = "bulk"
+
+#: Адрес метода Steam Web API, возвращающего информацию о многих модах.
+BULK_METADATA_URL = "https://api.steampowered.com/ISteamRemoteStorage/GetPublishedFileDetails/v1/"  # noqa: E501
+
+#: Максимальное количество модов в одном запросе `GetPublishedFileDetails`.
+BULK_METADATA_BATCH_SIZE = 100
+
+#: Шаблон адреса страницы мода на steamworkshop.download.
+MOD_PAGE_URL = "http://steamworkshop.download/download/view/{}"
+
+#: Смещение от UTC часового пояса, в котором даты последнего обновления
+#: записаны на странице мода, в секундах.
+MOD_PAGE_UTC_OFFSET = 3 * 60 * 60
+
+#: Источники скачивания модов: тип источника и адрес его сервера.
+#: Мод отправляется в самый быстрый здоровый источник.
+DOWNLOAD_BACKENDS: List[Tuple[str, str]] = [
+    (
+        "steamworkshopdownloader.io",
+        "https://backend-03-prd.steamworkshopdownloader.io",
+    ),
+    ("steamworkshop.download", "http://steamworkshop.download"),
+]
+
+#: Вес нового значения в скользящих средних здоровья и задержки источника.
+BACKEND_EWMA_ALPHA = 0.3
+
+#: Источник со здоровьем ниже этого значения не получает новые моды.
+BACKEND_MIN_HEALTH = 0.25
+
+#: Интервал, с которым нездоровому источнику даётся мод на проверку.
+BACKEND_PROBE_INTERVAL = 60  # секунды
+
+#: Перцентиль задержек источника, после которого запрос подготовки мода
+#: дублируется в другой источник.
+BACKEND_HEDGE_PERCENTILE = 0.9
+
+#: Минимальное количество известных задержек источника для подсчёта
+#: перцентиля. Пока их меньше, используется `BACKEND_HEDGE_DEFAULT_DELAY`.
+BACKEND_HEDGE_MIN_SAMPLES = 5
+
+#: Время, после которого запрос дублируется, пока задержки источника
+#: неизвестны.
+BACKEND_HEDGE_DEFAULT_DELAY = 30  # секунды
+
+#: Файл кеша информации со страниц модов, общий для всех конфигураций.
+METADATA_CACHE_PATH = CACHE_DIR / "metadata.json"
+
+#: Время, в течение которого информация о моде берётся из кеша без запроса
+#: к серверу. После него страница мода перепроверяется условным запросом.
+METADATA_CACHE_TTL = 60 * 60  # секунды
+
+#: Файл с результатом последней проверки версии программы на GitHub.
+VERSION_CHECK_CACHE_PATH = CACHE_DIR / "latest_version.json"
+
+#: Время, в течение которого результат проверки версии не обновляется.
+#: Устаревший результат обновляется в фоне и используется при следующем
+#: запуске.
+VERSION_CHECK_TTL = 24 * 60 * 60  # секунды
+
+#: База SQLite с кешем установленных модов всех конфигураций.
+MOD_CACHE_DB_PATH = CACHE_DIR / "mods.sqlite3"
+
+#: Количество последних дат обновления мода, хранимых в кеше конфигурации.
+UPDATE_HISTORY_SIZE = 10
+
+#: Файл, в который режим наблюдения (`--watch`) записывает своё состояние.
+WATCH_STATUS_PATH = CACHE_DIR / "watch_status.json"
+
+#: Интервал проверки файлов конфигураций на изменения в режиме наблюдения.
+WATCH_CONFIG_POLL_INTERVAL = 10  # секунды
+
+#: Доля среднего интервала между обновлениями мода, через которую он
+#: проверяется снова в режиме наблюдения. Часто обновляемые моды
+#: проверяются чаще.
+WATCH_CHECK_FRACTION = 0.1
+
+#: Минимальный интервал проверки мода в режиме наблюдения. Не меньше
+#: `METADATA_CACHE_TTL`, иначе информация о моде берётся из кеша.
+WATCH_MIN_CHECK_INTERVAL = METADATA_CACHE_TTL
+
+#: Максимальный интервал проверки мода в режиме наблюдения.
+WATCH_MAX_CHECK_INTERVAL = 24 * 60 * 60  # секунды
+
+#: Папка, в которой хранятся манифесты установленных файлов модов.
+#: По ним при обновлении мода перезаписываются только изменившиеся файлы.
+MANIFESTS_DIR = CACHE_DIR / "manifests"
+
+#: Папка общего для всех конфигураций хранилища скачанных архивов модов.
+ARCHIVE_STORE_DIR = Path(".store")
+
+#: Максимальный общий размер архивов в хранилище в байтах. При превышении
+#: удаляются давно не использовавшиеся архивы.
+ARCHIVE_STORE_MAX_SIZE = 10 * 1024 * 1024 * 1024  # noqa: WPS432
+
+#: Установка модов жёсткими ссылками на файлы той же версии мода,
+#: уже установленной в папку другой конфигурации.
+LINK_INSTALLED_MODS = True
+
+#: Путь к временной папке для скачивания модов. Скачанные архивы удаляются
+#: после завершения работы, а недокачанные остаются в ней, чтобы продолжить
+#: их скачивание при следующем запуске.
 TEMP_DOWNLOAD_PATH = Path(".temp")
 
 #: Частота опроса сервера о скачивании мода.
 #: Опрос будет повторяться, пока мод на сервере не скачается,
 #: после чего он начнёт скачиваться во временную папку.
+#: Это начальный интервал - для долго подготавливаемых модов он
+#: увеличивается в `CHECK_STATUS_BACKOFF_FACTOR` раз после каждого опроса.
 CHECK_STATUS_INTERVAL = 0.5  # секунды
 
+#: Максимальный интервал опроса сервера о скачивании мода.
+CHECK_STATUS_MAX_INTERVAL = 5  # секунды
+
+#: Множитель интервала опроса сервера о скачивании мода.
+CHECK_STATUS_BACKOFF_FACTOR = 1.5
+
+#: Количество неудачных опросов подряд, после которого ожидание подготовки
+#: мода завершается ошибкой. После каждой ошибки опрос откладывается так
+#: же, как для долго подготавливаемых модов.
+CHECK_STATUS_MAX_ERRORS = 3
+
+#: Максимальное количество модов, информация о которых
+#: запрашивается одновременно.
+METADATA_SIMULTANEOUS_MAX_COUNT = 20
+
+#: Максимальное количество одновременно создаваемых запросов на скачивание
+#: в каждом источнике steamworkshopdownloader.io.
+REQUEST_SIMULTANEOUS_MAX_COUNT = 5
+
+#: Максимальное количество модов, одновременно ожидающих окончания
+#: скачивания на сервере.
+PREPARE_SIMULTANEOUS_MAX_COUNT = 50
+
+#: Начальное количество одновременно скачиваемых модов. Дальше оно
+#: подбирается по скорости скачивания и ошибкам в границах
+#: `SIMULTANEOUS_DOWNLOAD_MIN_COUNT` и `SIMULTANEOUS_DOWNLOAD_MAX_COUNT`.
+SIMULTANEOUS_DOWNLOAD_INITIAL_COUNT = 5
+
+#: Минимальное количество одновременно скачиваемых модов.
+SIMULTANEOUS_DOWNLOAD_MIN_COUNT = 1
+
 #: Максимальное количество одновременно скачиваемых модов.
-SIMULTANEOUS_DOWNLOAD_MAX_COUNT = 5
+SIMULTANEOUS_DOWNLOAD_MAX_COUNT = 16
+
+#: Максимальное количество модов на стадии скачивания: скачиваемые и
+#: ожидающие слота скачивания. Сколько из них скачивается одновременно,
+#: решает ограничитель, а из ожидающих планировщик выбирает следующий мод,
+#: поэтому их должно быть больше `SIMULTANEOUS_DOWNLOAD_MAX_COUNT`.
+DOWNLOAD_STAGE_MAX_COUNT = SIMULTANEOUS_DOWNLOAD_MAX_COUNT * 2
+
+#: Длина окна, за которое замеряется скорость скачивания для подбора
+#: количества одновременно скачиваемых модов.
+ADAPTIVE_WINDOW = 2  # секунды
+
+#: Во сколько раз уменьшается количество одновременных скачиваний при
+#: ошибках или падении скорости.
+ADAPTIVE_DECREASE_FACTOR = 0.5
+
+#: Относительный прирост скорости за окно, при котором количество
+#: одновременных скачиваний увеличивается на 1.
+ADAPTIVE_THROUGHPUT_GAIN = 0.05
+
+#: Относительное падение скорости за окно, при котором количество
+#: одновременных скачиваний уменьшается.
+ADAPTIVE_THROUGHPUT_DROP = 0.3
+
+#: Порядок, в котором ожидающие моды начинают скачиваться: "fifo" - в
+#: порядке готовности, "sjf" - сначала меньшие архивы, чтобы быстрее
+#: установить как можно больше модов, "fair" - поровну байт каждой
+#: конфигурации, а внутри конфигурации сначала меньшие архивы.
+#: Размер архива берётся из информации о моде или из `Content-Length`
+#: недокачанного архива, неизвестный размер считается средним.
+DOWNLOAD_SCHEDULING = "sjf"
+
+#: Общее ограничение скорости скачивания всех модов в байтах в секунду.
+#: None - без ограничения.
+BANDWIDTH_LIMIT: Optional[int] = None
+
+#: Максимальный размер архива в байтах, который скачивается в память и
+#: распаковывается из неё, не попадая во временную папку. 0 - всегда
+#: скачивать на диск.
+ARCHIVE_IN_MEMORY_MAX_SIZE = 1024 * 1024  # noqa: WPS432
+
+#: Общий предел памяти в байтах под архивы, скачиваемые в память. Пока он
+#: исчерпан, небольшие архивы скачиваются на диск.
+ARCHIVE_MEMORY_BUDGET = 64 * 1024 * 1024  # noqa: WPS432
+
+#: Максимальное количество одновременно распаковываемых модов.
+#: Распаковка идёт в пуле потоков такого же размера, независимо
+#: от скачивания.
+EXTRACT_SIMULTANEOUS_MAX_COUNT = 2
+
+#: Количество потоков, разбирающих страницы модов вне цикла событий.
+PAGE_PARSE_WORKERS_COUNT = 2
+
+#: Размер очереди модов перед каждой стадией обработки.
+PIPELINE_QUEUE_SIZE = 10
 
 #: Ограничение времени скачивания чанка
 #: размером `DOWNLOAD_CHUNK_SIZE` в секундах.
 CHUNK_DOWNLOAD_TIMEOUT = 5
 
+#: Количество попыток продолжить скачивание с места остановки при обрыве
+#: соединения по умолчанию в `download_resumable`. Загрузчик модов делает
+#: одну попытку, а повторяет её через `RetryBudget`.
+DOWNLOAD_RESUME_ATTEMPTS = 3
+
+#: Количество частей, на которые делится архив при скачивании. Части
+#: скачиваются одновременно отдельными запросами с заголовком `Range`.
+#: 1 - скачивание одним потоком.
+DOWNLOAD_SEGMENTS_COUNT = 1
+
+#: Минимальный размер архива в байтах, начиная с которого он скачивается
+#: по частям.
+SEGMENTED_DOWNLOAD_MIN_SIZE = 64 * 1024 * 1024  # noqa: WPS432
+
+#: Распаковка архива по мере скачивания. Если архив нельзя распаковать
+#: потоком, то он распаковывается после скачивания.
+STREAMING_EXTRACTION = False
+
 #: Общее ограничение времени скачивания мода.
 FILE_DOWNLOAD_TOTAL_TIMEOUT: Optional[int] = None
+
+#: Максимальное количество одновременно открытых HTTP соединений.
+HTTP_CONNECTIONS_LIMIT = 100
+
+#: Максимальное количество одновременно открытых соединений с одним хостом.
+HTTP_CONNECTIONS_PER_HOST_LIMIT = 20
+
+#: Время хранения результатов DNS запросов в секундах.
+HTTP_DNS_CACHE_TTL = 300
+
+#: Время, в течение которого неиспользуемое соединение остаётся открытым
+#: для повторного использования, в секундах.
+HTTP_KEEPALIVE_TIMEOUT = 30
+
+#: Ограничение времени установки соединения в секундах.
+HTTP_CONNECT_TIMEOUT = 10
+
+#: Общее ограничение времени получения страницы с информацией о моде.
+METADATA_REQUEST_TIMEOUT = 30
+
+#: Общее ограничение времени запросов к API сервера скачивания
+#: (создание запроса, проверка статуса).
+API_REQUEST_TIMEOUT = 30
+
+#: Количество запросов в секунду к одному серверу. Запросы сверх этого
+#: ожидают своей очереди, а не отправляются сразу.
+RATE_LIMIT_PER_HOST = 10
+
+#: Количество запросов к одному серверу, которые можно отправить подряд
+#: без ожидания.
+RATE_LIMIT_BURST = 20
+
+#: Максимальное количество попыток выполнить шаг обработки мода
+#: (подготовку на сервере, скачивание, запрос информации).
+RETRY_MAX_ATTEMPTS = 4
+
+#: Задержка перед первым повтором шага. Перед каждым следующим повтором
+#: она удваивается и случайно уменьшается, чтобы повторы разных модов
+#: не совпадали по времени.
+RETRY_BASE_DELAY = 1  # секунды
+
+#: Максимальная задержка перед повтором шага.
+RETRY_MAX_DELAY = 30  # секунды
+
+#: Общее количество повторов за один запуск. После его исчерпания
+#: ошибки больше не повторяются, чтобы не нагружать неработающий сервер.
+RETRY_BUDGET = 50
@@ -1,44 +1,85 @@
 import asyncio
-import json
+import io
 import os
 import re
-from dataclasses import dataclass
-from functools import lru_cache
+import shutil
+from dataclasses import dataclass, field
+from functools import partial
 from pathlib import Path
-from typing import Dict, List, Optional, Set, Tuple
-from zipfile import ZipFile
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+)
 
-import aiofiles
-import aiohttp
-from bs4 import BeautifulSoup
 from rich.table import Table
 
-from .cache import ModCache, dump_cache, load_cache
+from .backends import DownloadBackend
+from .cache import ModCache
 from .config import (
+    ARCHIVE_IN_MEMORY_MAX_SIZE,
     CACHE_DIR,
-    CHECK_STATUS_INTERVAL,
-    CHUNK_DOWNLOAD_TIMEOUT,
-    DOWNLOAD_CHUNK_SIZE,
-    FILE_DOWNLOAD_TOTAL_TIMEOUT,
-    SIMULTANEOUS_DOWNLOAD_MAX_COUNT,
+    DOWNLOAD_STAGE_MAX_COUNT,
+    EXTRACT_SIMULTANEOUS_MAX_COUNT,
+    LINK_INSTALLED_MODS,
+    MANIFESTS_DIR,
+    METADATA_SIMULTANEOUS_MAX_COUNT,
+    PIPELINE_QUEUE_SIZE,
+    PREPARE_SIMULTANEOUS_MAX_COUNT,
+    STREAMING_EXTRACTION,
     TEMP_DOWNLOAD_PATH,
+    UPDATE_HISTORY_SIZE,
 )
 from .game_cfg import GameConfig
+from .installer import Manifest, install_mod, link_mod_tree, verify_install
 from .logging import console
+from .metadata import (
+    BulkMetadataBackend,
+    MetadataBackend,
+    PageMetadataBackend,
+    is_same_update,
+)
+from .pipeline import Pipeline
+from .scheduler import Job
+from .session import DownloadSession
+from .stream_unzip import StreamingExtractor
+from .transfer import (
+    ArchiveTooLargeError,
+    download_resumable,
+    download_to_memory,
+    remaining_size,
+)
+
+#: Числовой префикс названия папки мода - ID мода.
+_FOLDER_MOD_ID = re.compile(r"^(\d+)(?:_|$)")
 
 
 @dataclass
 class ModInfo:
     """Информация о моде.
 
-    Хранит название, id и UUID запроса на скачивание, назначаемый позже.
+    Хранит название, id, размер архива и ID игры, если известны, а также
+    назначаемые позже источник и адрес архива и путь к скачанному архиву.
+    Для повреждённой установки хранит пути повреждённых файлов, для
+    небольшого архива - его содержимое, если он скачан в память.
     """
 
     name: str
     mod_id: int
     last_update_date: str
-    # file_size: int = -1
-    request_uuid: Optional[str] = None
+    file_size: Optional[int] = None
+    app_id: Optional[int] = None
+    time_updated: Optional[int] = None
+    download_backend: Optional[DownloadBackend] = None
+    download_url: Optional[str] = None
+    archive_path: Optional[str] = None
+    damaged_files: Optional[List[str]] = None
+    archive_data: Optional[bytearray] = field(default=None, repr=False)
 
     @property
     def filename(self) -> str:
@@ -60,51 +101,145 @@ class ModInfo:
         return self.mod_id
 
 
+def _is_cached_update(cached: ModCache, mod: ModInfo) -> bool:
+    """Проверка на то, что в кеше записано последнее обновление мода."""
+    return is_same_update(
+        cached["last_update_date"],
+        cached.get("time_updated"),
+        mod.last_update_date,
+        mod.time_updated,
+    )
+
+
 class Downloader:
     """Загрузчик модов конфигурации игры."""
 
-    def __init__(self, config: GameConfig) -> None:
+    def __init__(self, config: GameConfig, session: DownloadSession) -> None:
         """Создание загрузчика.
 
         Args:
             config: Конфигурация игры.
+            session: Ресурсы, общие для всех конфигураций запуска.
         """
         self._config = config
+        self._session = session
         self._last_mod_update_cache: Dict[str, str] = {}
+        self._decisions: List[Tuple[ModInfo, Tuple[bool, str]]] = []
+        #: Файлы модов, распакованных во временную папку во время скачивания,
+        #: по ID модов.
+        self._staged_mods: Dict[int, Manifest] = {}
+        #: Папки модов в папке конфигурации по ID модов.
+        self._installed_folders: Optional[Dict[int, List[str]]] = None
         if not os.path.exists(CACHE_DIR):
             os.mkdir(CACHE_DIR)
-        self._cache = load_cache(self._cache_file_path)
+        self._cache = session.mod_cache.load(config.name, self._cache_file_path)
 
-    async def run(self) -> None:
-        """Запуск загрузчика.
+    @property
+    def config(self) -> GameConfig:
+        """Конфигурация игры."""
+        return self._config
 
-        Процесс работы состоит из 5-ти шагов:
-        1. Сбор информации о модах (названия, даты последнего обновления).
-        2. Проверка с использованием кеша на то, нужно ли скачивать мод.
+    @property
+    def cache(self) -> Dict[int, ModCache]:
+        """Кеш установленных модов конфигурации по ID модов."""
+        return self._cache
 
-        3. Скачивание отфильтрованные модов. Ограниченное количество модов могут
-            скачиваться одновременно.
+    async def run(self, mod_ids: Optional[Iterable[int]] = None) -> None:
+        """Запуск загрузчика в открытой сессии.
 
-        4. Разархивация скачанных модов.
-        5. Обновление кеша.
+        Моды проходят через конвейер из стадий:
+        1. Сбор информации о моде (название, дата последнего обновления).
+           Информация запрашивается сразу для пачки модов, если источник
+           это поддерживает.
+        2. Проверка с использованием кеша на то, нужно ли скачивать мод.
+           В режиме проверки установленных файлов (`verify`) установленный
+           мод последней версии сверяется со своим манифестом, и
+           повреждённые файлы переустанавливаются.
+        3. Подготовка мода к скачиванию в самом быстром здоровом источнике.
+           Если подготовка затянулась, то запрос дублируется в другой
+           источник.
+        4. Скачивание мода во временную папку и перенос архива в общее
+           хранилище архивов.
+        5. Разархивация мода.
+
+        Стадии 3-4 пропускаются, если архив этой версии мода уже есть в общем
+        хранилище архивов. Если та же версия мода нужна нескольким
+        конфигурациям, обрабатываемым одновременно, то стадии 3-4
+        выполняются для неё один раз.
+
+        Частота запросов к каждому серверу ограничена. Упавшие стадии 1, 3 и
+        4 повторяются с растущей задержкой, пока не кончится общий на запуск
+        запас повторов.
+
+        У каждой стадии свой предел количества одновременно обрабатываемых
+        модов. Количество одновременно скачиваемых модов подбирается по
+        скорости скачивания и ошибкам, а порядок скачивания задаётся
+        `DOWNLOAD_SCHEDULING`. Общая скорость скачивания может быть
+        ограничена `BANDWIDTH_LIMIT`. Мод переходит на следующую стадию, не
+        дожидаясь остальных. Распаковка идёт в отдельном пуле потоков,
+        поэтому моды распаковываются одновременно со скачиванием остальных.
+        Страницы модов тоже разбираются в пуле потоков, чтобы не задерживать
+        скачивание. Мод записывается в кеш только после успешной распаковки,
+        сразу, отдельной транзакцией.
+
+        Args:
+            mod_ids: ID модов конфигурации, которые нужно проверить.
+                None - все моды конфигурации.
         """
-        console.print("Получение информации о модах", style="info")
-        mod_infos: List[ModInfo] = await asyncio.gather(
-            *[self._get_mod_info(mod_id) for mod_id in self._config.mods]
+        console.print(
+            "Получение информации о модах [cyan]%s" % self._config.name,
+            style="info",
+        )
+        self._decisions.clear()
+        # Папки модов могли измениться с прошлого запуска
+        self._installed_folders = None
+
+        metadata_backend = self._make_metadata_backend()
+        pipeline = Pipeline()
+        pipeline.add_stage(
+            "получение информации",
+            partial(self._fetch_mod_infos, metadata_backend),
+            METADATA_SIMULTANEOUS_MAX_COUNT,
+            PIPELINE_QUEUE_SIZE,
+            expand=True,
+        )
+        pipeline.add_stage(
+            "проверка",
+            self._check_mod,
+            EXTRACT_SIMULTANEOUS_MAX_COUNT if self._session.verify else 1,
+            PIPELINE_QUEUE_SIZE,
+        )
+        pipeline.add_stage(
+            "подготовка на сервере",
+            self._prepare_mod,
+            PREPARE_SIMULTANEOUS_MAX_COUNT,
+            PIPELINE_QUEUE_SIZE,
+        )
+        # Подготовленные моды ждут слота скачивания в ограничителе, где
+        # планировщик выбирает, какой из них скачивать следующим
+        pipeline.add_stage(
+            "скачивание",
+            self._transfer_mod,
+            DOWNLOAD_STAGE_MAX_COUNT,
+            PIPELINE_QUEUE_SIZE,
+        )
+        pipeline.add_stage(
+            "распаковка",
+            self._extract_mod,
+            EXTRACT_SIMULTANEOUS_MAX_COUNT,
+            PIPELINE_QUEUE_SIZE,
+        )
+        mod_ids = list(self._config.mods if mod_ids is None else mod_ids)
+        batch_size = metadata_backend.batch_size
+        await pipeline.run(
+            mod_ids[start : start + batch_size]
+            for start in range(0, len(mod_ids), batch_size)
         )
 
-        mods_and_download_reasons: List[Tuple[bool, str]] = [
-            self._mod_has_to_be_redownloaded(mod) for mod in mod_infos
-        ]
-        mod_infos_for_downloading: List[ModInfo] = []
         table = Table("ID", "Мод", "Описание")
-
         for mod, reason in sorted(
-            zip(mod_infos, mods_and_download_reasons),
-            key=lambda item: item[0].name,
+            self._decisions, key=lambda item: item[0].name
         ):
-            if reason[0]:
-                mod_infos_for_downloading.append(mod)
             table.add_row(
                 str(mod.mod_id),
                 mod.name,
@@ -112,15 +247,18 @@ class Downloader:
                 style=("warning" if reason[0] else "info"),
             )
         console.print(table)
-        if len(mod_infos_for_downloading) == 0:
+        if not any(reason[0] for _, reason in self._decisions):
             console.print("Все моды установлены последней версии", style="info")
             return
 
-        self._extract_mods(await self._download_mods(mod_infos_for_downloading))
-        dump_cache(self._cache, self._cache_file_path)
+    def _list_mods_in_cfg_download_path(self) -> Dict[int, List[str]]:
+        """Папки модов в папке конфигурации по ID модов.
 
-    @lru_cache(1)
-    def _list_mods_in_cfg_download_path(self) -> Set[str]:
+        ID мода - числовой префикс названия папки, поэтому папка мода
+        находится, даже если автор мода сменил его название.
+        """
+        if self._installed_folders is not None:
+            return self._installed_folders
         # Проверка на наличие папки и создание в случае её отсутствия
         if not os.path.exists(self._config.download_path):
             console.print(
@@ -130,16 +268,96 @@ class Downloader:
             )
             os.mkdir(self._config.download_path)
         # Список установленных модов в этой папке
-        mods = filter(
-            lambda path: os.path.isdir(
-                os.path.join(self._config.download_path, path)
-            ),
-            os.listdir(self._config.download_path),
-        )
-        return set(mods)
+        folders: Dict[int, List[str]] = {}
+        for entry in os.scandir(self._config.download_path):
+            match = _FOLDER_MOD_ID.match(entry.name)
+            if match is not None and entry.is_dir():
+                folders.setdefault(int(match.group(1)), []).append(entry.name)
+        self._installed_folders = folders
+        return folders
+
+    def _adopt_installed_folder(self, mod: ModInfo) -> None:
+        """Поиск папки мода по ID, если у мода сменилось название.
+
+        Папка со старым названием переименовывается, а не скачивается
+        заново. Если папок мода несколько, то лишние удаляются при
+        `prune` или о них выводится предупреждение.
+        """
+        folders = self._list_mods_in_cfg_download_path().get(mod.mod_id)
+        if not folders:
+            return
+        download_path = self._config.download_path
+        if mod.filename not in folders:
+            previous = max(
+                folders,
+                key=lambda name: os.path.getmtime(
+                    os.path.join(download_path, name)
+                ),
+            )
+            try:
+                os.rename(
+                    os.path.join(download_path, previous),
+                    self._get_mod_to_extract_path(mod),
+                )
+            except OSError as err:
+                console.print(
+                    "Не удалось переименовать папку [cyan]%s[/cyan]. %s"
+                    % (previous, err),
+                    style="warning",
+                )
+                return
+            console.print(
+                "Мод переименован: [cyan]%s[/cyan] -> [cyan]%s"
+                % (previous, mod.filename),
+                style="info",
+            )
+            folders[folders.index(previous)] = mod.filename
+            cached = self._cache.get(mod.mod_id)
+            if cached is not None:
+                self._session.archive_store.add_install(
+                    mod.mod_id,
+                    cached["last_update_date"],
+                    self._get_mod_to_extract_path(mod),
+                    self._get_mod_manifest_path(mod),
+                )
+
+        stale = [name for name in folders if name != mod.filename]
+        if not stale:
+            return
+        if not self._session.prune:
+            console.print(
+                "Найдены лишние папки мода [cyan]%s[/cyan]: %s. Чтобы "
+                "удалить их, запустите с [cyan]--prune"
+                % (mod.name, ", ".join(stale)),
+                style="warning",
+            )
+            return
+        for name in stale:
+            console.print(
+                "Удаление лишней папки [cyan]%s" % name, style="warning"
+            )
+            shutil.rmtree(os.path.join(download_path, name))
+            folders.remove(name)
 
     def _dump_mod_to_cache(self, mod: ModInfo) -> None:
-        self._cache[mod.mod_id] = {"last_update_date": mod.last_update_date}
+        history: List[str] = []
+        cached = self._cache.get(mod.mod_id)
+        if cached is not None:
+            history = cached.get("update_history", [cached["last_update_date"]])
+        if history and cached is not None and _is_cached_update(cached, mod):
+            # Та же дата, записанная другим источником информации
+            history[-1] = mod.last_update_date
+        elif not history or history[-1] != mod.last_update_date:
+            history.append(mod.last_update_date)
+        entry: ModCache = {
+            "last_update_date": mod.last_update_date,
+            "update_history": history[-UPDATE_HISTORY_SIZE:],
+        }
+        if mod.time_updated is not None:
+            entry["time_updated"] = mod.time_updated
+        self._cache[mod.mod_id] = entry
+        # Мод записывается сразу: прерванный запуск не теряет установленные
+        self._session.mod_cache.put(self._config.name, mod.mod_id, entry)
 
     def _mod_has_to_be_redownloaded(self, mod: ModInfo) -> Tuple[bool, str]:
         """Проверка на то, нужно ли скачивать мод.
@@ -157,7 +375,8 @@ class Downloader:
             в противном случае с описанием причины, почему нужно перекачать.
         """
         # Проверка на то, что мод находится в установочном пути
-        if mod.filename not in self._list_mods_in_cfg_download_path():
+        folders = self._list_mods_in_cfg_download_path().get(mod.mod_id, [])
+        if mod.filename not in folders:
             return (True, "Не был установлен ранее")
 
         # Проверка на наличие кешированных данных о моде
@@ -166,269 +385,423 @@ class Downloader:
             return (True, "В кеше не найдены данные")
 
         # Проверка на соответствие даты последнего обновления мода
-        cached_last_update_date: str = cached_mod_data["last_update_date"]
-        mod_is_outdated = cached_last_update_date != mod.last_update_date
-        if mod_is_outdated:
+        if not _is_cached_update(cached_mod_data, mod):
             return (True, "Вышло новое обновление")
 
         return (False, "Нет обновлений")
 
     @property
     def _cache_file_path(self) -> str:
+        """Файл кеша конфигурации прошлых версий, переносимый в базу."""
         return str(CACHE_DIR / self._config.name) + ".json"
 
-    async def _get_mod_info(self, item_id: int) -> ModInfo:
-        """Получение информации о моде по его ID, а конкретно - его название.
+    def _make_metadata_backend(self) -> MetadataBackend:
+        """Создание источника информации о модах сессии."""
+        endpoints = self._session.endpoints
+        page_backend = PageMetadataBackend(
+            self._session.http,
+            self._session.metadata_cache,
+            self._session.parse_executor,
+            page_url=endpoints.mod_page_url,
+            conditional=not self._session.force_refresh,
+            retry=self._session.retry,
+        )
+        if endpoints.metadata_backend == "page":
+            return page_backend
+        return BulkMetadataBackend(
+            self._session.http,
+            self._session.metadata_cache,
+            fallback=page_backend,
+            url=endpoints.bulk_metadata_url,
+            retry=self._session.retry,
+        )
 
-        Args:
-            item_id: ID мода.
+    async def _fetch_mod_infos(
+        self, metadata_backend: MetadataBackend, mod_ids: List[int]
+    ) -> List[ModInfo]:
+        """Получение информации о пачке модов.
 
-        Raises:
-            ValueError: Ошибка получения информации о моде.
+        Свежая информация берётся из кеша, остальная запрашивается у
+        источника. Моды, информацию о которых получить не удалось,
+        отбрасываются.
+
+        Args:
+            metadata_backend: Источник информации о модах.
+            mod_ids: ID модов.
 
         Returns:
-            Информация о моде.
+            Информация о модах.
         """
-        info_url = f"http://steamworkshop.download/download/view/{item_id}"
-
-        async with aiohttp.ClientSession() as session:
-            response = await session.get(info_url)
-        response.raise_for_status()
+        mod_infos = []
+        to_fetch = []
+        for mod_id in mod_ids:
+            cached = None
+            if not self._session.force_refresh:
+                cached = self._session.metadata_cache.get(mod_id)
+            if cached is None:
+                to_fetch.append(mod_id)
+                continue
+            mod_infos.append(
+                ModInfo(
+                    cached["name"],
+                    mod_id,
+                    cached["last_update_date"],
+                    file_size=cached["file_size"],
+                    app_id=cached["app_id"],
+                    time_updated=cached["time_updated"],
+                )
+            )
 
-        soup = BeautifulSoup(await response.text(), "html.parser")
+        if to_fetch:
+            details = await metadata_backend.fetch(to_fetch)
+            for mod_id in to_fetch:
+                if mod_id not in details:
+                    continue
+                mod_infos.append(
+                    ModInfo(
+                        details[mod_id].title,
+                        mod_id,
+                        details[mod_id].last_update,
+                        file_size=details[mod_id].file_size,
+                        app_id=details[mod_id].app_id,
+                        time_updated=details[mod_id].time_updated,
+                    )
+                )
+        return mod_infos
+
+    async def _check_mod(self, mod: ModInfo) -> Optional[ModInfo]:
+        """Отсеивание модов, которые не нужно скачивать."""
+        self._adopt_installed_folder(mod)
+        reason = self._mod_has_to_be_redownloaded(mod)
+        cached = self._cache.get(mod.mod_id)
+        if (
+            not reason[0]
+            and cached is not None
+            and mod.time_updated is not None
+            and "time_updated" not in cached
+            and cached["last_update_date"] == mod.last_update_date
+        ):
+            # Дальше мод сравнивается по времени обновления, а не по дате.
+            # Дата со страницы мода, совпавшая со смещением часового пояса,
+            # остаётся в кеше как есть: время к ней не приписывается
+            cached["time_updated"] = mod.time_updated
+            self._session.mod_cache.put(self._config.name, mod.mod_id, cached)
+        if not reason[0] and self._session.verify:
+            reason = await self._verify_mod(mod)
+        self._decisions.append((mod, reason))
+        if not reason[0]:
+            return None
+        mod.archive_path = self._session.archive_store.find(
+            mod.mod_id, mod.last_update_date
+        )
+        if mod.archive_path is not None:
+            console.print(
+                "Архив [cyan]%s[/cyan] найден в хранилище" % mod.name,
+                style="debug",
+            )
+        return mod
 
-        error_elem = soup.find("div", "basic_errors")
-        if error_elem:
-            raise ValueError(error_elem.text)
+    async def _verify_mod(self, mod: ModInfo) -> Tuple[bool, str]:
+        """Проверка установленных файлов мода по манифесту.
 
-        links = soup.find_all("a")
+        Returns:
+            Нужно ли переустанавливать мод и описание причины.
+        """
+        loop = asyncio.get_running_loop()
+        damaged = await loop.run_in_executor(
+            self._session.extract_executor,
+            verify_install,
+            self._get_mod_to_extract_path(mod),
+            self._get_mod_manifest_path(mod),
+        )
+        if not damaged:
+            return (False, "Нет обновлений, файлы не повреждены")
+        mod.damaged_files = damaged
+        return (True, "Повреждено файлов: %d" % len(damaged))
+
+    async def _prepare_mod(self, mod: ModInfo) -> Optional[ModInfo]:
+        """Подготовка мода к скачиванию в одном из источников."""
+        if mod.archive_path is not None:
+            return mod
+        retry = self._session.retry
         try:
-            title_elem = next(filter(lambda elem: "title" in elem.attrs, links))
-        except StopIteration:
-            raise ValueError("Не удалость получить название")
-
-        item_name: str = title_elem.attrs["title"]
+            (
+                mod.download_backend,
+                mod.download_url,
+            ) = await self._session.single_flight(
+                ("подготовка", mod.mod_id, mod.last_update_date),
+                partial(
+                    retry.run,
+                    "Подготовка [cyan]%s[/cyan]" % mod.name,
+                    partial(
+                        self._session.backends.prepare, mod.mod_id, mod.app_id
+                    ),
+                ),
+            )
+        except Exception as err:
+            console.print(
+                "Произошла ошибка при подготовке к скачиванию [cyan]%s[/cyan]. %s"
+                % (mod.name, err),
+                style="error",
+            )
+            return None
+        return mod
 
-        last_update_elem = soup.find("div", "short-story")
+    async def _transfer_mod(self, mod: ModInfo) -> Optional[ModInfo]:
+        """Скачивание подготовленного мода в хранилище архивов."""
+        if mod.archive_path is not None:
+            return mod
         try:
-            last_update_match = re.search("Update:.*", last_update_elem.text)
-            last_update = last_update_match[0][8:]  # type: ignore
-        except IndexError:
-            raise ValueError(
-                "Не удалость получить дату последнего обновления мода"
+            mod.archive_path = await self._session.single_flight(
+                ("скачивание", mod.mod_id, mod.last_update_date),
+                partial(self._fetch_archive, mod),
             )
+        except Exception as err:
+            console.print(
+                "Произошла ошибка при скачивании [cyan]%s[/cyan]. %s"
+                % (mod.name, err),
+                style="error",
+            )
+            return None
+        return mod
 
-        return ModInfo(item_name, item_id, last_update)
-
-    async def _download_mods(self, mods: List[ModInfo]) -> List[ModInfo]:
-        sem = asyncio.Semaphore(SIMULTANEOUS_DOWNLOAD_MAX_COUNT)
-        downloaded_mods: List[Optional[ModInfo]] = await asyncio.gather(
-            *[self._process_mod(mod, sem) for mod in mods]
-        )
-        return [mod for mod in downloaded_mods if mod is not None]
-
-    ############################################################################
-    # ---------- https://backend-03-prd.steamworkshopdownloader.io ----------- #
-    ############################################################################
-    async def _process_mod(
-        self, mod: ModInfo, sem: asyncio.Semaphore
-    ) -> Optional[ModInfo]:
-        """Скачивание мода и распаковка.
-
-        Процесс установки мода состоит из 3-х шагов:
-        1. Создание запроса на скачивание.
-
-        2. Ожидание окончания скачивания на сервере (ожидаем смену статуса
-            запроса, созданного на предыдущем )
-
-        3. Скачивание мода.
+    async def _fetch_archive(self, mod: ModInfo) -> str:
+        """Скачивание архива мода с повторами и перенос его в хранилище.
 
-        Args:
-            mod: Мод, которые надо скачать.
-            sem: Семафор для ограничения количества одновременно скачиваемых \
-                модов.
+        Архив не больше `ARCHIVE_IN_MEMORY_MAX_SIZE` скачивается в память,
+        если это позволяет общий предел памяти, и распаковывается из неё.
+        В хранилище он записывается сразу, без временного файла.
 
         Returns:
-            None, если не удалось скачать мод. ModInfo, в противном случае.
+            Путь к архиву.
         """
-        # POST Request:
-        # https://backend-03-prd.steamworkshopdownloader.io/api/download/request
-        # {
-        #   "publishedFileId": 2266952591,
-        #   "collectionId": null,
-        #   "extract": true,
-        #   "hidden": false,
-        #   "direct": false,
-        #   "autodownload": false
-        # }
-        #
-        # Response:
-        # {"uuid": "995afa62-18fe-4d94-9147-eb1d28b74f39"}
-        async with sem:
+        loop = asyncio.get_running_loop()
+        if self._reserve_memory(mod):
             try:
-                await self._make_request(mod)
-            except Exception as err:
-                console.print(
-                    "Произошла ошибка при создании запроса на скачивание [cyan]%s[/cyan]. %s"
-                    % (mod.name, err),
-                    style="error",
+                data = await self._session.retry.run(
+                    "Скачивание [cyan]%s[/cyan]" % mod.name,
+                    partial(
+                        self._limited_download, mod, self._download_to_memory
+                    ),
                 )
-                return None
-
-            completed = False
-            while not completed:
-                await asyncio.sleep(CHECK_STATUS_INTERVAL)
-                try:
-                    completed = await self._is_download_request_completed(mod)
-                except Exception as err:
-                    console.print(
-                        "Произошла ошибка при проверке статуса запроса на скачивание [cyan]%s[/cyan]. %s"
-                        % (mod.name, err),
-                        style="error",
-                    )
-                    return None
-            if not completed:
-                return None
-
-            try:
-                await self._stream_download(mod)
-            except Exception as err:
-                console.print(
-                    "Произошла ошибка при скачивании [cyan]%s[/cyan]. %s"
-                    % (mod.name, err),
-                    style="error",
+                archive_path = await loop.run_in_executor(
+                    self._session.extract_executor,
+                    self._session.archive_store.add_data,
+                    mod.mod_id,
+                    mod.last_update_date,
+                    data,
+                    self._get_mod_temporary_download_path(mod),
                 )
-                return None
-        self._dump_mod_to_cache(mod)
-        return mod
+            except ArchiveTooLargeError:
+                # Размер из информации о моде устарел, архив скачивается на
+                # диск
+                self._release_memory(mod)
+            except BaseException:
+                self._release_memory(mod)
+                raise
+            else:
+                mod.archive_data = data
+                return archive_path
+
+        await self._session.retry.run(
+            "Скачивание [cyan]%s[/cyan]" % mod.name,
+            partial(self._limited_download, mod, self._stream_download),
+        )
+        return await loop.run_in_executor(
+            self._session.extract_executor,
+            self._session.archive_store.add,
+            mod.mod_id,
+            mod.last_update_date,
+            self._get_mod_temporary_download_path(mod),
+        )
 
-    async def _make_request(self, mod: ModInfo) -> None:
-        request_url = "https://backend-03-prd.steamworkshopdownloader.io/api/download/request"
-        data = {
-            "publishedFileId": mod.mod_id,
-            "collectionId": None,
-            "extract": False,
-            "hidden": False,
-            "direct": False,
-            "autodownload": False,
-        }
-        data_dumped = json.dumps(data)
-        headers = {
-            "Content-Type": "text/plain",
-            "Content-Length": str(len(data_dumped)),
-        }
-        try:
-            async with aiohttp.ClientSession() as session:
-                response = await session.post(
-                    request_url, data=data_dumped, headers=headers
-                )
-            response.raise_for_status()
-            text = await response.text()
-            mod.request_uuid = json.loads(text)["uuid"]
-        except Exception as err:
-            console.print(
-                "Произошла ошибка при получении UUID запроса на скачивание [cyan]%s[/cyan]. %s"
-                % (mod.name, err),
-                style="error",
-            )
+    async def _limited_download(
+        self, mod: ModInfo, download: Callable[[ModInfo], Awaitable[Any]]
+    ) -> Any:
+        """Одна попытка скачивания в слоте ограничителя скачиваний.
 
-    async def _is_download_request_completed(self, mod: ModInfo) -> bool:
-        """Проверить статус запроса на скачивание мода на сервере.
+        Слот занят только на время попытки, поэтому ожидание повтора не
+        мешает скачиванию других модов.
 
         Args:
-            mod: Мод с указанным полем `request_uuid`.
+            mod: Мод.
+            download: Способ скачивания: на диск или в память.
 
         Returns:
-            Готов к скачиванию или нет.
+            Результат `download`.
         """
-        # POST Request:
-        # https://backend-03-prd.steamworkshopdownloader.io/api/download/status
-        # {"uuids":["995afa62-18fe-4d94-9147-eb1d28b74f39"]}
-        #
-        # Response:
-        # {
-        #   "995afa62-18fe-4d94-9147-eb1d28b74f39": {
-        #     "age":14,
-        #     "status": "prepared",
-        #     "progress": 200,
-        #     "progressText": "processed!",
-        #     "downloadError": "never transmitted"
-        #   }
-        # }
-        # console.print("Проверка статуса запросов на скачивание", style="debug")
-        request_url = "https://backend-03-prd.steamworkshopdownloader.io/api/download/status"
-        data = json.dumps({"uuids": [mod.request_uuid]})
-        headers = {
-            "Content-Type": "text/plain",
-            "Content-Length": str(len(data)),
-        }
-        async with aiohttp.ClientSession() as session:
-            response = await session.post(
-                request_url, data=data, headers=headers
-            )
+        try:
+            async with self._session.download_limiter.slot(
+                self._download_job(mod)
+            ):
+                return await download(mod)
+        except ArchiveTooLargeError:
+            raise
+        except Exception:
+            self._session.download_limiter.record_error()
+            if mod.download_backend is not None:
+                mod.download_backend.record_failure()
+            raise
+
+    def _download_job(self, mod: ModInfo) -> Job:
+        """Скачивание мода для планировщика.
+
+        Для недокачанного архива размер - оставшаяся часть по его
+        `Content-Length`, иначе размер из информации о моде.
+        """
+        size = remaining_size(
+            self._get_mod_temporary_download_path(mod), mod.last_update_date
+        )
+        if size is None:
+            size = mod.file_size
+        if size is not None:
+            self._session.scheduler.observe(size)
+        return Job(size, self._config.name)
 
-        text = await response.text()
-        response_uuids = json.loads(text)
-        for uuid, uuid_data in response_uuids.items():
-            if uuid_data["status"] == "prepared":
-                if uuid == mod.request_uuid:
-                    return True
-                console.print(
-                    "Закончено скачивание на сервере [cyan]%s" % mod.name,
-                    style="debug",
-                )
-        return False
+    def _reserve_memory(self, mod: ModInfo) -> bool:
+        """Можно ли скачать архив мода в память.
 
-    async def _stream_download(self, mod: ModInfo) -> ModInfo:
-        # GET Request:
-        # https://backend-03-prd.steamworkshopdownloader.io/api/download/transmit?uuid=995afa62-18fe-4d94-9147-eb1d28b74f39
-        #
-        # Response:
-        # Content of a zip-archive
-        request_url = (
-            "https://backend-03-prd.steamworkshopdownloader.io/api/download/transmit?uuid=%s"
-            % mod.request_uuid
+        Если можно, то под архив резервируется память из общего предела.
+        """
+        if mod.file_size is None or mod.file_size > ARCHIVE_IN_MEMORY_MAX_SIZE:
+            return False
+        temporary_path = self._get_mod_temporary_download_path(mod)
+        if remaining_size(temporary_path, mod.last_update_date) is not None:
+            # Недокачанный архив продолжает скачиваться на диск
+            return False
+        return self._session.memory_budget.try_reserve(mod.file_size)
+
+    def _release_memory(self, mod: ModInfo) -> None:
+        self._session.memory_budget.release(mod.file_size or 0)
+
+    async def _download_to_memory(self, mod: ModInfo) -> bytearray:
+        console.print(
+            "Скачивание [cyan]%s[/cyan] в память из [cyan]%s"
+            % (mod.name, getattr(mod.download_backend, "name", "?")),
+            style="debug",
         )
-        console.print("Скачивание [cyan]%s" % mod.name, style="debug")
-        timeout = aiohttp.ClientTimeout(
-            total=FILE_DOWNLOAD_TOTAL_TIMEOUT,
-            sock_read=CHUNK_DOWNLOAD_TIMEOUT,
-            sock_connect=None,
-            connect=None,
+        data = await download_to_memory(
+            self._session.http,
+            str(mod.download_url),
+            mod.file_size or 0,
+            on_progress=self._session.download_limiter.record_bytes,
+            bandwidth=self._session.bandwidth,
         )
-        async with aiohttp.ClientSession(timeout=timeout) as session:
-            response = await session.get(request_url)
+        console.print("Завершено скачивание [cyan]%s" % mod.name, style="debug")
+        return data
 
-            download_path = self._get_mod_temporary_download_path(mod)
-            async with aiofiles.open(download_path, "wb") as out_file:
-                while not response.content.at_eof():
-                    content = await response.content.read(DOWNLOAD_CHUNK_SIZE)
-                    await out_file.write(content)
+    async def _stream_download(self, mod: ModInfo) -> ModInfo:
+        console.print(
+            "Скачивание [cyan]%s[/cyan] из [cyan]%s"
+            % (mod.name, getattr(mod.download_backend, "name", "?")),
+            style="debug",
+        )
+        extractor = None
+        if STREAMING_EXTRACTION:
+            extractor = StreamingExtractor(self._get_mod_staging_path(mod))
+        # Повторами с задержкой и общим запасом управляет `RetryBudget`.
+        # Следующая попытка продолжает недокачанный файл с места остановки
+        await download_resumable(
+            self._session.http,
+            str(mod.download_url),
+            self._get_mod_temporary_download_path(mod),
+            mod.last_update_date,
+            attempts=1,
+            extractor=extractor,
+            on_progress=self._session.download_limiter.record_bytes,
+            bandwidth=self._session.bandwidth,
+        )
+        if extractor is not None and extractor.finish():
+            self._staged_mods[mod.mod_id] = extractor.members
+        mod.archive_path = self._get_mod_temporary_download_path(mod)
+        if mod.file_size is None:
+            # Размер архива стал известен по скачиванию и уточняет оценку
+            # размеров остальных модов с неизвестным размером
+            mod.file_size = os.path.getsize(mod.archive_path)
+            self._session.scheduler.observe(mod.file_size)
 
         console.print("Завершено скачивание [cyan]%s" % mod.name, style="debug")
         return mod
 
-    def _extract_mods(self, downloaded_mods: List[ModInfo]) -> None:
+    async def _extract_mod(self, mod: ModInfo) -> Optional[ModInfo]:
+        """Распаковка скачанного мода и запись его в кеш."""
         console.print(
-            "Распаковка модов в [cyan]%s" % self._config.download_path,
-            style="info",
+            "Распаковка [cyan]%s[/cyan] в [cyan]%s" % (mod.name, mod.filename),
+            style="debug",
         )
-        for mod in downloaded_mods:
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(
+                self._session.extract_executor, self._install_mod, mod
+            )
+        except Exception as err:
             console.print(
-                "Распаковка [cyan]%s[/cyan] в [cyan]%s"
-                % (mod.name, mod.filename),
-                style="debug",
+                "Произошла ошибка при распаковке [cyan]%s[/cyan]. %s"
+                % (mod.name, err),
+                style="error",
             )
+            return None
+        finally:
+            if mod.archive_data is not None:
+                mod.archive_data = None
+                self._release_memory(mod)
+        self._dump_mod_to_cache(mod)
+        return mod
 
-            from_filepath = self._get_mod_temporary_download_path(mod)
-            to_filepath = self._get_mod_to_extract_path(mod)
-            with ZipFile(from_filepath, "r") as archive:
-                archive.extractall(to_filepath)
+    def _install_mod(self, mod: ModInfo) -> None:
+        """Установка мода.
+
+        Если та же версия мода уже установлена в папку другой конфигурации,
+        то файлы устанавливаются жёсткими ссылками на неё. У повреждённой
+        установки переписываются только повреждённые файлы.
+        """
+        to_path = self._get_mod_to_extract_path(mod)
+        manifest_path = self._get_mod_manifest_path(mod)
+        staged_members = self._staged_mods.pop(mod.mod_id, None)
+        install = None
+        if (
+            LINK_INSTALLED_MODS
+            and staged_members is None
+            and mod.damaged_files is None
+        ):
+            install = self._session.archive_store.find_install(
+                mod.mod_id, mod.last_update_date, to_path
+            )
+
+        if install is None or not link_mod_tree(
+            install["path"], install["manifest"], to_path, manifest_path
+        ):
+            install_mod(
+                (
+                    io.BytesIO(mod.archive_data)
+                    if mod.archive_data is not None
+                    else str(mod.archive_path)
+                ),
+                to_path,
+                manifest_path,
+                self._get_mod_staging_path(mod) if staged_members else None,
+                staged_members,
+                mod.damaged_files,
+            )
+
+        self._session.archive_store.add_install(
+            mod.mod_id, mod.last_update_date, to_path, manifest_path
+        )
 
     def _get_mod_temporary_download_path(self, mod: ModInfo) -> str:
         """Путь к архиву мода во временной папке."""
         return str(TEMP_DOWNLOAD_PATH / mod.filename) + ".zip"
 
+    def _get_mod_staging_path(self, mod: ModInfo) -> str:
+        """Папка, в которую мод распаковывается во время скачивания."""
+        return str(TEMP_DOWNLOAD_PATH / mod.filename) + ".staging"
+
+    def _get_mod_manifest_path(self, mod: ModInfo) -> str:
+        """Путь к манифесту установленных файлов мода."""
+        return (
+            str(MANIFESTS_DIR / self._config.name / str(mod.mod_id)) + ".json"
+        )
+
     def _get_mod_to_extract_path(self, mod: ModInfo) -> str:
 
         return str(Path(self._config.download_path) / mod.filename)
@@ -471,52 +844,28 @@ class Downloader:
 
     #     return ModInfo(item_name, item_id)
 
-    ############################################################################
-    # -------------------- http://steamworkshop.download/ -------------------- #
-    ############################################################################
-    # async def _get_download_link(
-    #     self, mod_info: ModInfo, out_dict: Dict[str, str], lock: asyncio.Lock
-    # ) -> None:
-    #     logger.debug("Получение ссылки на скачивание '%s'" % mod_info.mod_name)
-    #     data = {"item": mod_info.mod_id, "app": mod_info.app_id}
-    #     headers = {"content-type": "application/x-www-form-urlencoded"}
-    #     async with aiohttp.ClientSession() as session:
-    #         async with session.post(
-    #             "http://steamworkshop.download/online/steamonline.php",
-    #             data=data,
-    #             headers=headers,
-    #         ) as resp:
-    #             response = await resp.text()
-    #     soup = BeautifulSoup(response, "html.parser")
-
-    #     download_link_tag = soup.find("a")
-    #     if not download_link_tag:
-    #         logger.error("Мод '%s' не был скачан" % mod_info.mod_name)
-    #         return
-
-    #     url = download_link_tag.attrs["href"]
-    #     async with lock:
-    #         out_dict[mod_info.filename] = url
-
-    # async def _download_and_extract(self, url: str, filename: str) -> None:
-    #     logger.debug("Скачивание '%s'" % filename)
-    #     mod_place_folder = Path(os.path.abspath(self._config.download_path))
-    #     if not os.path.exists(".download"):
-    #         os.mkdir(".download")
-    #     filepath = ".".join(
-    #         (str(Path(".download") / filename), url.rsplit(".")[-1])
-    #     )
 
-    #     async with aiohttp.ClientSession() as session:
-    #         async with session.get(url) as resp:
-    #             if resp.status == 200:
-    #                 f = await aiofiles.open(filepath, mode="wb")
-    #                 await f.write(await resp.read())
-    #                 await f.close()
-
-    #     with ZipFile(filepath, "r") as archive:
-    #         archive.extractall(".temp")
-    #         folder = archive.namelist()[0]
-
-    #     shutil.move(Path(".temp") / folder, mod_place_folder / filename)
-    #     logger.debug("Скачан мод '%s'" % filename)
+async def download_configs(
+    configs: List[GameConfig],
+    force_refresh: bool = False,
+    verify: bool = False,
+    prune: bool = False,
+) -> None:
+    """Одновременная загрузка модов нескольких конфигураций.
+
+    Конфигурации обрабатываются в одном цикле событий с общими ресурсами.
+    Мод, нужный нескольким конфигурациям, скачивается один раз и
+    устанавливается в папку каждой из них. Кеш каждой конфигурации
+    обновляется отдельно.
+
+    Args:
+        configs: Конфигурации игры.
+        force_refresh: Запрашивать информацию о модах, не используя кеш.
+        verify: Проверять установленные файлы модов последней версии.
+        prune: Удалять лишние папки модов.
+    """
+    session = DownloadSession(force_refresh, verify, prune)
+    downloaders = [Downloader(config, session) for config in configs]
+    async with session:
+        await asyncio.gather(*[downloader.run() for downloader in downloaders])
+    session.print_summary()
@@ -1,7 +1,7 @@
 import os
 from dataclasses import dataclass
 from pathlib import Path
-from typing import List, Optional, Set, TypedDict, Union
+from typing import Dict, Iterable, List, Optional, Set, TypedDict, Union
 
 import yaml
 from schema import And, Schema, SchemaError, Use
@@ -31,12 +31,29 @@ config_validation_schema = Schema(
 )
 
 
-def get_configs(dir_path: str = "configs/") -> List[GameConfig]:
+def find_config_names(dir_path: str = "configs/") -> List[str]:
+    """Поиск названий конфигов в папке без их чтения.
+
+    Args:
+        dir_path: Папка, в которой находятся конфиги. Расширение должно быть yml
+            или yaml.
+
+    Returns:
+        Отсортированный список названий конфигов.
+    """
+    return sorted(find_config_files(dir_path))
+
+
+def get_configs(
+    dir_path: str = "configs/", names: Optional[Iterable[str]] = None
+) -> List[GameConfig]:
     """Загрузка конфигов из папки.
 
     Args:
         dir_path: Папка, в которой находятся конфиги. Расширение должно быть yml
             или yaml.
+        names: Названия конфигов, которые нужно загрузить. Остальные файлы
+            не читаются. None - загрузить все.
 
     Returns:
         Список загруженных конфигов.
@@ -48,22 +65,42 @@ def get_configs(dir_path: str = "configs/") -> List[GameConfig]:
             "Папка [cyan]%s[/cyan] не найдена!" % dir_path, style="error"
         )
         return configs
+    config_files = find_config_files(dir_path)
+    if names is None:
+        names = sorted(config_files)
+    for cfg_name in names:
+        cfg_path = config_files.get(cfg_name)
+        if cfg_path is None:
+            console.print(
+                "Конфиг [cyan]%s[/cyan] не найден!" % cfg_name, style="error"
+            )
+            continue
+        console.print("Найден конфиг [cyan]%s" % cfg_path.name, style="debug")
+        cfg = _get_config(cfg_path, cfg_name)
+        if cfg is not None:
+            configs.append(cfg)
+    return configs
+
+
+def find_config_files(dir_path: str = "configs/") -> Dict[str, Path]:
+    """Поиск файлов конфигов в папке без их чтения.
+
+    Args:
+        dir_path: Папка, в которой находятся конфиги.
+
+    Returns:
+        Пути к файлам конфигов по их названиям.
+    """
+    config_files: Dict[str, Path] = {}
+    if not os.path.exists(dir_path):
+        return config_files
     path = Path(dir_path)
     for file_path in os.listdir(path):
         if os.path.isfile(path / file_path):
-            file_splitted = os.path.splitext(path / file_path)
-            if file_splitted[1] in {".yml", ".yaml"}:
-                cfg_name = os.path.splitext(file_path)[0]
-                if cfg_name == "example":
-                    continue
-                console.print(
-                    "Найден конфиг [cyan]%s" % (cfg_name + file_splitted[1]),
-                    style="debug",
-                )
-                cfg = _get_config(path / file_path, cfg_name)
-                if cfg is not None:
-                    configs.append(cfg)
-    return configs
+            cfg_name, extension = os.path.splitext(file_path)
+            if extension in {".yml", ".yaml"} and cfg_name != "example":
+                config_files[cfg_name] = path / file_path
+    return config_files
 
 
 def _get_config(
@@ -0,0 +1,219 @@
+from enum import Enum
+from types import SimpleNamespace, TracebackType
+from typing import Any, Dict, Optional, Type
+
+import aiohttp
+from yarl import URL
+
+from .config import (
+    API_REQUEST_TIMEOUT,
+    CHUNK_DOWNLOAD_TIMEOUT,
+    FILE_DOWNLOAD_TOTAL_TIMEOUT,
+    HTTP_CONNECT_TIMEOUT,
+    HTTP_CONNECTIONS_LIMIT,
+    HTTP_CONNECTIONS_PER_HOST_LIMIT,
+    HTTP_DNS_CACHE_TTL,
+    HTTP_KEEPALIVE_TIMEOUT,
+    METADATA_REQUEST_TIMEOUT,
+    RATE_LIMIT_BURST,
+    RATE_LIMIT_PER_HOST,
+)
+from .rate_limit import TokenBucket, parse_retry_after
+
+
+class RequestKind(Enum):
+    """Тип запроса. От него зависят ограничения времени выполнения."""
+
+    METADATA = "metadata"
+    API = "api"
+    TRANSFER = "transfer"
+
+
+_timeouts: Dict[RequestKind, aiohttp.ClientTimeout] = {
+    RequestKind.METADATA: aiohttp.ClientTimeout(
+        total=METADATA_REQUEST_TIMEOUT, sock_connect=HTTP_CONNECT_TIMEOUT
+    ),
+    RequestKind.API: aiohttp.ClientTimeout(
+        total=API_REQUEST_TIMEOUT, sock_connect=HTTP_CONNECT_TIMEOUT
+    ),
+    RequestKind.TRANSFER: aiohttp.ClientTimeout(
+        total=FILE_DOWNLOAD_TOTAL_TIMEOUT,
+        sock_read=CHUNK_DOWNLOAD_TIMEOUT,
+        sock_connect=HTTP_CONNECT_TIMEOUT,
+    ),
+}
+
+#: Статусы ответа, с которыми сервер может прислать `Retry-After`.
+_THROTTLE_STATUSES = frozenset((429, 503))
+
+
+class _Request:
+    """Контекстный менеджер запроса, ожидающий разрешения ограничителя."""
+
+    def __init__(
+        self,
+        session: aiohttp.ClientSession,
+        bucket: TokenBucket,
+        method: str,
+        url: str,
+        kwargs: Dict[str, Any],
+    ) -> None:
+        self._session = session
+        self._bucket = bucket
+        self._method = method
+        self._url = url
+        self._kwargs = kwargs
+        self._response: Any = None
+
+    async def __aenter__(self) -> aiohttp.ClientResponse:
+        await self._bucket.acquire()
+        self._response = self._session.request(
+            self._method, self._url, **self._kwargs
+        )
+        response = await self._response.__aenter__()
+        if response.status in _THROTTLE_STATUSES:
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            if retry_after is not None:
+                self._bucket.pause(retry_after)
+        return response
+
+    async def __aexit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        await self._response.__aexit__(exc_type, exc, traceback)
+
+
+class HttpClient:
+    """Общий HTTP клиент на всё время работы загрузчика.
+
+    Все запросы идут через одну сессию с пулом соединений, поэтому
+    соединения с сервером и результаты DNS запросов переиспользуются
+    между запросами. Ведётся подсчёт созданных и переиспользованных
+    соединений.
+
+    Частота запросов к каждому серверу ограничивается общим для всех
+    запросов ведром жетонов. Если сервер отвечает 429 или 503 с заголовком
+    `Retry-After`, то запросы к нему приостанавливаются на указанное время.
+    """
+
+    def __init__(
+        self,
+        rate: float = RATE_LIMIT_PER_HOST,
+        burst: int = RATE_LIMIT_BURST,
+    ) -> None:
+        """Создание клиента. Сессия открывается при входе в контекст.
+
+        Args:
+            rate: Количество запросов в секунду к одному серверу.
+            burst: Количество запросов к одному серверу подряд без ожидания.
+        """
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._rate = rate
+        self._burst = burst
+        self._buckets: Dict[str, TokenBucket] = {}
+        self.connections_created = 0
+        self.connections_reused = 0
+
+    async def __aenter__(self) -> "HttpClient":
+        """Открытие сессии с пулом соединений."""
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_connection_create_end.append(self._on_connection_create)
+        trace_config.on_connection_reuseconn.append(self._on_connection_reuse)
+        connector = aiohttp.TCPConnector(
+            limit=HTTP_CONNECTIONS_LIMIT,
+            limit_per_host=HTTP_CONNECTIONS_PER_HOST_LIMIT,
+            ttl_dns_cache=HTTP_DNS_CACHE_TTL,
+            keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+        )
+        self._session = aiohttp.ClientSession(
+            connector=connector, trace_configs=[trace_config]
+        )
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        """Закрытие сессии и всех её соединений."""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """Открытая сессия.
+
+        Raises:
+            RuntimeError: Клиент используется вне контекста.
+        """
+        if self._session is None:
+            raise RuntimeError("HTTP клиент не открыт")
+        return self._session
+
+    def get(self, url: str, kind: RequestKind, **kwargs: Any) -> Any:
+        """GET запрос с ограничением времени, заданным для типа запроса.
+
+        Args:
+            url: Адрес.
+            kind: Тип запроса.
+            kwargs: Остальные параметры запроса aiohttp.
+
+        Returns:
+            Контекстный менеджер ответа aiohttp.
+        """
+        return self._request("GET", url, kind, kwargs)
+
+    def post(self, url: str, kind: RequestKind, **kwargs: Any) -> Any:
+        """POST запрос с ограничением времени, заданным для типа запроса.
+
+        Args:
+            url: Адрес.
+            kind: Тип запроса.
+            kwargs: Остальные параметры запроса aiohttp.
+
+        Returns:
+            Контекстный менеджер ответа aiohttp.
+        """
+        return self._request("POST", url, kind, kwargs)
+
+    @property
+    def throttled_seconds(self) -> float:
+        """Суммарное время ожидания запросов в ограничителях."""
+        return sum(bucket.waited for bucket in self._buckets.values())
+
+    def _request(
+        self, method: str, url: str, kind: RequestKind, kwargs: Dict[str, Any]
+    ) -> _Request:
+        host = URL(url).host or ""
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            bucket = TokenBucket(self._rate, self._burst)
+            self._buckets[host] = bucket
+        return _Request(
+            self.session,
+            bucket,
+            method,
+            url,
+            dict(timeout=_timeouts[kind], **kwargs),
+        )
+
+    async def _on_connection_create(
+        self,
+        session: aiohttp.ClientSession,
+        trace_config_ctx: SimpleNamespace,
+        params: aiohttp.TraceConnectionCreateEndParams,
+    ) -> None:
+        self.connections_created += 1
+
+    async def _on_connection_reuse(
+        self,
+        session: aiohttp.ClientSession,
+        trace_config_ctx: SimpleNamespace,
+        params: aiohttp.TraceConnectionReuseconnParams,
+    ) -> None:
+        self.connections_reused += 1
@@ -0,0 +1,399 @@
+import json
+import os
+import shutil
+import zlib
+from typing import IO, Any, Dict, Iterable, List, NamedTuple, Optional, Union
+from zipfile import ZipFile, ZipInfo
+
+#: Размер буфера при копировании файлов.
+_COPY_BUFFER_SIZE = 1024 * 1024
+
+
+class MemberInfo(NamedTuple):
+    """Данные о файле мода из центрального каталога архива."""
+
+    size: int
+    crc: int
+
+
+#: Данные об установленных файлах мода по их путям относительно папки мода.
+Manifest = Dict[str, MemberInfo]
+
+
+class FileStat(NamedTuple):
+    """Размер и время изменения установленного файла."""
+
+    size: int
+    mtime_ns: int
+
+
+#: Размеры и время изменения установленных файлов мода по их путям
+#: относительно папки мода. Файл, у которого они не изменились с записи в
+#: индекс, совпадает с файлом архива, и его CRC-32 не пересчитывается.
+StatIndex = Dict[str, FileStat]
+
+
+def member_path(name: str) -> Optional[str]:
+    """Путь файла архива относительно папки мода.
+
+    Как и `ZipFile.extract`, отбрасывает части пути, выводящие за пределы
+    папки мода.
+
+    Args:
+        name: Имя файла в архиве.
+
+    Returns:
+        Относительный путь или None, если это папка.
+    """
+    if name.endswith(("/", "\\")):
+        return None
+    parts = [
+        part
+        for part in name.replace("\\", "/").split("/")
+        if part not in {"", ".", ".."}
+    ]
+    if not parts:
+        return None
+    return "/".join(parts)
+
+
+def install_mod(
+    archive_path: Union[str, IO[bytes]],
+    to_path: str,
+    manifest_path: str,
+    staging_path: Optional[str] = None,
+    staged_members: Optional[Manifest] = None,
+    damaged: Optional[Iterable[str]] = None,
+) -> None:
+    """Установка скачанного мода в его папку.
+
+    Состав архива сравнивается с манифестом прошлой установки: записываются
+    только изменённые и новые файлы, удалённые из архива файлы удаляются,
+    остальные не трогаются. Файлы, которые не ставились из архива, остаются
+    на месте. Если манифеста нет, то существующий файл сравнивается с
+    файлом архива по размеру и CRC-32.
+
+    Блокирующая функция, вызывается в пуле потоков, чтобы не останавливать
+    цикл событий на время работы с диском.
+
+    Args:
+        archive_path: Путь к архиву мода или архив, открытый в памяти.
+        to_path: Папка мода.
+        manifest_path: Путь к манифесту установленных файлов мода.
+        staging_path: Временная папка, в которую мод был распакован во время
+            скачивания. Если указана, то архив не распаковывается.
+        staged_members: Файлы, распакованные во временную папку.
+        damaged: Файлы, не совпадающие с манифестом по результату
+            `verify_install`. Они сравниваются с архивом по CRC-32.
+    """
+    os.makedirs(to_path, exist_ok=True)
+    old_manifest = load_manifest(manifest_path)
+    for name in damaged or ():
+        old_manifest.pop(name, None)
+    if staging_path is not None and staged_members is not None:
+        new_manifest = staged_members
+        _install_staged(staging_path, to_path, new_manifest, old_manifest)
+    else:
+        new_manifest = _install_archive(archive_path, to_path, old_manifest)
+
+    for name in old_manifest.keys() - new_manifest.keys():
+        _remove_member(to_path, name)
+    dump_manifest(new_manifest, manifest_path)
+    index_install(to_path, new_manifest, manifest_path)
+
+
+def load_manifest(manifest_path: str) -> Manifest:
+    """Загрузка манифеста установленных файлов мода.
+
+    Args:
+        manifest_path: Путь к манифесту.
+
+    Returns:
+        Манифест. Пустой, если его нет или он повреждён.
+    """
+    if not os.path.exists(manifest_path):
+        return {}
+    try:
+        with open(manifest_path, encoding="utf-8") as manifest_file:
+            data = json.load(manifest_file)
+        return {name: MemberInfo(*info) for name, info in data.items()}
+    except (ValueError, TypeError):
+        return {}
+
+
+def dump_manifest(manifest: Manifest, manifest_path: str) -> None:
+    """Запись манифеста установленных файлов мода.
+
+    Args:
+        manifest: Манифест.
+        manifest_path: Путь к манифесту.
+    """
+    _dump_json(manifest, manifest_path)
+
+
+def stat_index_path(manifest_path: str) -> str:
+    """Путь к индексу установленных файлов мода рядом с его манифестом.
+
+    Args:
+        manifest_path: Путь к манифесту.
+
+    Returns:
+        Путь к индексу.
+    """
+    return os.path.splitext(manifest_path)[0] + ".stat.json"
+
+
+def load_stat_index(manifest_path: str) -> StatIndex:
+    """Загрузка индекса установленных файлов мода.
+
+    Args:
+        manifest_path: Путь к манифесту мода.
+
+    Returns:
+        Индекс. Пустой, если его нет или он повреждён.
+    """
+    index_path = stat_index_path(manifest_path)
+    if not os.path.exists(index_path):
+        return {}
+    try:
+        with open(index_path, encoding="utf-8") as index_file:
+            data = json.load(index_file)
+        return {name: FileStat(*info) for name, info in data.items()}
+    except (ValueError, TypeError):
+        return {}
+
+
+def index_install(to_path: str, manifest: Manifest, manifest_path: str) -> None:
+    """Запись индекса только что установленных файлов мода.
+
+    Args:
+        to_path: Папка мода.
+        manifest: Манифест установленных файлов.
+        manifest_path: Путь к манифесту.
+    """
+    index: StatIndex = {}
+    for name in manifest:
+        try:
+            stat = os.stat(os.path.join(to_path, name))
+        except OSError:
+            continue
+        index[name] = FileStat(stat.st_size, stat.st_mtime_ns)
+    _dump_json(index, stat_index_path(manifest_path))
+
+
+def verify_install(to_path: str, manifest_path: str) -> List[str]:
+    """Проверка установленных файлов мода по манифесту.
+
+    Папка мода обходится через `os.scandir`. CRC-32 пересчитывается только
+    у файлов, размер или время изменения которых не совпадают с индексом,
+    поэтому повторная проверка нетронутой папки не читает файлы. Индекс
+    обновляется для файлов, которые совпали с манифестом.
+
+    Блокирующая функция, вызывается в пуле потоков.
+
+    Args:
+        to_path: Папка мода.
+        manifest_path: Путь к манифесту установленных файлов мода.
+
+    Returns:
+        Пути отсутствующих и изменённых файлов относительно папки мода.
+        Пустой список, если манифеста нет и проверять не по чему.
+    """
+    manifest = load_manifest(manifest_path)
+    if not manifest:
+        return []
+    index = load_stat_index(manifest_path)
+    found = _scan_tree(to_path)
+    damaged = []
+    new_index: StatIndex = {}
+    for name, member in manifest.items():
+        stat = found.get(name)
+        if stat is None or stat.size != member.size:
+            damaged.append(name)
+            continue
+        if index.get(name) != stat:
+            try:
+                crc = file_crc(os.path.join(to_path, name))
+            except OSError:
+                crc = None
+            if crc != member.crc:
+                damaged.append(name)
+                continue
+        new_index[name] = stat
+    if new_index != index:
+        _dump_json(new_index, stat_index_path(manifest_path))
+    return sorted(damaged)
+
+
+def _scan_tree(to_path: str) -> StatIndex:
+    """Размеры и время изменения всех файлов папки."""
+    found: StatIndex = {}
+    folders = [("", to_path)]
+    while folders:
+        prefix, folder = folders.pop()
+        try:
+            entries = list(os.scandir(folder))
+        except OSError:
+            continue
+        for entry in entries:
+            name = prefix + entry.name
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    folders.append((name + "/", entry.path))
+                elif entry.is_file():
+                    stat = entry.stat()
+                    found[name] = FileStat(stat.st_size, stat.st_mtime_ns)
+            except OSError:
+                continue
+    return found
+
+
+def _dump_json(data: Any, path: str) -> None:
+    """Запись JSON через временный файл."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as json_file:
+        json.dump(data, json_file)
+    os.replace(tmp_path, path)
+
+
+def _install_archive(
+    archive_path: Union[str, IO[bytes]], to_path: str, old_manifest: Manifest
+) -> Manifest:
+    new_manifest: Manifest = {}
+    with ZipFile(archive_path, "r") as archive:
+        for info in archive.infolist():
+            name = member_path(info.filename)
+            if name is None:
+                continue
+            member = MemberInfo(info.file_size, info.CRC)
+            new_manifest[name] = member
+            target = os.path.join(to_path, name)
+            if _is_unchanged(target, member, old_manifest.get(name)):
+                continue
+            _extract_member(archive, info, target)
+    return new_manifest
+
+
+def _install_staged(
+    staging_path: str,
+    to_path: str,
+    new_manifest: Manifest,
+    old_manifest: Manifest,
+) -> None:
+    for name, member in new_manifest.items():
+        target = os.path.join(to_path, name)
+        if _is_unchanged(target, member, old_manifest.get(name)):
+            continue
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.move(os.path.join(staging_path, name), target)
+    shutil.rmtree(staging_path)
+
+
+def _is_unchanged(
+    target: str, member: MemberInfo, installed: Optional[MemberInfo]
+) -> bool:
+    """Совпадает ли установленный файл с файлом в архиве."""
+    try:
+        if os.path.getsize(target) != member.size:
+            return False
+    except OSError:
+        return False
+    if installed is not None:
+        return installed == member
+    return file_crc(target) == member.crc
+
+
+def file_crc(path: str) -> int:
+    """CRC-32 файла, как в zip архиве.
+
+    Args:
+        path: Путь к файлу.
+
+    Returns:
+        CRC-32.
+    """
+    crc = 0
+    with open(path, "rb") as file:
+        while True:
+            data = file.read(_COPY_BUFFER_SIZE)
+            if not data:
+                return crc
+            crc = zlib.crc32(data, crc)
+
+
+def link_mod_tree(
+    source_path: str,
+    source_manifest_path: str,
+    to_path: str,
+    manifest_path: str,
+) -> bool:
+    """Установка мода жёсткими ссылками на файлы другой его установки.
+
+    Используется, когда та же версия мода уже установлена в папку другой
+    конфигурации на той же файловой системе.
+
+    Args:
+        source_path: Папка установленного мода.
+        source_manifest_path: Манифест установленного мода.
+        to_path: Папка мода.
+        manifest_path: Путь к манифесту установленных файлов мода.
+
+    Returns:
+        True, если мод установлен. False, если ссылки создать нельзя или
+        установленный мод не совпадает со своим манифестом.
+    """
+    source_manifest = load_manifest(source_manifest_path)
+    if not source_manifest:
+        return False
+    try:
+        for name, member in source_manifest.items():
+            if os.path.getsize(os.path.join(source_path, name)) != member.size:
+                return False
+
+        old_manifest = load_manifest(manifest_path)
+        for name in source_manifest:
+            source = os.path.join(source_path, name)
+            target = os.path.join(to_path, name)
+            if os.path.exists(target) and os.path.samefile(source, target):
+                continue
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            tmp_path = target + ".tmp"
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            os.link(source, tmp_path)
+            os.replace(tmp_path, target)
+    except OSError:
+        return False
+
+    for name in old_manifest.keys() - source_manifest.keys():
+        _remove_member(to_path, name)
+    dump_manifest(source_manifest, manifest_path)
+    index_install(to_path, source_manifest, manifest_path)
+    return True
+
+
+def _extract_member(archive: ZipFile, info: ZipInfo, target: str) -> None:
+    """Распаковка файла архива.
+
+    Файл пишется рядом и подменяет старый, поэтому жёсткие ссылки на старый
+    файл из других папок не меняются.
+    """
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    tmp_path = target + ".tmp"
+    with archive.open(info) as source, open(tmp_path, "wb") as destination:
+        shutil.copyfileobj(source, destination, _COPY_BUFFER_SIZE)
+    os.replace(tmp_path, target)
+
+
+def _remove_member(to_path: str, name: str) -> None:
+    """Удаление файла мода и опустевших после этого папок."""
+    target = os.path.join(to_path, name)
+    if os.path.isfile(target):
+        os.remove(target)
+    parent = os.path.dirname(target)
+    while os.path.normpath(parent) != os.path.normpath(to_path):
+        if not os.path.isdir(parent) or os.listdir(parent):
+            return
+        os.rmdir(parent)
+        parent = os.path.dirname(parent)
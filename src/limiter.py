@@ -0,0 +1,242 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from types import TracebackType
+from typing import AsyncIterator, Callable, List, Optional, Tuple, Type
+
+from .config import (
+    ADAPTIVE_DECREASE_FACTOR,
+    ADAPTIVE_THROUGHPUT_DROP,
+    ADAPTIVE_THROUGHPUT_GAIN,
+    ADAPTIVE_WINDOW,
+)
+from .logging import console
+from .scheduler import DownloadScheduler, Job
+
+
+class AdaptiveLimiter:
+    """Ограничитель количества одновременных операций по схеме AIMD.
+
+    Раз в `window` секунд сравнивает общую пропускную способность с прошлым
+    окном. Если все слоты были заняты и пропускная способность выросла, то
+    предел увеличивается на 1. При ошибках или падении пропускной
+    способности предел уменьшается в `decrease_factor` раз. Предел всегда
+    остаётся в границах `[minimum, maximum]`. Решения пишутся в лог.
+
+    Используется как асинхронный контекстный менеджер вместо семафора.
+    Если задан планировщик, то освободившийся слот получает выбранная им
+    операция, а не ждущая дольше всех.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        initial: int,
+        minimum: int,
+        maximum: int,
+        window: float = ADAPTIVE_WINDOW,
+        decrease_factor: float = ADAPTIVE_DECREASE_FACTOR,
+        clock: Callable[[], float] = time.monotonic,
+        scheduler: Optional[DownloadScheduler] = None,
+    ) -> None:
+        """Создание ограничителя.
+
+        Args:
+            name: Название для логов.
+            initial: Начальный предел.
+            minimum: Минимальный предел.
+            maximum: Максимальный предел.
+            window: Длина окна замера пропускной способности в секундах.
+            decrease_factor: Множитель предела при уменьшении.
+            clock: Часы в секундах.
+            scheduler: Планировщик порядка выдачи слотов.
+        """
+        self._name = name
+        self._minimum = minimum
+        self._maximum = maximum
+        self.limit = max(minimum, min(maximum, initial))
+        self._window = window
+        self._decrease_factor = decrease_factor
+        self._clock = clock
+        self._scheduler = scheduler
+        self._in_use = 0
+        self._waiters: List[Tuple["asyncio.Future[None]", Job]] = []
+        self._window_started = clock()
+        self._window_bytes = 0
+        self._window_errors = 0
+        self._saturated = False
+        self._last_throughput: Optional[float] = None
+        #: Количество изменений предела.
+        self.adjustments = 0
+
+    async def __aenter__(self) -> "AdaptiveLimiter":
+        """Ожидание свободного слота."""
+        await self._acquire(Job(None))
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        """Освобождение слота."""
+        self._release()
+
+    @asynccontextmanager
+    async def slot(self, job: Job) -> AsyncIterator[None]:
+        """Занятие слота операцией, известной планировщику.
+
+        Args:
+            job: Операция.
+
+        Yields:
+            Управление на время, пока слот занят.
+        """
+        await self._acquire(job)
+        try:
+            yield
+        finally:
+            self._release()
+
+    def record_bytes(self, count: int) -> None:
+        """Учёт переданных байт.
+
+        Args:
+            count: Количество байт.
+        """
+        self._window_bytes += count
+        self._maybe_adjust()
+
+    def record_error(self) -> None:
+        """Учёт ошибки или истечения времени операции."""
+        self._window_errors += 1
+        self._maybe_adjust()
+
+    async def _acquire(self, job: Job) -> None:
+        if self._in_use < self.limit and not self._waiters:
+            self._in_use += 1
+            if self._in_use == self.limit:
+                self._saturated = True
+            self._started(job)
+            return
+
+        self._saturated = True
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append((waiter, job))
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self._release()
+            else:
+                self._waiters.remove((waiter, job))
+            raise
+
+    def _started(self, job: Job) -> None:
+        if self._scheduler is not None:
+            self._scheduler.started(job)
+
+    def _release(self) -> None:
+        self._in_use -= 1
+        self._wake()
+        self._maybe_adjust()
+
+    def _wake(self) -> None:
+        """Передача освободившихся слотов ожидающим."""
+        while self._waiters and self._in_use < self.limit:
+            index = 0
+            if self._scheduler is not None:
+                index = self._scheduler.pick([job for _, job in self._waiters])
+            waiter, job = self._waiters.pop(index)
+            if not waiter.done():
+                self._in_use += 1
+                self._started(job)
+                waiter.set_result(None)
+
+    def _maybe_adjust(self) -> None:
+        now = self._clock()
+        elapsed = now - self._window_started
+        if elapsed < self._window:
+            return
+
+        throughput = self._window_bytes / elapsed
+        last_throughput = self._last_throughput
+        new_limit = self.limit
+        reason = ""
+        if self._window_errors:
+            new_limit = int(self.limit * self._decrease_factor)
+            reason = "ошибок: %d" % self._window_errors
+        elif last_throughput is not None and self._saturated:
+            if throughput > last_throughput * (1 + ADAPTIVE_THROUGHPUT_GAIN):
+                new_limit = self.limit + 1
+                reason = "скорость растёт"
+            elif throughput < last_throughput * (1 - ADAPTIVE_THROUGHPUT_DROP):
+                new_limit = int(self.limit * self._decrease_factor)
+                reason = "скорость упала"
+        new_limit = max(self._minimum, min(self._maximum, new_limit))
+
+        if new_limit != self.limit:
+            console.print(
+                "%s: предел %d -> %d (%s, %.1f КБ/с)"
+                % (
+                    self._name,
+                    self.limit,
+                    new_limit,
+                    reason,
+                    throughput / 1024,
+                ),
+                style="debug",
+            )
+            self.adjustments += 1
+            self.limit = new_limit
+            self._wake()
+
+        self._last_throughput = throughput
+        self._window_started = now
+        self._window_bytes = 0
+        self._window_errors = 0
+        self._saturated = self._in_use >= self.limit
+
+
+class MemoryBudget:
+    """Общий предел памяти под данные, хранимые в памяти.
+
+    Не ждёт освобождения памяти: если места нет, то `try_reserve`
+    возвращает False, и вызывающий использует путь без памяти.
+    """
+
+    def __init__(self, limit: int) -> None:
+        """Создание предела.
+
+        Args:
+            limit: Предел в байтах.
+        """
+        self.limit = limit
+        #: Занято байт.
+        self.used = 0
+        #: Количество отказов из-за исчерпанного предела.
+        self.refusals = 0
+
+    def try_reserve(self, size: int) -> bool:
+        """Резервирование памяти.
+
+        Args:
+            size: Количество байт.
+
+        Returns:
+            True, если память зарезервирована.
+        """
+        if self.used + size > self.limit:
+            self.refusals += 1
+            return False
+        self.used += size
+        return True
+
+    def release(self, size: int) -> None:
+        """Освобождение зарезервированной памяти.
+
+        Args:
+            size: Количество байт, переданное в `try_reserve`.
+        """
+        self.used = max(0, self.used - size)
@@ -1,12 +1,39 @@
-from rich.console import Console
-from rich.theme import Theme
-
-custom_theme = Theme(
-    {
-        "debug": "magenta",
-        "info": "green",
-        "warning": "yellow",
-        "error": "bold red",
-    }
-)
-console = Console(theme=custom_theme, highlight=False)
+from typing import TYPE_CHECKING, Any, Optional, cast
+
+if TYPE_CHECKING:
+    from rich.console import Console
+
+
+class _LazyConsole:
+    """Консоль rich, создаваемая при первом обращении к ней.
+
+    Импорт rich - заметная часть времени запуска программы, а `--version`,
+    `--help` и быстрые проверки конфигурации выводят текст без rich.
+    """
+
+    _console: Optional["Console"] = None
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._get(), name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        setattr(self._get(), name, value)
+
+    def _get(self) -> "Console":
+        if _LazyConsole._console is None:
+            from rich.console import Console  # noqa: WPS433
+            from rich.theme import Theme  # noqa: WPS433
+
+            custom_theme = Theme(
+                {
+                    "debug": "magenta",
+                    "info": "green",
+                    "warning": "yellow",
+                    "error": "bold red",
+                }
+            )
+            _LazyConsole._console = Console(theme=custom_theme, highlight=False)
+        return _LazyConsole._console
+
+
+console = cast("Console", _LazyConsole())
@@ -0,0 +1,328 @@
+import asyncio
+from abc import ABC, abstractmethod
+from concurrent.futures import Executor
+from datetime import datetime, timezone
+from functools import partial
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from .config import (
+    BULK_METADATA_BATCH_SIZE,
+    BULK_METADATA_URL,
+    MOD_PAGE_URL,
+    MOD_PAGE_UTC_OFFSET,
+)
+from .http_client import HttpClient, RequestKind
+from .logging import console
+from .metadata_cache import MetadataCache
+from .mod_page import parse_mod_page
+from .retry import RetryBudget
+
+#: Формат даты последнего обновления, как на странице мода.
+LAST_UPDATE_FORMAT = "%d.%m.%Y / %H:%M"
+
+
+class ModDetails(NamedTuple):
+    """Информация о моде, полученная от сервера."""
+
+    title: str
+    last_update: str
+    #: Размер архива мода в байтах, если известен.
+    file_size: Optional[int] = None
+    #: ID игры мода, если известен.
+    app_id: Optional[int] = None
+    #: Время последнего обновления мода, unix time, если известно.
+    time_updated: Optional[int] = None
+
+
+def is_same_update(
+    last_update: str,
+    time_updated: Optional[int],
+    other_last_update: str,
+    other_time_updated: Optional[int],
+) -> bool:
+    """Проверка на то, что две даты последнего обновления мода совпадают.
+
+    Если время обновления unix time известно у обеих, то сравнивается оно.
+    Иначе сравниваются даты. Даты от `GetPublishedFileDetails` записаны в
+    UTC, а на странице мода - в часовом поясе сайта, поэтому если время
+    известно только у одной из них, то дата со страницы, опережающая дату
+    в UTC ровно на `MOD_PAGE_UTC_OFFSET`, считается той же датой. Любая
+    другая разница - новое обновление.
+
+    Args:
+        last_update: Дата последнего обновления.
+        time_updated: Время последнего обновления, unix time.
+        other_last_update: Другая дата последнего обновления.
+        other_time_updated: Другое время последнего обновления, unix time.
+
+    Returns:
+        True, если это одно и то же обновление мода.
+    """
+    if time_updated is not None and other_time_updated is not None:
+        return time_updated == other_time_updated
+    if last_update == other_last_update:
+        return True
+    if (time_updated is None) == (other_time_updated is None):
+        return False
+    if time_updated is None:
+        page_update, utc_update = last_update, other_last_update
+    else:
+        page_update, utc_update = other_last_update, last_update
+    try:
+        offset = (
+            datetime.strptime(page_update, LAST_UPDATE_FORMAT)
+            - datetime.strptime(utc_update, LAST_UPDATE_FORMAT)
+        ).total_seconds()
+    except ValueError:
+        return False
+    return offset == MOD_PAGE_UTC_OFFSET
+
+
+class MetadataBackend(ABC):
+    """Источник информации о модах."""
+
+    #: Сколько модов имеет смысл запрашивать за один вызов `fetch`.
+    batch_size = 1
+
+    @abstractmethod
+    async def fetch(self, mod_ids: List[int]) -> Dict[int, ModDetails]:
+        """Получение информации о модах.
+
+        Args:
+            mod_ids: ID модов.
+
+        Returns:
+            Информация по ID модов. Моды, информацию о которых получить не
+            удалось, отсутствуют.
+        """
+
+
+class PageMetadataBackend(MetadataBackend):
+    """Информация со страниц модов на steamworkshop.download.
+
+    Каждая страница запрашивается отдельно. Если в кеше есть `ETag` или
+    `Last-Modified` страницы, то запрос условный, и неизменившаяся страница
+    не разбирается заново.
+    """
+
+    def __init__(
+        self,
+        http: HttpClient,
+        cache: MetadataCache,
+        executor: Optional[Executor] = None,
+        conditional: bool = True,
+        page_url: str = MOD_PAGE_URL,
+        retry: Optional[RetryBudget] = None,
+    ) -> None:
+        """Создание источника.
+
+        Args:
+            http: Общий HTTP клиент.
+            cache: Кеш информации о модах.
+            executor: Пул потоков для разбора страниц.
+            conditional: Использовать условные запросы.
+            page_url: Шаблон адреса страницы мода с `{}` вместо ID.
+            retry: Запас повторов неудавшихся запросов. Без него запросы
+                не повторяются.
+        """
+        self._http = http
+        self._retry = retry if retry is not None else RetryBudget(budget=0)
+        self._cache = cache
+        self._conditional = conditional
+        self._page_url = page_url
+        self._executor = executor
+
+    async def fetch(self, mod_ids: List[int]) -> Dict[int, ModDetails]:
+        """Получение информации о модах по их страницам.
+
+        Args:
+            mod_ids: ID модов.
+
+        Returns:
+            Информация по ID модов.
+        """
+        details = await asyncio.gather(
+            *[self._fetch_one(mod_id) for mod_id in mod_ids]
+        )
+        return {
+            mod_id: mod_details
+            for mod_id, mod_details in zip(mod_ids, details)
+            if mod_details is not None
+        }
+
+    async def _fetch_one(self, mod_id: int) -> Optional[ModDetails]:
+        try:
+            return await self._retry.run(
+                "Получение информации о моде %d" % mod_id,
+                partial(self._fetch_page, mod_id),
+            )
+        except Exception as err:
+            console.print(
+                "Произошла ошибка при получении информации о моде [cyan]%s[/cyan]. %s"
+                % (mod_id, err),
+                style="error",
+            )
+            return None
+
+    async def _fetch_page(self, mod_id: int) -> ModDetails:
+        headers = self._cache.validators(mod_id) if self._conditional else {}
+        async with self._http.get(
+            self._page_url.format(mod_id), RequestKind.METADATA, headers=headers
+        ) as response:
+            if response.status == 304 and headers:
+                cached = self._cache.revalidate(mod_id)
+                return ModDetails(
+                    cached["name"],
+                    cached["last_update_date"],
+                    cached["file_size"],
+                    cached["app_id"],
+                    cached["time_updated"],
+                )
+            response.raise_for_status()
+            html = await response.text()
+
+        loop = asyncio.get_running_loop()
+        page = await loop.run_in_executor(self._executor, parse_mod_page, html)
+        self._cache.put(
+            mod_id,
+            page.title,
+            page.last_update,
+            response.headers.get("ETag"),
+            response.headers.get("Last-Modified"),
+        )
+        return ModDetails(page.title, page.last_update)
+
+
+class BulkMetadataBackend(MetadataBackend):
+    """Информация о многих модах одним запросом `GetPublishedFileDetails`.
+
+    Моды, которые сервер не нашёл или вернул без нужных полей, а также все
+    моды при ошибке запроса запрашиваются у запасного источника.
+    """
+
+    def __init__(
+        self,
+        http: HttpClient,
+        cache: MetadataCache,
+        fallback: MetadataBackend,
+        url: str = BULK_METADATA_URL,
+        batch_size: int = BULK_METADATA_BATCH_SIZE,
+        retry: Optional[RetryBudget] = None,
+    ) -> None:
+        """Создание источника.
+
+        Args:
+            http: Общий HTTP клиент.
+            cache: Кеш информации о модах.
+            fallback: Запасной источник.
+            url: Адрес метода `GetPublishedFileDetails`.
+            batch_size: Максимальное количество модов в одном запросе.
+            retry: Запас повторов неудавшихся запросов. Без него запросы
+                не повторяются.
+        """
+        self._http = http
+        self._retry = retry if retry is not None else RetryBudget(budget=0)
+        self._cache = cache
+        self._fallback = fallback
+        self._url = url
+        self.batch_size = batch_size
+        #: Количество отправленных запросов.
+        self.requests_sent = 0
+
+    async def fetch(self, mod_ids: List[int]) -> Dict[int, ModDetails]:
+        """Получение информации о модах пачками по `batch_size`.
+
+        Args:
+            mod_ids: ID модов.
+
+        Returns:
+            Информация по ID модов.
+        """
+        batches = [
+            mod_ids[start : start + self.batch_size]
+            for start in range(0, len(mod_ids), self.batch_size)
+        ]
+        details: Dict[int, ModDetails] = {}
+        for batch_details in await asyncio.gather(
+            *[self._fetch_batch(batch) for batch in batches]
+        ):
+            details.update(batch_details)
+
+        unresolved = [mod_id for mod_id in mod_ids if mod_id not in details]
+        if unresolved:
+            console.print(
+                "Информация о модах [cyan]%s[/cyan] будет получена со страниц"
+                % ", ".join(map(str, unresolved)),
+                style="debug",
+            )
+            details.update(await self._fallback.fetch(unresolved))
+        return details
+
+    async def _fetch_batch(self, mod_ids: List[int]) -> Dict[int, ModDetails]:
+        data = {"itemcount": str(len(mod_ids)), "format": "json"}
+        for index, mod_id in enumerate(mod_ids):
+            data["publishedfileids[%d]" % index] = str(mod_id)
+
+        try:
+            response_json = await self._retry.run(
+                "Получение информации о %d модах" % len(mod_ids),
+                partial(self._post, data),
+            )
+            items = response_json["response"]["publishedfiledetails"]
+        except Exception as err:
+            console.print(
+                "Не удалось получить информацию о модах одним запросом. %s"
+                % err,
+                style="warning",
+            )
+            return {}
+
+        details: Dict[int, ModDetails] = {}
+        for item in items:
+            parsed = _parse_item(item)
+            if parsed is None:
+                continue
+            mod_id, mod_details = parsed
+            details[mod_id] = mod_details
+            self._cache.put(
+                mod_id,
+                mod_details.title,
+                mod_details.last_update,
+                None,
+                None,
+                mod_details.file_size,
+                mod_details.app_id,
+                mod_details.time_updated,
+            )
+        return details
+
+    async def _post(self, data: Dict[str, str]) -> Any:
+        self.requests_sent += 1
+        async with self._http.post(
+            self._url, RequestKind.API, data=data
+        ) as response:
+            response.raise_for_status()
+            return await response.json(content_type=None)
+
+
+def _parse_item(item: Dict[str, Any]) -> Optional[Tuple[int, ModDetails]]:
+    """Разбор информации об одном моде. None, если её недостаточно."""
+    try:
+        if item.get("result") != 1:
+            return None
+        mod_id = int(item["publishedfileid"])
+        time_updated = int(item["time_updated"])
+        last_update = datetime.fromtimestamp(
+            time_updated, timezone.utc
+        ).strftime(LAST_UPDATE_FORMAT)
+        file_size = item.get("file_size")
+        app_id = item.get("consumer_app_id")
+        return mod_id, ModDetails(
+            item["title"],
+            last_update,
+            int(file_size) if file_size is not None else None,
+            int(app_id) if app_id is not None else None,
+            time_updated,
+        )
+    except (KeyError, TypeError, ValueError):
+        return None
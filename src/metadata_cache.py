@@ -0,0 +1,181 @@
+import json
+import os
+import time
+from typing import Dict, Optional, TypedDict, Union
+
+from schema import And
+from schema import Optional as SchemaOptional
+from schema import Or, Schema, SchemaError, Use
+
+from .config import METADATA_CACHE_PATH, METADATA_CACHE_TTL
+from .logging import console
+
+
+class ModMetadata(TypedDict):
+    """Кешированная информация о моде."""
+
+    name: str
+    last_update_date: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    #: Размер архива мода в байтах, если известен.
+    file_size: Optional[int]
+    #: ID игры мода, если известен.
+    app_id: Optional[int]
+    #: Время последнего обновления мода, unix time, если известно.
+    time_updated: Optional[int]
+    #: Время последнего получения или подтверждения данных, unix time.
+    fetched_at: float
+
+
+metadata_cache_schema = Schema(
+    {
+        Use(int): {
+            "name": str,
+            "last_update_date": And(str, len),
+            "etag": Or(None, str),
+            "last_modified": Or(None, str),
+            SchemaOptional("file_size", default=None): Or(None, int),
+            SchemaOptional("app_id", default=None): Or(None, int),
+            SchemaOptional("time_updated", default=None): Or(None, int),
+            "fetched_at": Use(float),
+        }
+    }
+)
+
+
+class MetadataCache:
+    """Кеш информации о модах, общий для всех конфигураций.
+
+    Данные моложе `ttl` используются без запроса к серверу. Более старые
+    запрашиваются заново. Страницы модов при этом перепроверяются условным
+    запросом: если страница не изменилась, то сервер отвечает 304 и
+    страница не разбирается заново.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, os.PathLike] = METADATA_CACHE_PATH,
+        ttl: float = METADATA_CACHE_TTL,
+    ) -> None:
+        """Загрузка кеша из файла.
+
+        Args:
+            path: Путь к файлу кеша.
+            ttl: Время в секундах, в течение которого данные не
+                перепроверяются.
+        """
+        self._path = path
+        self._ttl = ttl
+        self._entries = self._load()
+        #: Данные взяты из кеша без запроса.
+        self.hits = 0
+        #: Данные подтверждены сервером ответом 304.
+        self.revalidations = 0
+        #: Данные запрошены заново.
+        self.misses = 0
+
+    def get(self, mod_id: int) -> Optional[ModMetadata]:
+        """Кешированные данные мода, если они ещё не устарели.
+
+        Args:
+            mod_id: ID мода.
+
+        Returns:
+            Данные или None, если их нужно запросить заново.
+        """
+        entry = self._entries.get(mod_id)
+        if entry is None or time.time() - entry["fetched_at"] > self._ttl:
+            return None
+        self.hits += 1
+        return entry
+
+    def validators(self, mod_id: int) -> Dict[str, str]:
+        """Заголовки условного запроса страницы мода.
+
+        Args:
+            mod_id: ID мода.
+
+        Returns:
+            Заголовки `If-None-Match` и `If-Modified-Since`, если известны.
+        """
+        entry = self._entries.get(mod_id)
+        headers: Dict[str, str] = {}
+        if entry is None:
+            return headers
+        if entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        if entry["last_modified"]:
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def revalidate(self, mod_id: int) -> ModMetadata:
+        """Продление срока данных после ответа 304.
+
+        Args:
+            mod_id: ID мода.
+
+        Returns:
+            Данные мода.
+        """
+        entry = self._entries[mod_id]
+        entry["fetched_at"] = time.time()
+        self.revalidations += 1
+        return entry
+
+    def put(
+        self,
+        mod_id: int,
+        name: str,
+        last_update_date: str,
+        etag: Optional[str],
+        last_modified: Optional[str],
+        file_size: Optional[int] = None,
+        app_id: Optional[int] = None,
+        time_updated: Optional[int] = None,
+    ) -> None:
+        """Запись заново полученных данных мода.
+
+        Args:
+            mod_id: ID мода.
+            name: Название мода.
+            last_update_date: Дата последнего обновления мода.
+            etag: Заголовок `ETag` страницы мода.
+            last_modified: Заголовок `Last-Modified` страницы мода.
+            file_size: Размер архива мода в байтах.
+            app_id: ID игры мода.
+            time_updated: Время последнего обновления мода, unix time.
+        """
+        self._entries[mod_id] = {
+            "name": name,
+            "last_update_date": last_update_date,
+            "etag": etag,
+            "last_modified": last_modified,
+            "file_size": file_size,
+            "app_id": app_id,
+            "time_updated": time_updated,
+            "fetched_at": time.time(),
+        }
+        self.misses += 1
+
+    def dump(self) -> None:
+        """Запись кеша в файл."""
+        os.makedirs(os.path.dirname(self._path) or ".", exist_ok=True)
+        tmp_path = str(self._path) + ".tmp"
+        with open(tmp_path, "w") as cache_file:
+            json.dump(self._entries, cache_file, indent=4, sort_keys=True)
+        os.replace(tmp_path, self._path)
+
+    def _load(self) -> Dict[int, ModMetadata]:
+        if not os.path.exists(self._path):
+            return {}
+        try:
+            with open(self._path) as cache_file:
+                return metadata_cache_schema.validate(json.load(cache_file))
+        except (ValueError, SchemaError) as err:
+            console.print(
+                "Кеш информации о модах не валиден и будет пересоздан. %s"
+                % err,
+                style="warning",
+            )
+            return {}
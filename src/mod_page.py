@@ -0,0 +1,85 @@
+import html
+import re
+from typing import NamedTuple, Optional
+
+#: Открывающий или закрывающий тег div.
+_DIV_TAG = re.compile(r"<(/?)div\b[^>]*>", re.IGNORECASE)
+
+#: Ссылка с атрибутом title.
+_TITLED_LINK = re.compile(
+    r"<a\s+(?:[^>]*?\s)?title\s*=\s*" r"""(?:"([^"]*)"|'([^']*)'|([^\s>]+))""",
+    re.IGNORECASE,
+)
+
+_LAST_UPDATE = re.compile("Update:.*")
+
+_TAG = re.compile("<[^>]*>")
+
+
+def _div_with_class(class_name: str) -> "re.Pattern[str]":
+    return re.compile(
+        r"<div\s+(?:[^>]*?\s)?class\s*="
+        r"""\s*["']?[^"'>]*?(?<![\w-])%s(?![\w-])""" % re.escape(class_name),
+        re.IGNORECASE,
+    )
+
+
+_ERROR_DIV = _div_with_class("basic_errors")
+_STORY_DIV = _div_with_class("short-story")
+
+
+class ModPage(NamedTuple):
+    """Данные со страницы мода на steamworkshop.download."""
+
+    title: str
+    last_update: str
+
+
+def parse_mod_page(page: str) -> ModPage:
+    """Получение названия и даты последнего обновления мода со страницы.
+
+    Вместо построения дерева всей страницы ищет только нужные элементы,
+    поэтому работает на порядок быстрее BeautifulSoup. Блокирующая функция,
+    вызывается в пуле потоков.
+
+    Args:
+        page: HTML страницы мода.
+
+    Raises:
+        ValueError: На странице ошибка или нет нужных данных.
+
+    Returns:
+        Данные со страницы.
+    """
+    error = _div_text(page, _ERROR_DIV)
+    if error is not None:
+        raise ValueError(error.strip())
+
+    link_match = _TITLED_LINK.search(page)
+    if link_match is None:
+        raise ValueError("Не удалость получить название")
+    title = html.unescape(next(filter(None, link_match.groups()), ""))
+
+    story = _div_text(page, _STORY_DIV)
+    last_update_match = _LAST_UPDATE.search(story or "")
+    if last_update_match is None:
+        raise ValueError("Не удалость получить дату последнего обновления мода")
+    return ModPage(title, last_update_match[0][8:])
+
+
+def _div_text(page: str, div_pattern: "re.Pattern[str]") -> Optional[str]:
+    """Текст первого подходящего div вместе с вложенными элементами."""
+    start_match = div_pattern.search(page)
+    if start_match is None:
+        return None
+    content_start = page.find(">", start_match.end()) + 1
+    depth = 1
+    for tag in _DIV_TAG.finditer(page, content_start):
+        depth += -1 if tag[1] else 1
+        if depth == 0:
+            return _text(page[content_start : tag.start()])
+    return _text(page[content_start:])
+
+
+def _text(fragment: str) -> str:
+    return html.unescape(_TAG.sub("", fragment))
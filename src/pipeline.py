@@ -0,0 +1,126 @@
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Iterable, List, Optional
+
+from .logging import console
+
+#: Обработчик стадии. Возвращает элемент для следующей стадии или None,
+#: если элемент дальше обрабатывать не нужно.
+StageHandler = Callable[[Any], Awaitable[Optional[Any]]]
+
+#: Признак окончания элементов в очереди стадии.
+_END = object()
+
+
+@dataclass
+class _Stage:
+    name: str
+    handler: StageHandler
+    concurrency: int
+    queue_size: int
+    expand: bool
+
+
+class Pipeline:
+    """Конвейер из последовательных стадий обработки.
+
+    Каждая стадия имеет свою ограниченную очередь и свой предел количества
+    одновременно обрабатываемых элементов. Элемент переходит на следующую
+    стадию сразу после обработки на текущей, не дожидаясь остальных.
+    """
+
+    def __init__(self) -> None:
+        """Создание пустого конвейера."""
+        self._stages: List[_Stage] = []
+
+    def add_stage(
+        self,
+        name: str,
+        handler: StageHandler,
+        concurrency: int,
+        queue_size: int = 0,
+        expand: bool = False,
+    ) -> None:
+        """Добавление стадии в конец конвейера.
+
+        Args:
+            name: Название стадии для логов.
+            handler: Обработчик элемента.
+            concurrency: Максимальное количество одновременно обрабатываемых
+                элементов.
+            queue_size: Размер очереди перед стадией. 0 - без ограничения.
+            expand: Обработчик возвращает список элементов, которые
+                передаются дальше по отдельности.
+        """
+        self._stages.append(
+            _Stage(name, handler, concurrency, queue_size, expand)
+        )
+
+    async def run(self, items: Iterable[Any]) -> List[Any]:
+        """Прогон элементов через все стадии.
+
+        Args:
+            items: Элементы для первой стадии.
+
+        Returns:
+            Элементы, успешно прошедшие все стадии, в порядке завершения.
+        """
+        queues: List[asyncio.Queue] = [
+            asyncio.Queue(stage.queue_size) for stage in self._stages
+        ]
+        results: List[Any] = []
+
+        async def feed() -> None:  # noqa: WPS430
+            for item in items:
+                await queues[0].put(item)
+            await self._close_queue(queues[0], self._stages[0])
+
+        async def run_stage(index: int) -> None:  # noqa: WPS430
+            output = queues[index + 1] if index + 1 < len(queues) else None
+            await asyncio.gather(
+                *[
+                    self._work(
+                        self._stages[index], queues[index], output, results
+                    )
+                    for _ in range(self._stages[index].concurrency)
+                ]
+            )
+            if output is not None:
+                await self._close_queue(output, self._stages[index + 1])
+
+        await asyncio.gather(
+            feed(), *[run_stage(index) for index in range(len(self._stages))]
+        )
+        return results
+
+    async def _work(
+        self,
+        stage: _Stage,
+        queue: asyncio.Queue,
+        output: Optional[asyncio.Queue],
+        results: List[Any],
+    ) -> None:
+        while True:
+            item = await queue.get()
+            if item is _END:
+                return
+            try:
+                result = await stage.handler(item)
+            except Exception as err:
+                console.print(
+                    "Произошла ошибка на стадии [cyan]%s[/cyan]. %s"
+                    % (stage.name, err),
+                    style="error",
+                )
+                continue
+            if result is None:
+                continue
+            for output_item in result if stage.expand else [result]:
+                if output is None:
+                    results.append(output_item)
+                else:
+                    await output.put(output_item)
+
+    async def _close_queue(self, queue: asyncio.Queue, stage: _Stage) -> None:
+        for _ in range(stage.concurrency):
+            await queue.put(_END)
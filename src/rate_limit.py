@@ -0,0 +1,97 @@
+import asyncio
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Callable, Optional
+
+
+class TokenBucket:
+    """Ведро жетонов: ограничитель частоты запросов или скорости передачи.
+
+    Операции идут без задержки, пока в ведре есть жетоны. Жетоны
+    пополняются со скоростью `rate` в секунду до `burst`. Ожидающие
+    операции обслуживаются по очереди: каждая резервирует жетоны заранее и
+    ждёт, пока резерв не покроется пополнением.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: int,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Создание ведра.
+
+        Args:
+            rate: Количество жетонов в секунду.
+            burst: Максимальное количество жетонов в ведре.
+            clock: Часы в секундах.
+        """
+        self._rate = rate
+        self._burst = burst
+        self._clock = clock
+        self._tokens = float(burst)
+        self._updated_at = clock()
+        self._paused_until = 0.0
+        #: Суммарное время ожидания жетонов в секундах.
+        self.waited = 0.0
+
+    def reserve(self, count: int = 1) -> float:
+        """Резервирование жетонов.
+
+        Args:
+            count: Количество жетонов: 1 на запрос или количество байт.
+
+        Returns:
+            Время в секундах, через которое можно выполнить операцию.
+        """
+        now = self._clock()
+        self._tokens = min(
+            self._burst, self._tokens + (now - self._updated_at) * self._rate
+        )
+        self._updated_at = now
+        self._tokens -= count
+        delay = max(0, -self._tokens / self._rate)
+        return max(delay, self._paused_until - now)
+
+    async def acquire(self, count: int = 1) -> None:
+        """Ожидание разрешения на операцию.
+
+        Args:
+            count: Количество жетонов.
+        """
+        delay = self.reserve(count)
+        if delay > 0:
+            self.waited += delay
+            await asyncio.sleep(delay)
+
+    def pause(self, seconds: float) -> None:
+        """Приостановка запросов, например по заголовку `Retry-After`.
+
+        Args:
+            seconds: Время в секундах.
+        """
+        self._paused_until = max(self._paused_until, self._clock() + seconds)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Разбор заголовка `Retry-After`.
+
+    Args:
+        value: Количество секунд или HTTP дата.
+
+    Returns:
+        Время ожидания в секундах или None, если заголовка нет или он
+        некорректен.
+    """
+    if not value:
+        return None
+    if value.strip().isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0, (retry_at - datetime.now(timezone.utc)).total_seconds())
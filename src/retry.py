@@ -0,0 +1,136 @@
+import asyncio
+import random
+from typing import Awaitable, Callable, Optional, TypeVar
+
+import aiohttp
+
+from .backends import BackendError, UnsupportedModError
+from .config import (
+    RETRY_BASE_DELAY,
+    RETRY_BUDGET,
+    RETRY_MAX_ATTEMPTS,
+    RETRY_MAX_DELAY,
+)
+from .logging import console
+from .rate_limit import parse_retry_after
+
+T = TypeVar("T")
+
+#: Статусы ответа, после которых запрос имеет смысл повторить.
+_RETRYABLE_STATUSES = frozenset((408, 425, 429))
+
+
+class RetryBudget:
+    """Повтор шагов обработки модов с общим на весь запуск запасом повторов.
+
+    Перед повтором выдерживается экспоненциально растущая задержка со
+    случайной составляющей, но не меньше `Retry-After` из ответа сервера.
+    Повторяется только упавший шаг, а не вся обработка мода. Когда запас
+    повторов исчерпан, ошибки сразу передаются дальше.
+    """
+
+    def __init__(
+        self,
+        budget: int = RETRY_BUDGET,
+        attempts: int = RETRY_MAX_ATTEMPTS,
+        base_delay: float = RETRY_BASE_DELAY,
+        max_delay: float = RETRY_MAX_DELAY,
+    ) -> None:
+        """Создание запаса повторов.
+
+        Args:
+            budget: Общее количество повторов.
+            attempts: Максимальное количество попыток одного шага.
+            base_delay: Задержка перед первым повтором в секундах.
+            max_delay: Максимальная задержка перед повтором в секундах.
+        """
+        self._budget = budget
+        self._attempts = attempts
+        self._base_delay = base_delay
+        self._max_delay = max_delay
+        #: Оставшееся количество повторов.
+        self.remaining = budget
+        #: Количество сделанных повторов.
+        self.retries = 0
+
+    def reset(self) -> None:
+        """Восстановление запаса повторов для следующего запуска.
+
+        Количество сделанных повторов не сбрасывается.
+        """
+        self.remaining = self._budget
+
+    async def run(self, name: str, step: Callable[[], Awaitable[T]]) -> T:
+        """Выполнение шага с повторами.
+
+        Args:
+            name: Описание шага для логов.
+            step: Функция, создающая корутину шага. Вызывается на каждую
+                попытку.
+
+        Returns:
+            Результат шага.
+
+        Raises:
+            Exception: Ошибка последней попытки, если её нельзя повторить,
+                попытки закончились или исчерпан запас повторов.
+        """
+        attempt = 1
+        while True:
+            try:
+                return await step()
+            except Exception as err:
+                if (
+                    attempt >= self._attempts
+                    or self.remaining <= 0
+                    or not is_retryable(err)
+                ):
+                    raise
+                delay = self._delay(attempt, err)
+                self.remaining -= 1
+                self.retries += 1
+                console.print(
+                    "%s: ошибка (%s). Попытка %d через %.1f с"
+                    % (
+                        name,
+                        str(err) or type(err).__name__,
+                        attempt + 1,
+                        delay,
+                    ),
+                    style="warning",
+                )
+                await asyncio.sleep(delay)
+                attempt += 1
+
+    def _delay(self, attempt: int, err: Exception) -> float:
+        backoff = min(self._max_delay, self._base_delay * 2 ** (attempt - 1))
+        delay = random.uniform(0, backoff)
+        retry_after = _retry_after(err)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+
+def is_retryable(err: BaseException) -> bool:
+    """Проверка на то, что ошибка временная и шаг стоит повторить.
+
+    Args:
+        err: Ошибка.
+
+    Returns:
+        True для ошибок соединения, истечения времени, ответов 408, 425,
+        429 и 5xx и отказов источников скачивания.
+    """
+    if isinstance(err, aiohttp.ClientResponseError):
+        return err.status in _RETRYABLE_STATUSES or err.status >= 500
+    if isinstance(err, UnsupportedModError):
+        return False
+    return isinstance(
+        err, (aiohttp.ClientError, asyncio.TimeoutError, BackendError)
+    )
+
+
+def _retry_after(err: Exception) -> Optional[float]:
+    if not isinstance(err, aiohttp.ClientResponseError) or not err.headers:
+        return None
+    return parse_retry_after(err.headers.get("Retry-After"))
@@ -0,0 +1,97 @@
+from collections import defaultdict
+from typing import DefaultDict, List, NamedTuple, Optional
+
+from .config import DOWNLOAD_SCHEDULING
+
+#: Поддерживаемые порядки скачивания.
+SCHEDULING_POLICIES = ("fifo", "sjf", "fair")
+
+
+class Job(NamedTuple):
+    """Ожидающее скачивание."""
+
+    #: Размер архива в байтах, если известен.
+    size: Optional[int]
+    #: Группа, между которыми делится скорость при порядке "fair".
+    group: str = ""
+
+
+class DownloadScheduler:
+    """Выбор следующего скачивания из ожидающих свободного слота.
+
+    "fifo" - в порядке ожидания. "sjf" - сначала самый маленький архив.
+    "fair" - группа, получившая меньше всего байт, а в ней самый маленький
+    архив. Неизвестный размер считается равным среднему известному.
+    """
+
+    def __init__(self, policy: str = DOWNLOAD_SCHEDULING) -> None:
+        """Создание планировщика.
+
+        Args:
+            policy: Порядок скачивания из `SCHEDULING_POLICIES`.
+
+        Raises:
+            ValueError: Неизвестный порядок.
+        """
+        if policy not in SCHEDULING_POLICIES:
+            raise ValueError(
+                "Неизвестный порядок скачивания %s. Допустимые: %s"
+                % (policy, ", ".join(SCHEDULING_POLICIES))
+            )
+        self._policy = policy
+        self._known_total = 0
+        self._known_count = 0
+        self._served: DefaultDict[str, float] = defaultdict(float)
+
+    def observe(self, size: int) -> None:
+        """Учёт известного размера архива для оценки неизвестных.
+
+        Args:
+            size: Размер архива в байтах.
+        """
+        self._known_total += size
+        self._known_count += 1
+
+    def estimate(self, job: Job) -> float:
+        """Известный или оценённый размер архива.
+
+        Args:
+            job: Скачивание.
+
+        Returns:
+            Размер в байтах.
+        """
+        if job.size is not None:
+            return job.size
+        if not self._known_count:
+            return 0
+        return self._known_total / self._known_count
+
+    def pick(self, jobs: List[Job]) -> int:
+        """Выбор следующего скачивания.
+
+        Args:
+            jobs: Ожидающие скачивания в порядке ожидания.
+
+        Returns:
+            Индекс выбранного скачивания.
+        """
+        if self._policy == "fifo":
+            return 0
+        candidates = list(range(len(jobs)))
+        if self._policy == "fair":
+            group = min(
+                (job.group for job in jobs), key=self._served.__getitem__
+            )
+            candidates = [
+                index for index in candidates if jobs[index].group == group
+            ]
+        return min(candidates, key=lambda index: self.estimate(jobs[index]))
+
+    def started(self, job: Job) -> None:
+        """Учёт начатого скачивания.
+
+        Args:
+            job: Скачивание.
+        """
+        self._served[job.group] += self.estimate(job)
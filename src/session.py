@@ -0,0 +1,241 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import AsyncExitStack
+from functools import partial
+from types import TracebackType
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Type,
+)
+
+from .archive_store import ArchiveStore
+from .backends import BackendPool
+from .cache import ModCacheStore
+from .config import (
+    ARCHIVE_MEMORY_BUDGET,
+    BANDWIDTH_LIMIT,
+    BULK_METADATA_URL,
+    DOWNLOAD_BACKENDS,
+    EXTRACT_SIMULTANEOUS_MAX_COUNT,
+    METADATA_BACKEND,
+    MOD_PAGE_URL,
+    PAGE_PARSE_WORKERS_COUNT,
+    SIMULTANEOUS_DOWNLOAD_INITIAL_COUNT,
+    SIMULTANEOUS_DOWNLOAD_MAX_COUNT,
+    SIMULTANEOUS_DOWNLOAD_MIN_COUNT,
+)
+from .http_client import HttpClient
+from .limiter import AdaptiveLimiter, MemoryBudget
+from .logging import console
+from .metadata_cache import MetadataCache
+from .rate_limit import TokenBucket
+from .retry import RetryBudget
+from .scheduler import DownloadScheduler
+
+
+class Endpoints(NamedTuple):
+    """Серверы, к которым обращается загрузчик.
+
+    По умолчанию берутся из `src/config.py`. Другие адреса нужны, например,
+    чтобы запустить загрузчик с локальным сервером в замерах скорости.
+    """
+
+    #: Источник информации о модах: "bulk" или "page".
+    metadata_backend: str = METADATA_BACKEND
+    #: Шаблон адреса страницы мода с `{}` вместо ID.
+    mod_page_url: str = MOD_PAGE_URL
+    #: Адрес метода `GetPublishedFileDetails`.
+    bulk_metadata_url: str = BULK_METADATA_URL
+    #: Источники скачивания: тип источника и адрес его сервера.
+    download_backends: List[Tuple[str, str]] = DOWNLOAD_BACKENDS
+
+
+class DownloadSession:
+    """Ресурсы, общие для загрузчиков всех конфигураций одного запуска.
+
+    HTTP клиент, источники скачивания, ограничители, предел памяти, кеши
+    информации о модах и установленных модов, хранилище архивов и пулы
+    потоков создаются один раз, поэтому конфигурации, обрабатываемые
+    одновременно, делят одни и те же соединения и пределы. Шаги, общие для
+    нескольких конфигураций, выполняются один раз через `single_flight`.
+    """
+
+    def __init__(
+        self,
+        force_refresh: bool = False,
+        verify: bool = False,
+        prune: bool = False,
+        endpoints: Endpoints = Endpoints(),
+        http: Optional[HttpClient] = None,
+    ) -> None:
+        """Создание ресурсов. Они открываются при входе в контекст.
+
+        Args:
+            force_refresh: Запрашивать информацию о модах, не используя кеш.
+            verify: Проверять установленные файлы модов последней версии и
+                переустанавливать повреждённые.
+            prune: Удалять лишние папки модов, оставшиеся после смены
+                названия мода.
+            endpoints: Серверы, к которым обращается загрузчик.
+            http: HTTP клиент, например без ограничения частоты запросов.
+                По умолчанию создаётся с настройками из `src/config.py`.
+        """
+        self.force_refresh = force_refresh
+        self.verify = verify
+        self.prune = prune
+        self.endpoints = endpoints
+        self.archive_store = ArchiveStore()
+        self.http = http if http is not None else HttpClient()
+        self.retry = RetryBudget()
+        self.backends = BackendPool.from_config(
+            self.http, endpoints.download_backends
+        )
+        self.scheduler = DownloadScheduler()
+        self.download_limiter = AdaptiveLimiter(
+            "Скачивание",
+            SIMULTANEOUS_DOWNLOAD_INITIAL_COUNT,
+            SIMULTANEOUS_DOWNLOAD_MIN_COUNT,
+            SIMULTANEOUS_DOWNLOAD_MAX_COUNT,
+            scheduler=self.scheduler,
+        )
+        self.bandwidth: Optional[TokenBucket] = None
+        if BANDWIDTH_LIMIT is not None:
+            self.bandwidth = TokenBucket(BANDWIDTH_LIMIT, BANDWIDTH_LIMIT)
+        self.memory_budget = MemoryBudget(ARCHIVE_MEMORY_BUDGET)
+        self.metadata_cache = MetadataCache()
+        self.mod_cache = ModCacheStore()
+        self.extract_executor: Optional[ThreadPoolExecutor] = None
+        self.parse_executor: Optional[ThreadPoolExecutor] = None
+        #: Количество шагов, результат которых взят у другой конфигурации.
+        self.shared_flights = 0
+        self._flights: Dict[Tuple[Any, ...], "asyncio.Future[Any]"] = {}
+        self._exit_stack = AsyncExitStack()
+
+    async def __aenter__(self) -> "DownloadSession":
+        """Открытие пулов потоков, HTTP клиента и источников."""
+        self.extract_executor = self._exit_stack.enter_context(
+            ThreadPoolExecutor(EXTRACT_SIMULTANEOUS_MAX_COUNT)
+        )
+        self.parse_executor = self._exit_stack.enter_context(
+            ThreadPoolExecutor(PAGE_PARSE_WORKERS_COUNT)
+        )
+        self._exit_stack.callback(self.metadata_cache.dump)
+        self._exit_stack.callback(self.archive_store.dump)
+        # Вызывается до записи индекса: удалённые архивы не попадут в файл
+        self._exit_stack.callback(self.archive_store.release)
+        self._exit_stack.callback(self.mod_cache.close)
+        await self._exit_stack.enter_async_context(self.http)
+        await self._exit_stack.enter_async_context(self.backends)
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        """Закрытие ресурсов, запись кешей и индекса хранилища архивов."""
+        await self._exit_stack.aclose()
+
+    async def single_flight(
+        self, key: Tuple[Any, ...], step: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """Выполнение шага один раз на весь запуск.
+
+        Конфигурации, запросившие шаг с тем же ключом, получают результат
+        или ошибку первого выполнения, в том числе ещё не завершённого.
+        Упавший шаг забывается, как только завершится, и при следующем
+        запросе выполняется заново. Результаты успешных шагов хранятся до
+        `clear_flights`.
+
+        Args:
+            key: Ключ шага, например название шага, ID мода и дата его
+                последнего обновления.
+            step: Функция, создающая корутину шага.
+
+        Returns:
+            Результат шага.
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = asyncio.ensure_future(step())
+            self._flights[key] = flight
+            flight.add_done_callback(partial(self._forget_failed_flight, key))
+        else:
+            self.shared_flights += 1
+        # Отмена одной конфигурации не должна отменять шаг для остальных
+        return await asyncio.shield(flight)
+
+    def clear_flights(self) -> None:
+        """Забыть результаты завершённых шагов `single_flight`.
+
+        Вызывается между проходами режима наблюдения, чтобы следующий проход
+        выполнял шаги заново, а не получал устаревшие результаты.
+        """
+        self._flights = {
+            key: flight
+            for key, flight in self._flights.items()
+            if not flight.done()
+        }
+
+    def _forget_failed_flight(
+        self, key: Tuple[Any, ...], flight: "asyncio.Future[Any]"
+    ) -> None:
+        if self._flights.get(key) is not flight:
+            return
+        if flight.cancelled() or flight.exception() is not None:
+            del self._flights[key]  # noqa: WPS420
+
+    def print_summary(self) -> None:
+        """Вывод статистики работы общих ресурсов."""
+        console.print(
+            "Информация о модах из кеша: %d, подтверждена сервером: %d, "
+            "запрошена заново: %d"
+            % (
+                self.metadata_cache.hits,
+                self.metadata_cache.revalidations,
+                self.metadata_cache.misses,
+            ),
+            style="info",
+        )
+        for backend in self.backends.backends:
+            console.print(
+                "Источник [cyan]%s[/cyan]: подготовлено %d, ошибок %d, "
+                "здоровье %.2f, средняя задержка %s"
+                % (
+                    backend.name,
+                    backend.prepared,
+                    backend.failures,
+                    backend.health,
+                    (
+                        "%.1f с" % backend.latency
+                        if backend.latency is not None
+                        else "неизвестна"
+                    ),
+                ),
+                style="debug",
+            )
+        console.print(
+            "HTTP соединений создано: %d, переиспользовано: %d. "
+            "Продублировано запросов подготовки: %d. "
+            "Одновременных скачиваний в конце: %d. "
+            "Повторов: %d, ожидание ограничения частоты: %.1f с. "
+            "Шагов, общих для конфигураций: %d"
+            % (
+                self.http.connections_created,
+                self.http.connections_reused,
+                self.backends.hedges,
+                self.download_limiter.limit,
+                self.retry.retries,
+                self.http.throttled_seconds,
+                self.shared_flights,
+            ),
+            style="debug",
+        )
@@ -0,0 +1,187 @@
+import asyncio
+import json
+from dataclasses import dataclass
+from types import TracebackType
+from typing import Dict, List, Optional, Set, Type
+
+from .config import (
+    CHECK_STATUS_BACKOFF_FACTOR,
+    CHECK_STATUS_INTERVAL,
+    CHECK_STATUS_MAX_ERRORS,
+    CHECK_STATUS_MAX_INTERVAL,
+)
+from .http_client import HttpClient, RequestKind
+
+#: Статусы запроса на скачивание, при которых мод уже не будет подготовлен.
+_FAILED_STATUSES: Set[str] = {"failed", "error"}
+
+
+@dataclass
+class _PendingRequest:
+    """Ожидающий подготовки на сервере запрос на скачивание."""
+
+    future: "asyncio.Future[None]"
+    #: Время следующего опроса по часам цикла событий.
+    due: float
+    polls: int = 0
+    #: Количество неудачных опросов подряд.
+    errors: int = 0
+    #: Количество ожидающих подготовки этого запроса.
+    waiters: int = 0
+
+
+class StatusPoller:
+    """Опрос сервера о статусе подготовки модов к скачиванию.
+
+    Все ожидающие запросы проверяются одним запросом к серверу. Запросы,
+    созданные недавно, опрашиваются часто, а долго подготавливаемые - всё
+    реже, вплоть до `CHECK_STATUS_MAX_INTERVAL`. Если опрос не удался,
+    запросы опрашиваются повторно с тем же увеличением интервала, а ошибка
+    передаётся только тем из них, для которых опрос не удался
+    `CHECK_STATUS_MAX_ERRORS` раз подряд.
+    """
+
+    def __init__(self, http: HttpClient, status_url: str) -> None:
+        """Создание опросчика.
+
+        Args:
+            http: Общий HTTP клиент.
+            status_url: Адрес проверки статуса запросов на скачивание.
+        """
+        self._http = http
+        self._status_url = status_url
+        self._pending: Dict[str, _PendingRequest] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional["asyncio.Task[None]"] = None
+        self.requests_sent = 0
+
+    async def __aenter__(self) -> "StatusPoller":
+        """Вход в контекст. Опрос запускается при первом ожидании."""
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        """Остановка опроса."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass  # noqa: WPS420
+            self._task = None
+
+    async def wait_prepared(self, request_uuid: str) -> None:
+        """Ожидание подготовки мода на сервере.
+
+        Args:
+            request_uuid: UUID запроса на скачивание.
+        """
+        loop = asyncio.get_running_loop()
+        wakeup = self._wakeup
+        if wakeup is None or self._task is None or self._task.done():
+            wakeup = asyncio.Event()
+            self._wakeup = wakeup
+            self._task = asyncio.create_task(self._poll_loop(wakeup))
+
+        pending = self._pending.get(request_uuid)
+        if pending is None:
+            pending = _PendingRequest(
+                future=loop.create_future(),
+                due=loop.time() + CHECK_STATUS_INTERVAL,
+            )
+            self._pending[request_uuid] = pending
+            wakeup.set()
+        pending.waiters += 1
+        try:
+            await asyncio.shield(pending.future)
+        except asyncio.CancelledError:
+            pending.waiters -= 1
+            is_polled = self._pending.get(request_uuid) is pending
+            # Отменены все ожидания - запрос больше не опрашивается
+            if pending.waiters == 0 and is_polled:
+                del self._pending[request_uuid]  # noqa: WPS420
+            raise
+
+    async def _poll_loop(self, wakeup: asyncio.Event) -> None:
+        loop = asyncio.get_running_loop()
+        while self._pending:
+            delay = min(req.due for req in self._pending.values()) - loop.time()
+            if delay > 0:
+                wakeup.clear()
+                try:
+                    await asyncio.wait_for(wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass  # noqa: WPS420
+                continue
+
+            try:
+                statuses = await self._request_statuses(list(self._pending))
+            except Exception as err:
+                self._handle_error(err, loop.time())
+                continue
+            self._handle_statuses(statuses, loop.time())
+
+    async def _request_statuses(self, uuids: List[str]) -> Dict[str, dict]:
+        # POST Request:
+        # https://backend-03-prd.steamworkshopdownloader.io/api/download/status
+        # {"uuids":["995afa62-18fe-4d94-9147-eb1d28b74f39", ...]}
+        #
+        # Response:
+        # {
+        #   "995afa62-18fe-4d94-9147-eb1d28b74f39": {
+        #     "age":14,
+        #     "status": "prepared",
+        #     "progress": 200,
+        #     "progressText": "processed!",
+        #     "downloadError": "never transmitted"
+        #   },
+        #   ...
+        # }
+        data = json.dumps({"uuids": uuids})
+        headers = {
+            "Content-Type": "text/plain",
+            "Content-Length": str(len(data)),
+        }
+        self.requests_sent += 1
+        async with self._http.post(
+            self._status_url, RequestKind.API, data=data, headers=headers
+        ) as response:
+            response.raise_for_status()
+            text = await response.text()
+        return json.loads(text)
+
+    def _handle_error(self, err: Exception, now: float) -> None:
+        for uuid, request in list(self._pending.items()):
+            request.errors += 1
+            if request.errors >= CHECK_STATUS_MAX_ERRORS:
+                request.future.set_exception(err)
+                del self._pending[uuid]  # noqa: WPS420
+            else:
+                request.due = now + _backoff(request.errors)
+
+    def _handle_statuses(self, statuses: Dict[str, dict], now: float) -> None:
+        for uuid, request in list(self._pending.items()):
+            request.errors = 0
+            status = statuses.get(uuid, {}).get("status")
+            if status == "prepared":
+                request.future.set_result(None)
+                del self._pending[uuid]  # noqa: WPS420
+            elif status in _FAILED_STATUSES:
+                request.future.set_exception(
+                    ValueError(statuses[uuid].get("progressText", status))
+                )
+                del self._pending[uuid]  # noqa: WPS420
+            else:
+                request.polls += 1
+                request.due = now + _backoff(request.polls)
+
+
+def _backoff(polls: int) -> float:
+    return min(
+        CHECK_STATUS_MAX_INTERVAL,
+        CHECK_STATUS_INTERVAL * CHECK_STATUS_BACKOFF_FACTOR**polls,
+    )
@@ -0,0 +1,234 @@
+import os
+import shutil
+import struct
+import zlib
+from typing import IO, Any, Optional
+
+from .installer import Manifest, MemberInfo, member_path
+from .logging import console
+
+_LOCAL_FILE_HEADER = b"PK\x03\x04"
+_CENTRAL_DIRECTORY_HEADER = b"PK\x01\x02"
+_END_OF_CENTRAL_DIRECTORY = b"PK\x05\x06"
+_DATA_DESCRIPTOR = b"PK\x07\x08"
+
+#: Формат заголовка файла в архиве без сигнатуры.
+_LOCAL_HEADER_STRUCT = struct.Struct("<HHHHHIIIHH")
+_LOCAL_HEADER_SIZE = 4 + _LOCAL_HEADER_STRUCT.size
+
+_FLAG_ENCRYPTED = 0x01
+_FLAG_DATA_DESCRIPTOR = 0x08
+_FLAG_UTF8 = 0x800
+
+_STORED = 0
+_DEFLATED = 8
+
+#: Значение размера, означающее, что настоящий размер лежит в ZIP64 поле.
+_ZIP64_LIMIT = 0xFFFFFFFF
+
+
+class StreamingUnsupportedError(Exception):
+    """Архив нельзя распаковать потоком, нужен центральный каталог."""
+
+
+class StreamingExtractor:
+    """Распаковка zip архива по мере его скачивания.
+
+    Файлы архива разбираются по локальным заголовкам и сразу пишутся в
+    папку `to_path`. Если встретится то, что можно разобрать только по
+    центральному каталогу (например, data descriptor без размеров в
+    заголовке), распаковка прекращается - тогда архив распаковывается
+    обычным способом после скачивания.
+    """
+
+    def __init__(self, to_path: str) -> None:
+        """Создание распаковщика.
+
+        Args:
+            to_path: Папка, в которую будут распакованы файлы.
+        """
+        self._to_path = to_path
+        self.abandoned = False
+        self.reset()
+
+    def reset(self) -> None:
+        """Начало распаковки заново, например при скачивании архива с нуля."""
+        if os.path.exists(self._to_path):
+            shutil.rmtree(self._to_path)
+        self._buffer = bytearray()
+        #: Распакованные файлы по путям относительно папки мода.
+        self.members: Manifest = {}
+        self._in_member = False
+        self._member: Optional[IO[bytes]] = None
+        self._decompressor: Optional[Any] = None
+        self._remaining = 0
+        self._crc = 0
+        self._expected_crc = 0
+        self._flags = 0
+        self._skip_descriptor = False
+        self._finished = False
+
+    def abandon(self, reason: str) -> None:
+        """Отказ от распаковки потоком.
+
+        Args:
+            reason: Причина для логов.
+        """
+        if self.abandoned:
+            return
+        self.abandoned = True
+        self._close_member()
+        console.print(
+            "Архив будет распакован после скачивания. %s" % reason,
+            style="debug",
+        )
+
+    def feed(self, data: bytes) -> None:
+        """Распаковка очередной части архива.
+
+        Args:
+            data: Следующие байты архива.
+        """
+        if self.abandoned or self._finished:
+            return
+        self._buffer += data
+        try:
+            self._process()
+        except Exception as err:
+            self.abandon(str(err))
+
+    def finish(self) -> bool:
+        """Окончание распаковки.
+
+        Если архив не был распакован полностью, то распакованная часть
+        удаляется.
+
+        Returns:
+            True, если архив был полностью распакован.
+        """
+        self._close_member()
+        if self._finished and not self.abandoned:
+            return True
+        if os.path.exists(self._to_path):
+            shutil.rmtree(self._to_path)
+        return False
+
+    def _process(self) -> None:
+        while not self._finished:
+            if self._in_member:
+                if not self._process_member_data():
+                    return
+            elif self._skip_descriptor:
+                if not self._process_data_descriptor():
+                    return
+            elif not self._process_header():
+                return
+
+    def _process_header(self) -> bool:
+        if len(self._buffer) < 4:
+            return False
+        signature = bytes(self._buffer[:4])
+        if signature in {_CENTRAL_DIRECTORY_HEADER, _END_OF_CENTRAL_DIRECTORY}:
+            self._finished = True
+            self._buffer.clear()
+            return False
+        if signature != _LOCAL_FILE_HEADER:
+            raise StreamingUnsupportedError("Неизвестная сигнатура в архиве")
+        if len(self._buffer) < _LOCAL_HEADER_SIZE:
+            return False
+
+        (
+            _version,
+            flags,
+            method,
+            _mtime,
+            _mdate,
+            crc,
+            compressed_size,
+            size,
+            name_length,
+            extra_length,
+        ) = _LOCAL_HEADER_STRUCT.unpack_from(self._buffer, 4)
+        header_size = _LOCAL_HEADER_SIZE + name_length + extra_length
+        if len(self._buffer) < header_size:
+            return False
+
+        if flags & _FLAG_ENCRYPTED:
+            raise StreamingUnsupportedError("Архив зашифрован")
+        if method not in {_STORED, _DEFLATED}:
+            raise StreamingUnsupportedError("Неизвестный метод сжатия")
+        if flags & _FLAG_DATA_DESCRIPTOR and compressed_size == 0:
+            raise StreamingUnsupportedError("Размер файла указан после него")
+        if compressed_size == _ZIP64_LIMIT:
+            raise StreamingUnsupportedError("ZIP64 архив")
+
+        raw_name = bytes(
+            self._buffer[_LOCAL_HEADER_SIZE : _LOCAL_HEADER_SIZE + name_length]
+        )
+        name = raw_name.decode("utf-8" if flags & _FLAG_UTF8 else "cp437")
+        del self._buffer[:header_size]  # noqa: WPS420
+
+        self._flags = flags
+        self._expected_crc = crc
+        self._remaining = compressed_size
+        self._crc = 0
+        self._decompressor = (
+            zlib.decompressobj(-zlib.MAX_WBITS) if method == _DEFLATED else None
+        )
+        self._in_member = True
+        self._member = self._open_member(name, MemberInfo(size, crc))
+        if self._remaining == 0:
+            self._finish_member()
+        return True
+
+    def _process_member_data(self) -> bool:
+        if not self._buffer:
+            return False
+        chunk = bytes(self._buffer[: self._remaining])
+        del self._buffer[: len(chunk)]  # noqa: WPS420
+        self._remaining -= len(chunk)
+        if self._decompressor is not None:
+            chunk = self._decompressor.decompress(chunk)
+        self._write(chunk)
+        if self._remaining == 0:
+            if self._decompressor is not None:
+                self._write(self._decompressor.flush())
+            self._finish_member()
+        return True
+
+    def _process_data_descriptor(self) -> bool:
+        if len(self._buffer) < 4:
+            return False
+        size = 16 if bytes(self._buffer[:4]) == _DATA_DESCRIPTOR else 12
+        if len(self._buffer) < size:
+            return False
+        del self._buffer[:size]  # noqa: WPS420
+        self._skip_descriptor = False
+        return True
+
+    def _write(self, data: bytes) -> None:
+        if data and self._member is not None:
+            self._crc = zlib.crc32(data, self._crc)
+            self._member.write(data)
+
+    def _finish_member(self) -> None:
+        self._in_member = False
+        self._close_member()
+        if self._crc != self._expected_crc:
+            raise StreamingUnsupportedError("Не совпадает CRC-32 файла")
+        self._skip_descriptor = bool(self._flags & _FLAG_DATA_DESCRIPTOR)
+
+    def _close_member(self) -> None:
+        if self._member is not None:
+            self._member.close()
+            self._member = None
+
+    def _open_member(self, name: str, info: MemberInfo) -> Optional[IO[bytes]]:
+        """Открытие файла для записи. Для папок в архиве ничего не делается."""
+        path = member_path(name)
+        if path is None:
+            return None
+        self.members[path] = info
+        target = os.path.join(self._to_path, path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        return open(target, "wb")
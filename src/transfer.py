@@ -0,0 +1,529 @@
+import asyncio
+import json
+import os
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, List, Optional
+
+import aiohttp
+
+from .archive_writer import ArchiveWriter, preallocate
+from .config import (
+    DOWNLOAD_RESUME_ATTEMPTS,
+    DOWNLOAD_SEGMENTS_COUNT,
+    SEGMENTED_DOWNLOAD_MIN_SIZE,
+)
+from .http_client import HttpClient, RequestKind
+from .logging import console
+from .rate_limit import TokenBucket
+from .stream_unzip import StreamingExtractor
+
+#: Расширение недокачанного архива.
+PARTIAL_SUFFIX = ".part"
+
+#: Расширение файла с данными о недокачанном архиве.
+RECORD_SUFFIX = ".part.json"
+
+
+class FileChangedError(aiohttp.ClientPayloadError):
+    """Файл на сервере изменился во время скачивания по частям."""
+
+
+class ArchiveTooLargeError(ValueError):
+    """Файл на сервере больше памяти, выделенной под его скачивание."""
+
+
+@dataclass
+class PartialDownload:
+    """Данные о недокачанном архиве, хранимые рядом с ним.
+
+    По ним определяется, можно ли продолжить скачивание с места остановки.
+    """
+
+    url: str
+    #: Версия мода (дата последнего обновления).
+    version: str
+    expected_length: Optional[int] = None
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    #: Части файла при скачивании по частям:
+    #: [первый байт, последний байт, скачано байт].
+    segments: Optional[List[List[int]]] = None
+
+    @property
+    def validator(self) -> Optional[str]:
+        """Значение для заголовка `If-Range`."""
+        return self.etag or self.last_modified
+
+
+async def download_resumable(
+    http: HttpClient,
+    url: str,
+    path: str,
+    version: str,
+    attempts: int = DOWNLOAD_RESUME_ATTEMPTS,
+    segments: int = DOWNLOAD_SEGMENTS_COUNT,
+    min_segmented_size: int = SEGMENTED_DOWNLOAD_MIN_SIZE,
+    extractor: Optional[StreamingExtractor] = None,
+    on_progress: Optional[Callable[[int], None]] = None,
+    bandwidth: Optional[TokenBucket] = None,
+) -> None:
+    """Скачивание файла с продолжением с места остановки.
+
+    Данные пишутся в `path + PARTIAL_SUFFIX`, рядом хранится
+    `PartialDownload`. Если скачивание прервалось, то при следующей попытке,
+    в том числе после перезапуска программы, запрашивается только
+    недостающая часть файла через заголовок `Range`. Сервер сам отдаст файл
+    целиком, если по заголовку `If-Range` видно, что файл на нём изменился.
+
+    Если сервер сообщил размер файла и поддерживает `Range`, а файл не
+    меньше `min_segmented_size`, то файл делится на `segments` частей,
+    которые скачиваются одновременно в заранее выделенный файл. Иначе
+    файл скачивается одним потоком, но при тех же условиях тоже
+    выделяется заранее и продолжается как одна часть.
+
+    Данные пишутся на диск большими блоками через `ArchiveWriter`.
+
+    Args:
+        http: Общий HTTP клиент.
+        url: Адрес файла.
+        path: Путь, по которому будет лежать скачанный файл.
+        version: Версия файла. Недокачанный файл другой версии удаляется.
+        attempts: Количество попыток скачивания подряд.
+        segments: Количество частей при скачивании по частям.
+        min_segmented_size: Минимальный размер файла для скачивания по
+            частям.
+        extractor: Распаковщик, которому передаются байты файла по мере
+            скачивания. Используется, только если файл скачивается одним
+            потоком с начала.
+        on_progress: Вызывается с количеством байт после записи каждой
+            скачанной части.
+        bandwidth: Общее ограничение скорости скачивания в байтах в
+            секунду.
+
+    Raises:
+        aiohttp.ClientPayloadError: Соединение прерывалось во всех попытках.
+        aiohttp.ServerDisconnectedError: Соединение прерывалось во всех
+            попытках.
+        asyncio.TimeoutError: Соединение прерывалось во всех попытках.
+    """
+    for attempt in range(1, attempts + 1):
+        try:
+            await _download_part(
+                http,
+                url,
+                path,
+                version,
+                segments,
+                min_segmented_size,
+                extractor,
+                on_progress,
+                bandwidth,
+            )
+        except (
+            aiohttp.ClientPayloadError,
+            aiohttp.ServerDisconnectedError,
+            asyncio.TimeoutError,
+        ):
+            if attempt == attempts:
+                raise
+            console.print(
+                "Соединение прервано. Продолжение скачивания [cyan]%s" % path,
+                style="warning",
+            )
+        else:
+            return
+
+
+async def _download_part(
+    http: HttpClient,
+    url: str,
+    path: str,
+    version: str,
+    segments: int,
+    min_segmented_size: int,
+    extractor: Optional[StreamingExtractor],
+    on_progress: Optional[Callable[[int], None]],
+    bandwidth: Optional[TokenBucket],
+) -> None:
+    part_path = path + PARTIAL_SUFFIX
+    record_path = path + RECORD_SUFFIX
+    record = _load_record(record_path)
+    if record is None or not _can_resume(record, part_path, url, version):
+        record = None
+    elif record.segments is not None:
+        _abandon(extractor, "Архив скачивается по частям")
+        record.url = url
+        await _download_segments(
+            http, record, part_path, record_path, on_progress, bandwidth
+        )
+        _complete(part_path, record_path, path)
+        return
+    offset = os.path.getsize(part_path) if record is not None else 0
+
+    headers: Dict[str, str] = {}
+    if record is not None and offset > 0:
+        headers["Range"] = "bytes=%d-" % offset
+        if record.validator:
+            headers["If-Range"] = record.validator
+
+    async with http.get(url, RequestKind.TRANSFER, headers=headers) as response:
+        if (
+            response.status == 416  # noqa: WPS432
+            and record is not None
+            and record.expected_length == offset
+        ):
+            _abandon(extractor, "Архив был скачан ранее")
+            _complete(part_path, record_path, path)
+            return
+        response.raise_for_status()
+
+        if response.status != 206 or not _starts_at(response, offset):
+            offset = 0
+        if record is None or offset == 0:
+            record = PartialDownload(
+                url=url,
+                version=version,
+                expected_length=response.content_length,
+                etag=response.headers.get("ETag"),
+                last_modified=response.headers.get("Last-Modified"),
+            )
+        record.url = url
+
+        if offset == 0 and _can_split(response, segments, min_segmented_size):
+            _abandon(extractor, "Архив скачивается по частям")
+            response.close()
+            record.segments = _split(response.content_length or 0, segments)
+            _dump_record(record, record_path)
+            await _download_segments(
+                http, record, part_path, record_path, on_progress, bandwidth
+            )
+            _complete(part_path, record_path, path)
+            return
+
+        if offset:
+            _abandon(extractor, "Скачивание продолжено с места остановки")
+        elif extractor is not None and not extractor.abandoned:
+            extractor.reset()
+
+        if offset == 0 and _can_preallocate(response):
+            # Файл выделяется заранее, поэтому его размер не говорит о том,
+            # сколько скачано. Прогресс хранится как у единственной части
+            record.segments = _split(response.content_length or 0, 1)
+            _dump_record(record, record_path)
+            with open(part_path, "wb") as part_file:
+                preallocate(part_file, record.expected_length or 0)
+            try:
+                await _receive_segment(
+                    response,
+                    record.segments[0],
+                    part_path,
+                    on_progress,
+                    bandwidth,
+                    extractor,
+                )
+            except BaseException:
+                _dump_record(record, record_path)
+                raise
+            _complete(part_path, record_path, path)
+            return
+
+        _dump_record(record, record_path)
+        async with ArchiveWriter(
+            part_path, offset, truncate=True, extractor=extractor
+        ) as writer:
+            await _receive(response, writer, None, on_progress, bandwidth)
+
+    size = os.path.getsize(part_path)
+    if record.expected_length is not None and size != record.expected_length:
+        raise aiohttp.ClientPayloadError(
+            "Скачано %d байт из %d" % (size, record.expected_length)
+        )
+    _complete(part_path, record_path, path)
+
+
+async def _download_segments(
+    http: HttpClient,
+    record: PartialDownload,
+    part_path: str,
+    record_path: str,
+    on_progress: Optional[Callable[[int], None]],
+    bandwidth: Optional[TokenBucket],
+) -> None:
+    """Одновременное скачивание частей файла.
+
+    Прогресс частей сохраняется в `PartialDownload` при любом исходе, чтобы
+    продолжить скачивание с места остановки.
+    """
+    if (
+        not os.path.exists(part_path)
+        or os.path.getsize(part_path) != record.expected_length
+    ):
+        with open(part_path, "wb") as part_file:
+            preallocate(part_file, record.expected_length or 0)
+
+    tasks = [
+        asyncio.create_task(
+            _download_segment(
+                http, record, segment, part_path, on_progress, bandwidth
+            )
+        )
+        for segment in record.segments or []
+    ]
+    try:
+        done, pending = await asyncio.wait(
+            tasks, return_when=asyncio.FIRST_EXCEPTION
+        )
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        for task in done:
+            task.result()
+    except FileChangedError:
+        _discard(part_path, record_path)
+        raise
+    except BaseException:
+        _dump_record(record, record_path)
+        raise
+
+
+async def _receive(
+    response: aiohttp.ClientResponse,
+    writer: ArchiveWriter,
+    end: Optional[int],
+    on_progress: Optional[Callable[[int], None]],
+    bandwidth: Optional[TokenBucket],
+) -> None:
+    """Запись тела ответа до конца или до байта `end` включительно.
+
+    Части берутся через `readany` такими, какими пришли из сети, без
+    нарезки и склейки под фиксированный размер.
+    """
+    while end is None or writer.position <= end:
+        content = await response.content.readany()
+        if not content:
+            return
+        await writer.write(content)
+        if on_progress is not None:
+            on_progress(len(content))
+        if bandwidth is not None:
+            await bandwidth.acquire(len(content))
+
+
+async def _receive_segment(
+    response: aiohttp.ClientResponse,
+    segment: List[int],
+    path: str,
+    on_progress: Optional[Callable[[int], None]],
+    bandwidth: Optional[TokenBucket],
+    extractor: Optional[StreamingExtractor] = None,
+) -> None:
+    """Запись части файла из ответа сервера.
+
+    Прогресс части - только записанные на диск байты.
+
+    Raises:
+        aiohttp.ClientPayloadError: Часть скачана не полностью.
+    """
+    start, end, written = segment
+    writer = ArchiveWriter(path, start + written, extractor=extractor)
+    try:
+        async with writer:
+            await _receive(response, writer, end, on_progress, bandwidth)
+    finally:
+        segment[2] = writer.flushed - start
+    if start + segment[2] <= end:
+        raise aiohttp.ClientPayloadError(
+            "Часть %d-%d скачана не полностью" % (start, end)
+        )
+
+
+async def _download_segment(
+    http: HttpClient,
+    record: PartialDownload,
+    segment: List[int],
+    path: str,
+    on_progress: Optional[Callable[[int], None]],
+    bandwidth: Optional[TokenBucket],
+) -> None:
+    start, end, written = segment
+    offset = start + written
+    if offset > end:
+        return
+    headers = {"Range": "bytes=%d-%d" % (offset, end)}
+    if record.validator:
+        headers["If-Range"] = record.validator
+
+    async with http.get(
+        record.url, RequestKind.TRANSFER, headers=headers
+    ) as response:
+        response.raise_for_status()
+        if response.status != 206 or not _starts_at(response, offset):
+            raise FileChangedError("Файл на сервере изменился")
+        await _receive_segment(response, segment, path, on_progress, bandwidth)
+
+
+async def download_to_memory(
+    http: HttpClient,
+    url: str,
+    max_size: int,
+    on_progress: Optional[Callable[[int], None]] = None,
+    bandwidth: Optional[TokenBucket] = None,
+) -> bytearray:
+    """Скачивание небольшого файла в память.
+
+    Буфер выделяется заранее по `Content-Length`, части ответа копируются в
+    него без промежуточных склеек. Скачивание не продолжается с места
+    остановки: файл небольшой, и повтор скачивает его заново.
+
+    Args:
+        http: Общий HTTP клиент.
+        url: Адрес файла.
+        max_size: Максимальный размер файла в байтах.
+        on_progress: Вызывается с количеством байт после каждой части.
+        bandwidth: Общее ограничение скорости скачивания в байтах в
+            секунду.
+
+    Returns:
+        Содержимое файла.
+
+    Raises:
+        ArchiveTooLargeError: Файл больше `max_size`.
+        aiohttp.ClientPayloadError: Файл скачан не полностью.
+    """
+    async with http.get(url, RequestKind.TRANSFER) as response:
+        response.raise_for_status()
+        length = response.content_length
+        if length is not None and length > max_size:
+            raise ArchiveTooLargeError(
+                "Размер %d больше %d" % (length, max_size)
+            )
+        buffer = bytearray(length if length is not None else max_size)
+        view = memoryview(buffer)
+        received = 0
+        while True:
+            content = await response.content.readany()
+            if not content:
+                break
+            if received + len(content) > len(buffer):
+                raise ArchiveTooLargeError("Размер больше %d" % len(buffer))
+            view[received : received + len(content)] = content
+            received += len(content)
+            if on_progress is not None:
+                on_progress(len(content))
+            if bandwidth is not None:
+                await bandwidth.acquire(len(content))
+        view.release()
+
+    if length is None:
+        del buffer[received:]
+    elif received != length:
+        raise aiohttp.ClientPayloadError(
+            "Скачано %d байт из %d" % (received, length)
+        )
+    return buffer
+
+
+def remaining_size(path: str, version: str) -> Optional[int]:
+    """Количество байт, которые осталось скачать по недокачанному архиву.
+
+    Args:
+        path: Путь, по которому будет лежать скачанный файл.
+        version: Версия файла.
+
+    Returns:
+        Количество байт или None, если недокачанного архива этой версии нет
+        или его размер неизвестен.
+    """
+    record = _load_record(path + RECORD_SUFFIX)
+    part_path = path + PARTIAL_SUFFIX
+    if (
+        record is None
+        or record.version != version
+        or record.expected_length is None
+        or not os.path.exists(part_path)
+    ):
+        return None
+    if record.segments is not None:
+        written = sum(segment[2] for segment in record.segments)
+    else:
+        written = os.path.getsize(part_path)
+    return max(0, record.expected_length - written)
+
+
+def _abandon(extractor: Optional[StreamingExtractor], reason: str) -> None:
+    if extractor is not None:
+        extractor.abandon(reason)
+
+
+def _can_resume(
+    record: PartialDownload, part_path: str, url: str, version: str
+) -> bool:
+    """Можно ли продолжить скачивание с уже скачанной части.
+
+    Без `ETag` и `Last-Modified` нельзя проверить, что файл на сервере не
+    изменился, поэтому продолжать можно только скачивание с того же адреса.
+    """
+    if not os.path.exists(part_path):
+        return False
+    if record.version != version:
+        return False
+    return record.validator is not None or record.url == url
+
+
+def _can_preallocate(response: aiohttp.ClientResponse) -> bool:
+    """Можно ли выделить файл заранее и продолжать его скачивание по Range."""
+    if response.status != 200:
+        return False
+    if response.headers.get("Accept-Ranges", "").lower() != "bytes":
+        return False
+    return bool(response.content_length)
+
+
+def _can_split(
+    response: aiohttp.ClientResponse, segments: int, min_size: int
+) -> bool:
+    """Можно ли скачивать файл по частям."""
+    if segments < 2 or not _can_preallocate(response):
+        return False
+    return (response.content_length or 0) >= max(min_size, segments)
+
+
+def _split(length: int, segments: int) -> List[List[int]]:
+    """Разбиение файла на части примерно одинакового размера."""
+    step = length // segments
+    bounds = [index * step for index in range(segments)] + [length]
+    return [
+        [bounds[index], bounds[index + 1] - 1, 0] for index in range(segments)
+    ]
+
+
+def _starts_at(response: aiohttp.ClientResponse, offset: int) -> bool:
+    content_range = response.headers.get("Content-Range", "")
+    return content_range.startswith("bytes %d-" % offset)
+
+
+def _complete(part_path: str, record_path: str, path: str) -> None:
+    os.replace(part_path, path)
+    if os.path.exists(record_path):
+        os.remove(record_path)
+
+
+def _discard(part_path: str, record_path: str) -> None:
+    for discarded_path in (part_path, record_path):
+        if os.path.exists(discarded_path):
+            os.remove(discarded_path)
+
+
+def _load_record(record_path: str) -> Optional[PartialDownload]:
+    if not os.path.exists(record_path):
+        return None
+    try:
+        with open(record_path) as record_file:
+            return PartialDownload(**json.load(record_file))
+    except (ValueError, TypeError):
+        return None
+
+
+def _dump_record(record: PartialDownload, record_path: str) -> None:
+    with open(record_path, "w") as record_file:
+        json.dump(asdict(record), record_file)
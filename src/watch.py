@@ -0,0 +1,260 @@
+import asyncio
+import json
+import os
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from .cache import ModCache
+from .config import (
+    WATCH_CHECK_FRACTION,
+    WATCH_CONFIG_POLL_INTERVAL,
+    WATCH_MAX_CHECK_INTERVAL,
+    WATCH_MIN_CHECK_INTERVAL,
+    WATCH_STATUS_PATH,
+)
+from .downloader import Downloader
+from .game_cfg import find_config_files, get_configs
+from .logging import console
+from .metadata import LAST_UPDATE_FORMAT
+from .session import DownloadSession
+
+
+def check_interval(cached: Optional[ModCache], now: float) -> float:
+    """Интервал, через который мод нужно проверить на обновления снова.
+
+    Ожидаемый интервал между обновлениями - среднее интервалов между
+    прошлыми обновлениями мода и времени с последнего обновления. Мод
+    проверяется через `WATCH_CHECK_FRACTION` этого интервала, в границах
+    `WATCH_MIN_CHECK_INTERVAL` и `WATCH_MAX_CHECK_INTERVAL`.
+
+    Args:
+        cached: Данные мода из кеша конфигурации или None, если мод ещё не
+            установлен.
+        now: Текущее время, unix time.
+
+    Returns:
+        Интервал в секундах.
+    """
+    if cached is None:
+        return WATCH_MIN_CHECK_INTERVAL
+    dates = cached.get("update_history", [cached["last_update_date"]])
+    try:
+        timestamps = sorted(_parse_update_date(date) for date in dates)
+    except ValueError:
+        return WATCH_MIN_CHECK_INTERVAL
+    intervals = [
+        later - earlier for earlier, later in zip(timestamps, timestamps[1:])
+    ]
+    intervals.append(max(0, now - timestamps[-1]))
+    expected = sum(intervals) / len(intervals)
+    return max(
+        WATCH_MIN_CHECK_INTERVAL,
+        min(WATCH_MAX_CHECK_INTERVAL, expected * WATCH_CHECK_FRACTION),
+    )
+
+
+class Watcher:
+    """Режим наблюдения: установка обновлений модов по мере их выхода.
+
+    Цикл событий и общие ресурсы живут всё время работы. Каждый мод
+    проверяется по своему расписанию (`check_interval`), поэтому часто
+    обновляемые моды проверяются чаще редко обновляемых. Изменённые файлы
+    конфигураций перечитываются, и все моды изменённой конфигурации
+    проверяются сразу. Состояние записывается в `status_path`.
+    """
+
+    def __init__(
+        self,
+        session: DownloadSession,
+        configs_dir: str = "configs/",
+        names: Optional[List[str]] = None,
+        status_path: Union[str, os.PathLike] = WATCH_STATUS_PATH,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        """Создание наблюдателя.
+
+        Args:
+            session: Открытые общие ресурсы.
+            configs_dir: Папка конфигов.
+            names: Названия наблюдаемых конфигураций. None - все.
+            status_path: Файл состояния.
+            clock: Часы, unix time.
+        """
+        self._session = session
+        self._configs_dir = configs_dir
+        self._names = names
+        self._status_path = status_path
+        self._clock = clock
+        self._started_at = clock()
+        self._downloaders: Dict[str, Downloader] = {}
+        self._mtimes: Dict[str, float] = {}
+        #: Время следующей проверки по конфигурациям и ID модов.
+        self._due: Dict[str, Dict[int, float]] = {}
+        self._last_runs: Dict[str, float] = {}
+        self._last_error: Optional[str] = None
+        #: Количество проверок модов.
+        self.cycles = 0
+
+    async def run(self) -> None:
+        """Наблюдение до отмены."""
+        console.print(
+            "Режим наблюдения. Состояние: [cyan]%s" % self._status_path,
+            style="info",
+        )
+        while True:
+            delay = await self.run_once()
+            await asyncio.sleep(min(delay, WATCH_CONFIG_POLL_INTERVAL))
+
+    async def run_once(self) -> float:
+        """Один проход наблюдения.
+
+        Перечитываются изменённые конфигурации и проверяются моды, которым
+        пришло время проверки.
+
+        Returns:
+            Время в секундах до следующей проверки какого-либо мода.
+        """
+        self._reload_configs()
+        now = self._clock()
+        runs = []
+        for name, due in self._due.items():
+            mod_ids = [
+                mod_id for mod_id, due_at in due.items() if due_at <= now
+            ]
+            if mod_ids:
+                runs.append(self._check(name, mod_ids))
+        if runs:
+            self.cycles += 1
+            self._session.clear_flights()
+            # Каждый проход - отдельный запуск со своим запасом повторов
+            self._session.retry.reset()
+            await asyncio.gather(*runs)
+            self._session.archive_store.release()
+            self._session.metadata_cache.dump()
+            self._session.archive_store.dump()
+        self._dump_status()
+        return max(0, self._next_due() - self._clock())
+
+    def _reload_configs(self) -> None:
+        files = find_config_files(self._configs_dir)
+        if self._names is not None:
+            files = {
+                name: path
+                for name, path in files.items()
+                if name in self._names
+            }
+        for name in list(self._downloaders):
+            if name not in files:
+                console.print(
+                    "Конфиг [cyan]%s[/cyan] удалён" % name, style="warning"
+                )
+                self._forget(name)
+
+        for name, path in files.items():
+            try:
+                mtime = os.stat(path).st_mtime
+            except OSError:
+                continue
+            if self._mtimes.get(name) == mtime:
+                continue
+            self._mtimes[name] = mtime
+            configs = get_configs(self._configs_dir, [name])
+            if not configs:
+                # Неверный конфиг: остаётся прежняя версия, если она была
+                continue
+            if name in self._downloaders:
+                console.print(
+                    "Конфиг [cyan]%s[/cyan] изменён" % name, style="info"
+                )
+            downloader = Downloader(configs[0], self._session)
+            self._downloaders[name] = downloader
+            now = self._clock()
+            self._due[name] = {mod_id: now for mod_id in configs[0].mods}
+
+    def _forget(self, name: str) -> None:
+        self._downloaders.pop(name, None)
+        self._mtimes.pop(name, None)
+        self._due.pop(name, None)
+        self._last_runs.pop(name, None)
+
+    async def _check(self, name: str, mod_ids: List[int]) -> None:
+        downloader = self._downloaders[name]
+        try:
+            await downloader.run(mod_ids)
+        except Exception as err:
+            self._last_error = "%s: %s" % (name, err)
+            console.print(
+                "Произошла ошибка при проверке [cyan]%s[/cyan]. %s"
+                % (name, err),
+                style="error",
+            )
+        now = self._clock()
+        self._last_runs[name] = now
+        due = self._due.get(name)
+        if due is None or self._downloaders.get(name) is not downloader:
+            return
+        for mod_id in mod_ids:
+            due[mod_id] = now + check_interval(
+                downloader.cache.get(mod_id), now
+            )
+
+    def _next_due(self) -> float:
+        due_times = [
+            due_at for due in self._due.values() for due_at in due.values()
+        ]
+        if not due_times:
+            return self._clock() + WATCH_CONFIG_POLL_INTERVAL
+        return min(due_times)
+
+    def _dump_status(self) -> None:
+        now = self._clock()
+        configs: Dict[str, Dict[str, Any]] = {}
+        for name, due in self._due.items():
+            configs[name] = {
+                "mods": len(due),
+                "due": sum(1 for due_at in due.values() if due_at <= now),
+                "next_check_at": min(due.values(), default=None),
+                "last_run_at": self._last_runs.get(name),
+            }
+        status = {
+            "pid": os.getpid(),
+            "started_at": self._started_at,
+            "updated_at": now,
+            "cycles": self.cycles,
+            "retries": self._session.retry.retries,
+            "download_limit": self._session.download_limiter.limit,
+            "last_error": self._last_error,
+            "configs": configs,
+        }
+        os.makedirs(os.path.dirname(self._status_path) or ".", exist_ok=True)
+        tmp_path = str(self._status_path) + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as status_file:
+            json.dump(status, status_file, indent=4, sort_keys=True)
+        os.replace(tmp_path, self._status_path)
+
+
+async def watch_configs(
+    configs_dir: str = "configs/",
+    names: Optional[List[str]] = None,
+    force_refresh: bool = False,
+    verify: bool = False,
+    prune: bool = False,
+) -> None:
+    """Запуск режима наблюдения с общими ресурсами до отмены.
+
+    Args:
+        configs_dir: Папка конфигов.
+        names: Названия наблюдаемых конфигураций. None - все.
+        force_refresh: Запрашивать информацию о модах, не используя кеш.
+        verify: Проверять файлы установленных модов.
+        prune: Удалять лишние папки модов.
+    """
+    session = DownloadSession(force_refresh, verify, prune)
+    async with session:
+        await Watcher(session, configs_dir, names).run()
+
+
+def _parse_update_date(date: str) -> float:
+    parsed = datetime.strptime(date, LAST_UPDATE_FORMAT)
+    return parsed.replace(tzinfo=timezone.utc).timestamp()
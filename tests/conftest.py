@@ -0,0 +1,32 @@
+from contextlib import asynccontextmanager
+from typing import AsyncContextManager, AsyncIterator, Callable
+
+import pytest
+from aiohttp import web
+
+Serve = Callable[..., AsyncContextManager[str]]
+
+
+@asynccontextmanager
+async def _serve(*routes: web.RouteDef) -> AsyncIterator[str]:
+    app = web.Application()
+    app.add_routes(routes)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    try:
+        yield "http://127.0.0.1:%d" % runner.addresses[0][1]
+    finally:
+        await runner.cleanup()
+
+
+@pytest.fixture
+def serve() -> Serve:
+    """Локальный сервер на свободном порту вместо настоящих серверов.
+
+    `async with serve(web.get("/path", handler)) as url:` запускает сервер
+    с заданными маршрутами на время блока. Внутри `url` - адрес сервера
+    без завершающего `/`.
+    """
+    return _serve
@@ -0,0 +1,99 @@
+import os
+
+from src.archive_store import ArchiveStore
+
+
+def _make_file(path, size):
+    with open(path, "wb") as file:
+        file.write(os.urandom(size))
+    return str(path)
+
+
+def test_added_archive_is_found(tmp_path):
+    store = ArchiveStore(tmp_path / "store", max_size=1024)
+    downloaded = _make_file(tmp_path / "mod.zip", 100)
+
+    stored = store.add(1, "01.01.2021 / 10:00", downloaded)
+    assert not os.path.exists(downloaded)
+    assert store.find(1, "01.01.2021 / 10:00") == stored
+    assert store.find(1, "02.01.2021 / 10:00") is None
+
+    # Индекс записывается один раз и переживает перезапуск
+    assert not os.path.exists(tmp_path / "store" / "index.json")
+    store.dump()
+    reopened = ArchiveStore(tmp_path / "store", max_size=1024)
+    assert reopened.find(1, "01.01.2021 / 10:00") == stored
+
+
+def test_least_recently_used_archives_are_evicted(tmp_path):
+    store = ArchiveStore(tmp_path / "store", max_size=250)
+    first = store.add(1, "v1", _make_file(tmp_path / "1.zip", 100))
+    second = store.add(2, "v1", _make_file(tmp_path / "2.zip", 100))
+    store.release()
+    store.find(1, "v1")
+    store.release()
+
+    store.add(3, "v1", _make_file(tmp_path / "3.zip", 100))
+    assert store.find(1, "v1") == first
+    assert store.find(2, "v1") is None
+    assert not os.path.exists(second)
+
+
+def test_archives_in_use_are_not_evicted(tmp_path):
+    store = ArchiveStore(tmp_path / "store", max_size=250)
+    store.add(1, "v1", _make_file(tmp_path / "1.zip", 100))
+    store.release()
+    found = store.find(1, "v1")
+    store.add(2, "v1", _make_file(tmp_path / "2.zip", 100))
+
+    # Найденный архив ещё распаковывается
+    store.add(3, "v1", _make_file(tmp_path / "3.zip", 100))
+    assert found is not None and os.path.exists(found)
+
+    store.release()
+    assert not os.path.exists(found)
+    assert store.find(1, "v1") is None
+    assert store.find(2, "v1") is not None
+
+
+def test_missing_archive_is_forgotten(tmp_path):
+    store = ArchiveStore(tmp_path / "store", max_size=250)
+    first = store.add(1, "v1", _make_file(tmp_path / "1.zip", 100))
+    store.add(2, "v1", _make_file(tmp_path / "2.zip", 100))
+    store.release()
+    os.remove(first)
+
+    assert store.find(1, "v1") is None
+    # Размер удалённого архива не учитывается
+    store.add(3, "v1", _make_file(tmp_path / "3.zip", 100))
+    assert store.find(2, "v1") is not None
+    store.dump()
+    reopened = ArchiveStore(tmp_path / "store", max_size=250)
+    assert reopened.find(1, "v1") is None
+
+
+def test_archive_data_larger_than_store_is_not_stored(tmp_path):
+    store = ArchiveStore(tmp_path / "store", max_size=250)
+    archive_path = str(tmp_path / "1.zip")
+
+    assert store.add_data(1, "v1", os.urandom(300), archive_path) == (
+        archive_path
+    )
+    assert os.path.getsize(archive_path) == 300
+    assert store.find(1, "v1") is None
+    stored = store.add_data(2, "v1", os.urandom(100), str(tmp_path / "2.zip"))
+    assert store.find(2, "v1") == stored
+
+
+def test_install_of_same_version_is_found(tmp_path):
+    store = ArchiveStore(tmp_path / "store")
+    first_path = tmp_path / "first"
+    first_path.mkdir()
+    manifest_path = _make_file(tmp_path / "1.json", 2)
+    store.add_install(1, "v1", str(first_path), manifest_path)
+
+    install = store.find_install(1, "v1", str(tmp_path / "second"))
+    assert install is not None
+    assert install["path"] == str(first_path)
+    assert store.find_install(1, "v1", str(first_path)) is None
+    assert store.find_install(1, "v2", str(tmp_path / "second")) is None
@@ -0,0 +1,35 @@
+import asyncio
+
+from src.archive_writer import WRITE_ALIGNMENT, ArchiveWriter
+
+PAYLOAD = bytes(range(256)) * 1024
+
+
+def test_writes_are_coalesced_into_aligned_blocks(tmp_path, monkeypatch):
+    path = str(tmp_path / "mod.zip")
+    (tmp_path / "mod.zip").write_bytes(b"x" * 100)
+    blocks = []
+    write_block = ArchiveWriter._write_block
+
+    def recording_write_block(writer, block):
+        blocks.append((writer.flushed, len(block)))
+        write_block(writer, block)
+
+    monkeypatch.setattr(ArchiveWriter, "_write_block", recording_write_block)
+
+    async def write():
+        writer = ArchiveWriter(
+            path, 100, truncate=True, buffer_size=WRITE_ALIGNMENT
+        )
+        async with writer:
+            for start in range(0, len(PAYLOAD), 1000):
+                await writer.write(PAYLOAD[start : start + 1000])
+            assert writer.position == 100 + len(PAYLOAD)
+        return writer.flushed
+
+    assert asyncio.run(write()) == 100 + len(PAYLOAD)
+    assert len(blocks) < len(PAYLOAD) // WRITE_ALIGNMENT + 2
+    # Все блоки, кроме последнего, заканчиваются на границе выравнивания
+    for offset, size in blocks[:-1]:
+        assert (offset + size) % WRITE_ALIGNMENT == 0
+    assert (tmp_path / "mod.zip").read_bytes() == b"x" * 100 + PAYLOAD
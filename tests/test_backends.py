@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+from src.backends import BackendError, BackendPool, DownloadBackend
+
+
+class FakeBackend(DownloadBackend):
+    def __init__(self, name, delay, fail=False):
+        super().__init__(name)
+        self.delay = delay
+        self.fail = fail
+        self.started = 0
+        self.cancelled = 0
+
+    async def prepare(self, mod_id, app_id):
+        self.started += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.fail:
+            raise BackendError("недоступен")
+        return "%s/%d" % (self.name, mod_id)
+
+
+def _prepare(pool, mod_id=1):
+    return asyncio.run(pool.prepare(mod_id, None))
+
+
+def test_fastest_healthy_backend_is_chosen():
+    slow = FakeBackend("slow", 0.05)
+    fast = FakeBackend("fast", 0.01)
+    slow.latency, fast.latency = 5.0, 1.0
+    pool = BackendPool([slow, fast])
+    backend, url = _prepare(pool)
+    assert backend is fast
+    assert url == "fast/1"
+    assert slow.started == 0
+    assert fast.prepared == 1
+
+
+def test_slow_backend_is_hedged_and_loser_cancelled():
+    stuck = FakeBackend("stuck", 10)
+    spare = FakeBackend("spare", 0.01)
+    spare.latency = 1.0
+    for _ in range(5):
+        stuck.record_success(0.05)
+    pool = BackendPool([stuck, spare])
+    backend, _ = _prepare(pool)
+    assert backend is spare
+    assert stuck.cancelled == 1
+    assert stuck.failures == 0
+    assert pool.hedges == 1
+
+
+def test_failed_backend_fails_over_and_loses_health():
+    broken = FakeBackend("broken", 0, fail=True)
+    working = FakeBackend("working", 0.01)
+    pool = BackendPool([broken, working])
+    for mod_id in range(4):
+        backend, _ = _prepare(pool, mod_id)
+        assert backend is working
+    assert broken.started == 1
+    assert broken.health < 1
+
+    working.fail = True
+    with pytest.raises(BackendError):
+        _prepare(pool)
@@ -1,7 +1,59 @@
-from src.cache import load_cache
+import shutil
+
+from src.cache import MIGRATED_SUFFIX, ModCacheStore, load_cache
 
 
 def test_load_cache():
     assert load_cache("tests/cache.json") == {
         2266952591: {"last_update_date": "24.04.2021 / 08:50"}
     }
+
+
+def test_store_migrates_json_cache(tmp_path):
+    legacy_path = tmp_path / "civ6.json"
+    shutil.copy("tests/cache.json", legacy_path)
+    store = ModCacheStore(tmp_path / "mods.sqlite3")
+
+    expected = {2266952591: {"last_update_date": "24.04.2021 / 08:50"}}
+    assert store.load("civ6", legacy_path) == expected
+    assert not legacy_path.exists()
+    assert (tmp_path / ("civ6.json" + MIGRATED_SUFFIX)).exists()
+    # Повторно кеш берётся из базы
+    assert store.load("civ6", legacy_path) == expected
+    store.close()
+
+
+def test_store_commits_each_mod(tmp_path):
+    path = tmp_path / "mods.sqlite3"
+    store = ModCacheStore(path)
+    assert store.load("civ6") == {}
+    entry = {
+        "last_update_date": "25.04.2021 / 10:00",
+        "update_history": ["24.04.2021 / 08:50", "25.04.2021 / 10:00"],
+    }
+    store.put("civ6", 1, entry)
+    store.put("civ6", 2, {"last_update_date": "01.01.2021 / 00:00"})
+    store.put("civ6", 2, {"last_update_date": "02.01.2021 / 00:00"})
+
+    # Записанное видно из другого соединения без закрытия первого
+    other = ModCacheStore(path)
+    assert other.load("civ6") == {
+        1: entry,
+        2: {"last_update_date": "02.01.2021 / 00:00"},
+    }
+    assert other.load("civ5") == {}
+    other.close()
+    store.close()
+
+
+def test_store_skips_corrupted_json_cache(tmp_path):
+    legacy_path = tmp_path / "civ6.json"
+    legacy_path.write_text('{"2266952591": {"last_update_da')
+    store = ModCacheStore(tmp_path / "mods.sqlite3")
+
+    assert store.load("civ6", legacy_path) == {}
+    store.put("civ6", 1, {"last_update_date": "01.01.2021 / 00:00"})
+    assert store.load("civ6", legacy_path) == {
+        1: {"last_update_date": "01.01.2021 / 00:00"}
+    }
+    store.close()
@@ -0,0 +1,29 @@
+import asyncio
+import os
+
+from benchmarks.end_to_end import Scenario, run_scenario
+
+
+def test_downloader_installs_mods_from_stand_in(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.mkdir(".temp")
+    # Архивы больше ARCHIVE_IN_MEMORY_MAX_SIZE скачиваются на диск
+    result = asyncio.run(run_scenario(Scenario(3, 2 * 1024 * 1024)))
+    assert result.requests["/api/download/transmit"] == 3
+    assert result.retries == 0
+    folders = sorted(os.listdir("mods"))
+    assert [folder.split("_")[0] for folder in folders] == [
+        "1000000",
+        "1000001",
+        "1000002",
+    ]
+    for folder in folders:
+        assert os.path.exists(os.path.join("mods", folder, "Mod.modinfo"))
+
+
+def test_downloader_retries_stand_in_errors(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.mkdir(".temp")
+    result = asyncio.run(run_scenario(Scenario(20, 16 * 1024, error_rate=0.2)))
+    assert result.retries > 0
+    assert len(os.listdir("mods")) == 20
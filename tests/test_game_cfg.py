@@ -0,0 +1,21 @@
+from src.game_cfg import find_config_names, get_configs
+
+
+def _write_configs(path):
+    (path / "civ6.yml").write_text(
+        "download_path: mods\nmods:\n  - 873246701\n"
+    )
+    (path / "broken.yaml").write_text("download_path: [")
+    (path / "example.yml").write_text("")
+    (path / "notes.txt").write_text("")
+
+
+def test_find_config_names_does_not_parse(tmp_path):
+    _write_configs(tmp_path)
+    assert find_config_names(str(tmp_path)) == ["broken", "civ6"]
+
+
+def test_only_requested_configs_are_parsed(tmp_path):
+    _write_configs(tmp_path)
+    configs = get_configs(str(tmp_path), ["civ6", "missing"])
+    assert [(cfg.name, cfg.mods) for cfg in configs] == [("civ6", {873246701})]
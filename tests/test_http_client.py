@@ -0,0 +1,27 @@
+import asyncio
+
+from aiohttp import web
+
+from src.http_client import HttpClient, RequestKind
+
+
+async def _hello(request: web.Request) -> web.Response:
+    return web.Response(text="hello")
+
+
+async def _fetch_many(serve, count: int) -> HttpClient:
+    client = HttpClient()
+    async with serve(web.get("/", _hello)) as url:
+        async with client:
+            for _ in range(count):
+                async with client.get(
+                    url + "/", RequestKind.METADATA
+                ) as response:
+                    assert await response.text() == "hello"
+    return client
+
+
+def test_connections_are_reused(serve):
+    client = asyncio.run(_fetch_many(serve, 5))
+    assert client.connections_created == 1
+    assert client.connections_reused == 4
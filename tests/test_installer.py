@@ -0,0 +1,156 @@
+import os
+from zipfile import ZIP_DEFLATED, ZipFile
+
+from src import installer
+from src.installer import (
+    install_mod,
+    link_mod_tree,
+    load_manifest,
+    verify_install,
+)
+
+OLD_TIME_NS = 1_000_000_000_000_000_000
+
+
+def _make_archive(path, files):
+    with ZipFile(path, "w", ZIP_DEFLATED) as archive:
+        for name, content in files.items():
+            archive.writestr(name, content)
+    return str(path)
+
+
+def test_only_changed_files_are_written(tmp_path):
+    mod_path = str(tmp_path / "mod")
+    manifest_path = str(tmp_path / "manifests" / "1.json")
+    v1 = _make_archive(
+        tmp_path / "v1.zip",
+        {
+            "Mod.modinfo": b"<Mod/>",
+            "Scripts/unchanged.lua": b"print(1)",
+            "Scripts/changed.lua": b"print(2)",
+            "Scripts/Old/removed.lua": b"print(3)",
+        },
+    )
+    install_mod(v1, mod_path, manifest_path)
+
+    for name in ("Mod.modinfo", "Scripts/unchanged.lua"):
+        os.utime(os.path.join(mod_path, name), ns=(OLD_TIME_NS, OLD_TIME_NS))
+    with open(os.path.join(mod_path, "user.txt"), "w") as user_file:
+        user_file.write("не из архива")
+
+    v2 = _make_archive(
+        tmp_path / "v2.zip",
+        {
+            "Mod.modinfo": b"<Mod/>",
+            "Scripts/unchanged.lua": b"print(1)",
+            "Scripts/changed.lua": b"print(22)",
+            "Scripts/added.lua": b"print(4)",
+        },
+    )
+    install_mod(v2, mod_path, manifest_path)
+
+    for name in ("Mod.modinfo", "Scripts/unchanged.lua"):
+        assert os.stat(os.path.join(mod_path, name)).st_mtime_ns == OLD_TIME_NS
+    with open(os.path.join(mod_path, "Scripts/changed.lua"), "rb") as changed:
+        assert changed.read() == b"print(22)"
+    assert os.path.exists(os.path.join(mod_path, "Scripts/added.lua"))
+    assert not os.path.exists(os.path.join(mod_path, "Scripts/Old"))
+    assert os.path.exists(os.path.join(mod_path, "user.txt"))
+    assert set(load_manifest(manifest_path)) == {
+        "Mod.modinfo",
+        "Scripts/unchanged.lua",
+        "Scripts/changed.lua",
+        "Scripts/added.lua",
+    }
+
+
+def test_existing_files_without_manifest_are_compared_by_crc(tmp_path):
+    mod_path = tmp_path / "mod"
+    mod_path.mkdir()
+    (mod_path / "same.lua").write_bytes(b"print(1)")
+    (mod_path / "other.lua").write_bytes(b"print(0)")
+    for name in ("same.lua", "other.lua"):
+        os.utime(mod_path / name, ns=(OLD_TIME_NS, OLD_TIME_NS))
+
+    archive = _make_archive(
+        tmp_path / "v1.zip", {"same.lua": b"print(1)", "other.lua": b"print(2)"}
+    )
+    install_mod(archive, str(mod_path), str(tmp_path / "1.json"))
+
+    assert os.stat(mod_path / "same.lua").st_mtime_ns == OLD_TIME_NS
+    assert (mod_path / "other.lua").read_bytes() == b"print(2)"
+
+
+def test_same_version_is_linked_from_other_install(tmp_path):
+    archive = _make_archive(
+        tmp_path / "mod.zip",
+        {"Mod.modinfo": b"<Mod/>", "Scripts/main.lua": b"print(1)"},
+    )
+    first_path = str(tmp_path / "first" / "mod")
+    first_manifest = str(tmp_path / "manifests" / "first" / "1.json")
+    install_mod(archive, first_path, first_manifest)
+
+    second_path = str(tmp_path / "second" / "mod")
+    second_manifest = str(tmp_path / "manifests" / "second" / "1.json")
+    assert link_mod_tree(
+        first_path, first_manifest, second_path, second_manifest
+    )
+    for name in ("Mod.modinfo", "Scripts/main.lua"):
+        assert os.path.samefile(
+            os.path.join(first_path, name), os.path.join(second_path, name)
+        )
+    assert load_manifest(second_manifest) == load_manifest(first_manifest)
+
+    # Обновление одной папки не меняет файлы в другой
+    update = _make_archive(
+        tmp_path / "update.zip",
+        {"Mod.modinfo": b"<Mod/>", "Scripts/main.lua": b"print(2)"},
+    )
+    install_mod(update, second_path, second_manifest)
+    with open(os.path.join(first_path, "Scripts/main.lua"), "rb") as script:
+        assert script.read() == b"print(1)"
+
+
+def test_verify_rehashes_only_changed_files(tmp_path, monkeypatch):
+    mod_path = tmp_path / "mod"
+    manifest_path = str(tmp_path / "manifests" / "1.json")
+    archive = _make_archive(
+        tmp_path / "mod.zip",
+        {
+            "Mod.modinfo": b"<Mod/>",
+            "Scripts/main.lua": b"print(1)",
+            "Scripts/other.lua": b"print(2)",
+            "Scripts/touched.lua": b"print(3)",
+        },
+    )
+    install_mod(archive, str(mod_path), manifest_path)
+    hashed = []
+    file_crc = installer.file_crc
+
+    def counting_crc(path):
+        hashed.append(os.path.relpath(path, mod_path).replace(os.sep, "/"))
+        return file_crc(path)
+
+    monkeypatch.setattr(installer, "file_crc", counting_crc)
+    assert verify_install(str(mod_path), manifest_path) == []
+    assert hashed == []
+
+    (mod_path / "Scripts/main.lua").write_bytes(b"print(9)")
+    (mod_path / "Scripts/other.lua").unlink()
+    os.utime(mod_path / "Scripts/touched.lua", ns=(OLD_TIME_NS, OLD_TIME_NS))
+    os.utime(mod_path / "Mod.modinfo", ns=(OLD_TIME_NS, OLD_TIME_NS))
+    damaged = ["Scripts/main.lua", "Scripts/other.lua"]
+    assert verify_install(str(mod_path), manifest_path) == damaged
+    assert sorted(hashed) == [
+        "Mod.modinfo",
+        "Scripts/main.lua",
+        "Scripts/touched.lua",
+    ]
+
+    install_mod(archive, str(mod_path), manifest_path, damaged=damaged)
+    assert (mod_path / "Scripts/main.lua").read_bytes() == b"print(1)"
+    assert (mod_path / "Scripts/other.lua").read_bytes() == b"print(2)"
+    assert os.stat(mod_path / "Mod.modinfo").st_mtime_ns == OLD_TIME_NS
+    hashed.clear()
+    assert verify_install(str(mod_path), manifest_path) == []
+    assert hashed == []
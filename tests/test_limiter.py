@@ -0,0 +1,85 @@
+import asyncio
+
+from src.limiter import AdaptiveLimiter, MemoryBudget
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _limiter(clock, initial=2):
+    return AdaptiveLimiter(
+        "test", initial, minimum=1, maximum=4, window=1, clock=clock
+    )
+
+
+async def _hold_slots(limiter, count):
+    for _ in range(count):
+        await limiter.__aenter__()
+
+
+def test_limit_grows_while_throughput_improves():
+    clock = FakeClock()
+    limiter = _limiter(clock)
+    asyncio.run(_hold_slots(limiter, 2))
+    for throughput in (100, 200, 300):
+        clock.now += 1
+        limiter.record_bytes(throughput)
+    # Не растёт, пока новый слот не занят
+    assert limiter.limit == 3
+
+    asyncio.run(_hold_slots(limiter, 1))
+    for throughput in (400, 500, 600):
+        clock.now += 1
+        limiter.record_bytes(throughput)
+    assert limiter.limit == 4
+
+
+def test_limit_is_cut_on_errors_and_falling_throughput():
+    clock = FakeClock()
+    limiter = _limiter(clock, initial=4)
+    asyncio.run(_hold_slots(limiter, 4))
+    clock.now += 1
+    limiter.record_bytes(1000)
+    clock.now += 1
+    limiter.record_bytes(100)
+    assert limiter.limit == 2
+
+    limiter.record_error()
+    clock.now += 1
+    limiter.record_bytes(100)
+    assert limiter.limit == 1
+
+
+def test_waiters_get_slots_when_limit_grows():
+    async def scenario():
+        clock = FakeClock()
+        limiter = _limiter(clock, initial=1)
+        await limiter.__aenter__()
+        waiter = asyncio.create_task(limiter.__aenter__())
+        await asyncio.sleep(0)
+        assert not waiter.done()
+
+        clock.now += 1
+        limiter.record_bytes(100)
+        clock.now += 1
+        limiter.record_bytes(1000)
+        await asyncio.wait_for(waiter, 1)
+        assert limiter.limit == 2
+
+    asyncio.run(scenario())
+
+
+def test_memory_budget_refuses_instead_of_waiting():
+    budget = MemoryBudget(100)
+    assert budget.try_reserve(60)
+    assert not budget.try_reserve(50)
+    assert budget.try_reserve(40)
+    budget.release(60)
+    assert budget.try_reserve(50)
+    assert budget.used == 90
+    assert budget.refusals == 1
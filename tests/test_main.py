@@ -0,0 +1,35 @@
+import subprocess  # noqa: S404
+import sys
+from pathlib import Path
+
+import main
+
+ROOT = Path(__file__).parent.parent
+
+
+def test_watch_rejects_unknown_configs(tmp_path, monkeypatch):
+    (tmp_path / "civ6.yml").write_text("download_path: mods\nmods: []\n")
+    watched = []
+    monkeypatch.setattr(main, "watch_mods", watched.append)
+
+    argv = ["--watch", "--no-version-check", "--configs-dir", str(tmp_path)]
+    assert main.main([*argv, "civ6", "missing"]) == 1
+    assert watched == []
+    assert main.main([*argv, "--verify", "--prune", "civ6"]) == 0
+    assert watched[0].verify and watched[0].prune
+
+
+def test_rich_is_imported_on_first_output():
+    completed = subprocess.run(  # noqa: S603
+        [
+            sys.executable,
+            "-c",
+            "import sys, main; print('rich' in sys.modules); "
+            "main.console.print('ok'); print('rich' in sys.modules)",
+        ],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert completed.stdout.split() == ["False", "ok", "True"]
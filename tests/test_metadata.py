@@ -0,0 +1,114 @@
+import asyncio
+from pathlib import Path
+
+from aiohttp import web
+from src.http_client import HttpClient
+from src.metadata import (
+    BulkMetadataBackend,
+    ModDetails,
+    PageMetadataBackend,
+    is_same_update,
+)
+from src.metadata_cache import MetadataCache
+
+PAGE = Path(__file__).parent / "fixtures" / "mod_pages" / "939149009.html"
+
+
+class MetadataHandlers:
+    """Метод GetPublishedFileDetails и страницы модов локального сервера."""
+
+    def __init__(self, known_ids):
+        self.known_ids = known_ids
+        self.bulk_requests = []
+        self.page_requests = []
+
+    async def bulk(self, request: web.Request) -> web.Response:
+        data = await request.post()
+        mod_ids = [
+            int(data["publishedfileids[%d]" % index])
+            for index in range(int(data["itemcount"]))
+        ]
+        self.bulk_requests.append(mod_ids)
+        details = []
+        for mod_id in mod_ids:
+            if mod_id not in self.known_ids:
+                details.append({"publishedfileid": str(mod_id), "result": 9})
+                continue
+            details.append(
+                {
+                    "publishedfileid": str(mod_id),
+                    "result": 1,
+                    "title": "Mod %d" % mod_id,
+                    "file_size": str(mod_id * 10),
+                    "time_updated": 1619254200,
+                }
+            )
+        return web.json_response(
+            {
+                "response": {
+                    "result": 1,
+                    "resultcount": len(details),
+                    "publishedfiledetails": details,
+                }
+            }
+        )
+
+    async def page(self, request: web.Request) -> web.Response:
+        self.page_requests.append(int(request.match_info["mod_id"]))
+        return web.Response(
+            text=PAGE.read_text(encoding="utf-8"), content_type="text/html"
+        )
+
+
+async def _fetch(serve, server, cache, mod_ids, batch_size):
+    routes = (
+        web.post("/details", server.bulk),
+        web.get("/view/{mod_id}", server.page),
+    )
+    async with serve(*routes) as base_url:
+        async with HttpClient() as http:
+            backend = BulkMetadataBackend(
+                http,
+                cache,
+                fallback=PageMetadataBackend(
+                    http, cache, page_url=base_url + "/view/{}"
+                ),
+                url=base_url + "/details",
+                batch_size=batch_size,
+            )
+            return await backend.fetch(mod_ids)
+
+
+def test_bulk_metadata_with_page_fallback(tmp_path, serve):
+    server = MetadataHandlers(known_ids=set(range(1, 6)))
+    cache = MetadataCache(tmp_path / "metadata.json")
+    details = asyncio.run(_fetch(serve, server, cache, [1, 2, 3, 4, 5, 6], 4))
+
+    assert server.bulk_requests == [[1, 2, 3, 4], [5, 6]]
+    assert server.page_requests == [6]
+    assert details[1] == ModDetails(
+        "Mod 1", "24.04.2021 / 08:50", 10, time_updated=1619254200
+    )
+    assert details[6] == ModDetails(
+        "Sukritact's Simple UI Adjustments", "24.06.2021 / 19:39"
+    )
+    assert cache.misses == 6
+    assert cache.get(5)["file_size"] == 50
+
+
+def test_same_update_across_backends():
+    bulk = ("24.04.2021 / 08:50", 1619254200)
+    assert is_same_update(*bulk, "24.04.2021 / 11:50", None)
+    assert not is_same_update(*bulk, "24.04.2021 / 11:51", None)
+    assert is_same_update("24.04.2021 / 11:50", None, *bulk)
+    # Обновление, вышедшее позже на целое количество часов или четвертей
+    # часа, - новое обновление
+    assert not is_same_update(*bulk, "24.04.2021 / 12:50", None)
+    assert not is_same_update(*bulk, "24.04.2021 / 13:50", None)
+    assert not is_same_update(*bulk, "24.04.2021 / 12:35", None)
+    assert not is_same_update(*bulk, "24.04.2021 / 05:50", None)
+    assert not is_same_update(*bulk, "25.04.2021 / 08:50", 1619340600)
+    # Обе даты со страниц модов сравниваются как есть
+    assert not is_same_update(
+        "24.04.2021 / 08:50", None, "24.04.2021 / 11:50", None
+    )
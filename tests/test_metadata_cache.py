@@ -0,0 +1,40 @@
+import json
+
+from src.metadata_cache import MetadataCache
+
+
+def test_fresh_entry_is_used(tmp_path):
+    path = tmp_path / "metadata.json"
+    cache = MetadataCache(path, ttl=60)
+    assert cache.get(1) is None
+    cache.put(1, "Mod", "24.04.2021 / 08:50", '"abc"', None)
+    cache.dump()
+
+    reopened = MetadataCache(path, ttl=60)
+    entry = reopened.get(1)
+    assert entry is not None
+    assert entry["name"] == "Mod"
+    assert entry["last_update_date"] == "24.04.2021 / 08:50"
+    assert (reopened.hits, reopened.misses) == (1, 0)
+
+
+def test_stale_entry_is_revalidated(tmp_path):
+    cache = MetadataCache(tmp_path / "metadata.json", ttl=60)
+    cache.put(1, "Mod", "24.04.2021 / 08:50", '"abc"', "Sat, 24 Apr 2021")
+    cache.dump()
+
+    stale = MetadataCache(tmp_path / "metadata.json", ttl=-1)
+    assert stale.get(1) is None
+    assert stale.validators(1) == {
+        "If-None-Match": '"abc"',
+        "If-Modified-Since": "Sat, 24 Apr 2021",
+    }
+    assert stale.validators(2) == {}
+    assert stale.revalidate(1)["name"] == "Mod"
+    assert stale.revalidations == 1
+
+
+def test_invalid_cache_is_ignored(tmp_path):
+    path = tmp_path / "metadata.json"
+    path.write_text(json.dumps({"1": {"name": "Mod"}}))
+    assert MetadataCache(path).get(1) is None
@@ -1,4 +1,12 @@
-from src.downloader import ModInfo
+import asyncio
+import os
+import threading
+
+from src import downloader as downloader_module
+from src.cache import ModCacheStore
+from src.downloader import Downloader, ModInfo
+from src.game_cfg import GameConfig
+from src.session import DownloadSession
 
 
 def test_mod_info_filename():
@@ -20,3 +28,130 @@ def test_mod_info_filename():
     assert (
         mod_info3.filename == "1431485535_fast_dynamic_timer_update_3.5"
     )
+
+
+def test_renamed_mod_folder_is_moved_and_stale_folders_pruned(
+    tmp_path, monkeypatch
+):
+    monkeypatch.chdir(tmp_path)
+    mods_path = tmp_path / "mods"
+    old_folder = mods_path / "1431485535_fast_dynamic_timer"
+    stale_folder = mods_path / "1431485535_fast_dynamic_timer_beta"
+    for folder in (old_folder, stale_folder):
+        folder.mkdir(parents=True)
+    (old_folder / "Mod.modinfo").write_text("<Mod/>")
+    os.utime(stale_folder, (1, 1))
+    (mods_path / "other").mkdir()
+
+    session = DownloadSession(prune=True)
+    session.mod_cache.put(
+        "civ6", 1431485535, {"last_update_date": "24.04.2021 / 08:50"}
+    )
+    config = GameConfig(str(mods_path), {1431485535}, "civ6")
+    downloader = Downloader(config, session)
+    mod = ModInfo(
+        "Fast Dynamic Timer (Update 3.5)",
+        1431485535,
+        last_update_date="24.04.2021 / 08:50",
+    )
+    downloader._adopt_installed_folder(mod)
+    session.mod_cache.close()
+
+    assert sorted(os.listdir(mods_path)) == [mod.filename, "other"]
+    assert (mods_path / mod.filename / "Mod.modinfo").exists()
+    assert downloader._mod_has_to_be_redownloaded(mod) == (
+        False,
+        "Нет обновлений",
+    )
+
+
+def test_page_cached_mod_is_not_redownloaded_after_switching_backends(
+    tmp_path, monkeypatch
+):
+    monkeypatch.chdir(tmp_path)
+    mods_path = tmp_path / "mods"
+    session = DownloadSession()
+    # Дата со страницы мода записана в часовом поясе сайта (UTC+3)
+    session.mod_cache.put(
+        "civ6", 1431485535, {"last_update_date": "24.04.2021 / 11:50"}
+    )
+    config = GameConfig(str(mods_path), {1431485535}, "civ6")
+    downloader = Downloader(config, session)
+    # GetPublishedFileDetails отдаёт то же обновление в UTC
+    mod = ModInfo(
+        "Fast Dynamic Timer",
+        1431485535,
+        last_update_date="24.04.2021 / 08:50",
+        time_updated=1619254200,
+    )
+    (mods_path / mod.filename).mkdir(parents=True)
+
+    assert asyncio.run(downloader._check_mod(mod)) is None
+    # Совпадение дат по смещению часового пояса не записывается в кеш
+    assert "time_updated" not in session.mod_cache.load("civ6")[1431485535]
+    # Обновление, вышедшее часом позже, - новое обновление
+    updated = ModInfo(
+        "Fast Dynamic Timer",
+        1431485535,
+        last_update_date="24.04.2021 / 09:50",
+        time_updated=1619254200 + 60 * 60,
+    )
+    assert downloader._mod_has_to_be_redownloaded(updated) == (
+        True,
+        "Вышло новое обновление",
+    )
+    session.mod_cache.close()
+
+
+def _extract(tmp_path):
+    session = DownloadSession()
+    config = GameConfig(str(tmp_path / "mods"), {1431485535}, "civ6")
+    downloader = Downloader(config, session)
+    mod = ModInfo(
+        "Fast Dynamic Timer",
+        1431485535,
+        last_update_date="24.04.2021 / 08:50",
+        archive_path=str(tmp_path / "mod.zip"),
+    )
+
+    async def extract():
+        async with session:
+            return await downloader._extract_mod(mod)
+
+    result = asyncio.run(extract())
+    # Кеш читается из базы заново: сессия закрыла своё соединение
+    mod_cache = ModCacheStore()
+    cache = mod_cache.load("civ6")
+    mod_cache.close()
+    return result, cache
+
+
+def test_failed_extraction_is_not_cached(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+
+    def install_mod(*args):
+        raise OSError("Нет места на диске")
+
+    monkeypatch.setattr(downloader_module, "install_mod", install_mod)
+
+    result, cache = _extract(tmp_path)
+    assert result is None
+    assert cache == {}
+    output = capsys.readouterr().out
+    assert "Произошла ошибка при распаковке" in output
+    assert "Нет места на диске" in output
+
+
+def test_extraction_runs_off_event_loop(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    threads = []
+
+    def install_mod(*args):
+        threads.append(threading.get_ident())
+
+    monkeypatch.setattr(downloader_module, "install_mod", install_mod)
+
+    result, cache = _extract(tmp_path)
+    assert result is not None
+    assert 1431485535 in cache
+    assert threads and threads[0] != threading.get_ident()
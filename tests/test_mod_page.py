@@ -0,0 +1,51 @@
+from pathlib import Path
+
+import pytest
+from src.mod_page import ModPage, parse_mod_page
+
+FIXTURES = Path(__file__).parent / "fixtures" / "mod_pages"
+
+
+def _read_page(name):
+    return (FIXTURES / name).read_text(encoding="utf-8")
+
+
+@pytest.mark.parametrize(
+    "name, expected",
+    [
+        (
+            "939149009.html",
+            ModPage("Sukritact's Simple UI Adjustments", "24.06.2021 / 19:39"),
+        ),
+        (
+            "2115302648.html",
+            ModPage(
+                "CQUI - Community Quick User Interface", "02.07.2021 / 08:15"
+            ),
+        ),
+    ],
+)
+def test_mod_page(name, expected):
+    assert parse_mod_page(_read_page(name)) == expected
+
+
+def test_error_page():
+    with pytest.raises(ValueError, match="was not found"):
+        parse_mod_page(_read_page("error.html"))
+
+
+def test_page_without_update_date():
+    page = '<a href="/" title="Mod">Mod</a><div class="short-story">-</div>'
+    with pytest.raises(ValueError, match="дату последнего обновления"):
+        parse_mod_page(page)
+
+
+def test_similar_attributes_are_skipped():
+    page = (
+        '<a href="/?title=x" data-title="Logo">Logo</a>'
+        "<a class='mod' title='Mod &amp; More'>Mod</a>"
+        '<div class="short-story-header">Update: never</div>'
+        '<div class="box short-story"><div>Posted</div>Update: 01.01.2021'
+        "\n</div>"
+    )
+    assert parse_mod_page(page) == ModPage("Mod & More", "01.01.2021")
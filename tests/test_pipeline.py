@@ -0,0 +1,42 @@
+import asyncio
+
+from src.pipeline import Pipeline
+
+
+async def _run_pipeline(items):
+    events = []
+
+    async def slow_first(item):
+        await asyncio.sleep(0.01 * item)
+        events.append(("first", item))
+        return item
+
+    async def drop_odd(item):
+        events.append(("second", item))
+        return item if item % 2 == 0 else None
+
+    pipeline = Pipeline()
+    pipeline.add_stage("first", slow_first, concurrency=len(items))
+    pipeline.add_stage("second", drop_odd, concurrency=1, queue_size=1)
+    return await pipeline.run(items), events
+
+
+def test_pipeline_streams_items():
+    results, events = asyncio.run(_run_pipeline([1, 2, 3, 4]))
+    assert sorted(results) == [2, 4]
+    # Второй этап получает элементы, не дожидаясь окончания первого
+    assert events.index(("second", 1)) < events.index(("first", 4))
+
+
+def test_pipeline_expands_batches():
+    async def split(batch):
+        return [item for item in batch if item != 3]
+
+    async def double(item):
+        return item * 2
+
+    pipeline = Pipeline()
+    pipeline.add_stage("split", split, concurrency=2, expand=True)
+    pipeline.add_stage("double", double, concurrency=1)
+    results = asyncio.run(pipeline.run([[1, 2], [3, 4], []]))
+    assert sorted(results) == [2, 4, 8]
@@ -0,0 +1,60 @@
+import asyncio
+
+from aiohttp import web
+from src.http_client import HttpClient, RequestKind
+from src.rate_limit import TokenBucket, parse_retry_after
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_bucket_allows_burst_then_spaces_requests():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2, burst=3, clock=clock)
+    assert [bucket.reserve() for _ in range(3)] == [0, 0, 0]
+    assert [bucket.reserve() for _ in range(2)] == [0.5, 1.0]
+
+    clock.now += 10
+    assert bucket.reserve() == 0
+
+
+def test_bucket_pause_delays_requests():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=100, burst=100, clock=clock)
+    bucket.pause(5)
+    assert bucket.reserve() == 5
+    clock.now += 5
+    assert bucket.reserve() == 0
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("7") == 7
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after(None) is None
+
+
+async def _request_after_throttle(serve) -> float:
+    calls = []
+
+    async def handler(request: web.Request) -> web.Response:
+        calls.append(asyncio.get_running_loop().time())
+        if len(calls) == 1:
+            return web.Response(status=429, headers={"Retry-After": "1"})
+        return web.Response(text="ok")
+
+    async with serve(web.get("/", handler)) as url:
+        async with HttpClient() as client:
+            for _ in range(2):
+                async with client.get(url + "/", RequestKind.API) as response:
+                    await response.read()
+    return calls[1] - calls[0]
+
+
+def test_retry_after_pauses_host(serve):
+    assert asyncio.run(_request_after_throttle(serve)) >= 0.9
@@ -0,0 +1,49 @@
+import asyncio
+
+import aiohttp
+import pytest
+from src.backends import UnsupportedModError
+from src.retry import RetryBudget
+
+
+class FlakyStep:
+    def __init__(self, failures, error=aiohttp.ServerDisconnectedError):
+        self.failures = failures
+        self.error = error
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise self.error()
+        return "done"
+
+
+def test_failed_step_is_retried():
+    retry = RetryBudget(budget=10, attempts=4, base_delay=0)
+    step = FlakyStep(failures=2)
+    assert asyncio.run(retry.run("test", step)) == "done"
+    assert step.calls == 3
+    assert retry.retries == 2
+    assert retry.remaining == 8
+
+
+def test_budget_limits_retries_across_steps():
+    retry = RetryBudget(budget=3, attempts=10, base_delay=0)
+    first = FlakyStep(failures=2)
+    asyncio.run(retry.run("test", first))
+
+    second = FlakyStep(failures=5)
+    with pytest.raises(aiohttp.ServerDisconnectedError):
+        asyncio.run(retry.run("test", second))
+    assert second.calls == 2
+    assert retry.remaining == 0
+
+
+def test_permanent_errors_are_not_retried():
+    retry = RetryBudget(budget=10, attempts=4, base_delay=0)
+    step = FlakyStep(failures=1, error=UnsupportedModError)
+    with pytest.raises(UnsupportedModError):
+        asyncio.run(retry.run("test", step))
+    assert step.calls == 1
+    assert retry.retries == 0
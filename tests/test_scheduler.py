@@ -0,0 +1,48 @@
+import asyncio
+
+import pytest
+from src.limiter import AdaptiveLimiter
+from src.scheduler import DownloadScheduler, Job
+
+
+async def _start_order(policy, jobs):
+    scheduler = DownloadScheduler(policy)
+    for job in jobs:
+        if job.size is not None:
+            scheduler.observe(job.size)
+    limiter = AdaptiveLimiter("test", 1, 1, 1, scheduler=scheduler)
+    order = []
+
+    async def download(job):
+        async with limiter.slot(job):
+            order.append(job)
+            await asyncio.sleep(0)
+
+    async with limiter:
+        tasks = [asyncio.create_task(download(job)) for job in jobs]
+        await asyncio.sleep(0)
+    await asyncio.gather(*tasks)
+    return order
+
+
+def test_sjf_starts_smallest_first():
+    jobs = [Job(600), Job(None), Job(100), Job(200)]
+    order = asyncio.run(_start_order("sjf", jobs))
+    # Неизвестный размер оценивается средним известных
+    assert order == [Job(100), Job(200), Job(None), Job(600)]
+
+
+def test_fifo_keeps_arrival_order():
+    jobs = [Job(300), Job(100), Job(200)]
+    assert asyncio.run(_start_order("fifo", jobs)) == jobs
+
+
+def test_fair_alternates_groups():
+    jobs = [Job(10, "a"), Job(20, "a"), Job(30, "a"), Job(100, "b")]
+    order = asyncio.run(_start_order("fair", jobs))
+    assert order == [Job(10, "a"), Job(100, "b"), Job(20, "a"), Job(30, "a")]
+
+
+def test_unknown_policy():
+    with pytest.raises(ValueError):
+        DownloadScheduler("random")
@@ -0,0 +1,49 @@
+import asyncio
+
+import pytest
+from src.session import DownloadSession
+
+
+async def _fetch_concurrently(session, key, step, count):
+    return await asyncio.gather(
+        *[session.single_flight(key, step) for _ in range(count)],
+        return_exceptions=True,
+    )
+
+
+def test_single_flight_runs_step_once():
+    session = DownloadSession()
+    calls = []
+
+    async def step():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "archive.zip"
+
+    results = asyncio.run(
+        _fetch_concurrently(session, ("скачивание", 1, "v1"), step, 3)
+    )
+    assert results == ["archive.zip"] * 3
+    assert len(calls) == 1
+    assert session.shared_flights == 2
+
+
+def test_single_flight_keys_by_version_and_shares_errors():
+    session = DownloadSession()
+    calls = []
+
+    async def step():
+        calls.append(1)
+        raise RuntimeError("нет связи")
+
+    async def run():
+        first = await _fetch_concurrently(
+            session, ("скачивание", 1, "v1"), step, 2
+        )
+        with pytest.raises(RuntimeError):
+            await session.single_flight(("скачивание", 1, "v2"), step)
+        return first
+
+    first = asyncio.run(run())
+    assert all(isinstance(result, RuntimeError) for result in first)
+    assert len(calls) == 2
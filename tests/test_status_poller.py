@@ -0,0 +1,75 @@
+import asyncio
+import json
+from collections import Counter
+
+import aiohttp
+import pytest
+from aiohttp import web
+
+from src.http_client import HttpClient
+from src.status_poller import StatusPoller
+
+
+async def _wait_all(serve, uuids, polls_until_prepared, failures=0):
+    polls: Counter = Counter()
+    batches = []
+
+    async def status(request: web.Request) -> web.Response:
+        requested = json.loads(await request.text())["uuids"]
+        batches.append(requested)
+        if len(batches) <= failures:
+            return web.Response(status=500)
+        response = {}
+        for uuid in requested:
+            polls[uuid] += 1
+            prepared = polls[uuid] >= polls_until_prepared
+            response[uuid] = {"status": "prepared" if prepared else "queued"}
+        return web.json_response(response)
+
+    async with serve(web.post("/status", status)) as url:
+        async with HttpClient() as http:
+            async with StatusPoller(http, url + "/status") as poller:
+                await asyncio.gather(*[poller.wait_prepared(u) for u in uuids])
+    return batches
+
+
+def test_statuses_are_batched(serve):
+    uuids = ["uuid-%d" % index for index in range(50)]
+    batches = asyncio.run(_wait_all(serve, uuids, polls_until_prepared=2))
+    assert len(batches) == 2
+    assert sorted(batches[0]) == sorted(uuids)
+
+
+def test_failed_poll_is_retried(serve):
+    uuids = ["uuid-%d" % index for index in range(5)]
+    batches = asyncio.run(
+        _wait_all(serve, uuids, polls_until_prepared=1, failures=1)
+    )
+    assert len(batches) == 2
+    assert sorted(batches[1]) == sorted(uuids)
+
+
+def test_waiters_fail_after_repeated_poll_errors(serve):
+    with pytest.raises(aiohttp.ClientResponseError):
+        asyncio.run(
+            _wait_all(serve, ["uuid"], polls_until_prepared=1, failures=100)
+        )
+
+
+def test_cancelled_waiter_does_not_drop_shared_request(serve):
+    async def status(request: web.Request) -> web.Response:
+        requested = json.loads(await request.text())["uuids"]
+        return web.json_response({u: {"status": "prepared"} for u in requested})
+
+    async def wait_after_cancel():
+        async with serve(web.post("/status", status)) as url:
+            async with HttpClient() as http:
+                async with StatusPoller(http, url + "/status") as poller:
+                    cancelled = asyncio.create_task(poller.wait_prepared("u"))
+                    waiting = asyncio.create_task(poller.wait_prepared("u"))
+                    await asyncio.sleep(0)
+                    cancelled.cancel()
+                    await asyncio.wait_for(waiting, 5)
+                    return cancelled.cancelled()
+
+    assert asyncio.run(wait_after_cancel())
@@ -0,0 +1,69 @@
+import io
+import os
+from zipfile import ZIP_DEFLATED, ZIP_STORED, ZipFile
+
+from src.stream_unzip import StreamingExtractor
+
+FILES = {
+    "Mod.modinfo": b"<Mod/>" * 100,
+    "Scripts/main.lua": bytes(range(256)) * 50,
+    "Scripts/empty.lua": b"",
+}
+
+
+def _make_archive(compression):
+    buffer = io.BytesIO()
+    with ZipFile(buffer, "w", compression) as archive:
+        archive.writestr("Scripts/", b"")
+        for name, content in FILES.items():
+            archive.writestr(name, content)
+    return buffer.getvalue()
+
+
+def _feed(extractor, data, chunk_size=1000):
+    for start in range(0, len(data), chunk_size):
+        extractor.feed(data[start : start + chunk_size])
+    return extractor.finish()
+
+
+def _read_tree(path):
+    tree = {}
+    for root, _dirs, files in os.walk(path):
+        for filename in files:
+            full_path = os.path.join(root, filename)
+            with open(full_path, "rb") as member:
+                tree[os.path.relpath(full_path, path)] = member.read()
+    return tree
+
+
+def test_streaming_extraction(tmp_path):
+    for compression in (ZIP_STORED, ZIP_DEFLATED):
+        to_path = str(tmp_path / str(compression))
+        extractor = StreamingExtractor(to_path)
+        assert _feed(extractor, _make_archive(compression))
+        assert _read_tree(to_path) == {
+            os.path.normpath(name): content for name, content in FILES.items()
+        }
+
+
+class _Unseekable(io.RawIOBase):
+    def __init__(self):
+        self.data = bytearray()
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.data += data
+        return len(data)
+
+
+def test_data_descriptor_falls_back(tmp_path):
+    stream = _Unseekable()
+    with ZipFile(stream, "w", ZIP_DEFLATED) as archive:
+        archive.writestr("Mod.modinfo", FILES["Mod.modinfo"])
+    to_path = str(tmp_path / "staging")
+    extractor = StreamingExtractor(to_path)
+    assert not _feed(extractor, bytes(stream.data))
+    assert extractor.abandoned
+    assert not os.path.exists(to_path)
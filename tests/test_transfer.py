@@ -0,0 +1,223 @@
+import asyncio
+import os
+import time
+
+import aiohttp
+import pytest
+from aiohttp import web
+from src.http_client import HttpClient
+from src.rate_limit import TokenBucket
+from src.transfer import (
+    PARTIAL_SUFFIX,
+    RECORD_SUFFIX,
+    ArchiveTooLargeError,
+    download_resumable,
+    download_to_memory,
+    remaining_size,
+)
+
+PAYLOAD = bytes(range(256)) * 1024
+
+
+class ArchiveHandler:
+    """Отдача архива, обрывающая соединение на середине первой отдачи."""
+
+    def __init__(
+        self, payload: bytes, etag: str, accept_ranges: bool = False
+    ) -> None:
+        self.payload = payload
+        self.etag = etag
+        self.accept_ranges = accept_ranges
+        self.drop_next = True
+        self.ranges = []
+
+    async def handle(self, request: web.Request) -> web.StreamResponse:
+        start, end = 0, len(self.payload) - 1
+        range_header = request.headers.get("Range")
+        if_range = request.headers.get("If-Range")
+        if range_header and (if_range is None or if_range == self.etag):
+            first, last = range_header[len("bytes=") :].split("-")
+            start = int(first)
+            end = int(last) if last else end
+        self.ranges.append(start)
+
+        body = self.payload[start : end + 1]
+        headers = {"ETag": self.etag, "Content-Length": str(len(body))}
+        if self.accept_ranges:
+            headers["Accept-Ranges"] = "bytes"
+        status = 200
+        if range_header and len(body) != len(self.payload):
+            status = 206
+            headers["Content-Range"] = "bytes %d-%d/%d" % (
+                start,
+                end,
+                len(self.payload),
+            )
+        response = web.StreamResponse(status=status, headers=headers)
+        await response.prepare(request)
+        if self.drop_next:
+            self.drop_next = False
+            await response.write(body[: len(body) // 2])
+            # Даём клиенту прочитать отправленное до обрыва соединения
+            await asyncio.sleep(0.2)
+            request.transport.close()
+            return response
+        await response.write(body)
+        await response.write_eof()
+        return response
+
+
+async def _download(serve, server, path, attempts, segments=1, bandwidth=None):
+    async with serve(web.get("/archive.zip", server.handle)) as url:
+        async with HttpClient() as http:
+            await download_resumable(
+                http,
+                url + "/archive.zip",
+                path,
+                "v1",
+                attempts=attempts,
+                segments=segments,
+                min_segmented_size=1024,
+                bandwidth=bandwidth,
+            )
+
+
+def test_resume_after_dropped_connection(tmp_path, serve):
+    path = str(tmp_path / "mod.zip")
+    server = ArchiveHandler(PAYLOAD, '"v1"')
+
+    with pytest.raises(aiohttp.ClientError):
+        asyncio.run(_download(serve, server, path, attempts=1))
+    assert os.path.exists(path + PARTIAL_SUFFIX)
+    assert os.path.exists(path + RECORD_SUFFIX)
+    partial_size = os.path.getsize(path + PARTIAL_SUFFIX)
+    assert 0 < partial_size < len(PAYLOAD)
+    assert remaining_size(path, "v1") == len(PAYLOAD) - partial_size
+    assert remaining_size(path, "v2") is None
+
+    # Новый запуск продолжает скачивание с места остановки
+    asyncio.run(_download(serve, server, path, attempts=1))
+    assert server.ranges == [0, partial_size]
+    with open(path, "rb") as archive:
+        assert archive.read() == PAYLOAD
+    assert not os.path.exists(path + PARTIAL_SUFFIX)
+    assert not os.path.exists(path + RECORD_SUFFIX)
+
+
+def test_changed_file_is_downloaded_again(tmp_path, serve):
+    path = str(tmp_path / "mod.zip")
+    server = ArchiveHandler(PAYLOAD, '"v1"')
+    with pytest.raises(aiohttp.ClientError):
+        asyncio.run(_download(serve, server, path, attempts=1))
+
+    new_payload = PAYLOAD[::-1]
+    server.payload = new_payload
+    server.etag = '"v2"'
+    asyncio.run(_download(serve, server, path, attempts=1))
+    assert server.ranges[-1] == 0
+    with open(path, "rb") as archive:
+        assert archive.read() == new_payload
+
+
+def test_retries_within_one_run(tmp_path, serve):
+    path = str(tmp_path / "mod.zip")
+    server = ArchiveHandler(PAYLOAD, '"v1"')
+    asyncio.run(_download(serve, server, path, attempts=2))
+    assert len(server.ranges) == 2
+    assert server.ranges[1] > 0
+    with open(path, "rb") as archive:
+        assert archive.read() == PAYLOAD
+
+
+def test_segmented_download(tmp_path, serve):
+    path = str(tmp_path / "mod.zip")
+    server = ArchiveHandler(PAYLOAD, '"v1"', accept_ranges=True)
+    server.drop_next = False
+    asyncio.run(_download(serve, server, path, attempts=1, segments=4))
+    assert sorted(server.ranges) == [
+        0,
+        0,
+        len(PAYLOAD) // 4,
+        len(PAYLOAD) // 2,
+        len(PAYLOAD) * 3 // 4,
+    ]
+    with open(path, "rb") as archive:
+        assert archive.read() == PAYLOAD
+
+
+def test_segmented_download_falls_back_without_ranges(tmp_path, serve):
+    path = str(tmp_path / "mod.zip")
+    server = ArchiveHandler(PAYLOAD, '"v1"', accept_ranges=False)
+    server.drop_next = False
+    asyncio.run(_download(serve, server, path, attempts=1, segments=4))
+    assert server.ranges == [0]
+    with open(path, "rb") as archive:
+        assert archive.read() == PAYLOAD
+
+
+def test_segmented_download_resumes_dropped_segment(tmp_path, serve):
+    path = str(tmp_path / "mod.zip")
+    server = ArchiveHandler(PAYLOAD, '"v1"', accept_ranges=True)
+    server.drop_next = False
+    server.handle_original = server.handle
+
+    async def drop_first_segment(request):
+        if request.headers.get("Range") == "bytes=0-%d" % (
+            len(PAYLOAD) // 4 - 1
+        ):
+            server.drop_next = True
+        return await server.handle_original(request)
+
+    server.handle = drop_first_segment
+    asyncio.run(_download(serve, server, path, attempts=2, segments=4))
+    # Оборванная часть докачивается с места остановки
+    assert 0 < server.ranges[-1] < len(PAYLOAD) // 4
+    with open(path, "rb") as archive:
+        assert archive.read() == PAYLOAD
+
+
+def test_preallocated_download_resumes_by_written_bytes(tmp_path, serve):
+    path = str(tmp_path / "mod.zip")
+    server = ArchiveHandler(PAYLOAD, '"v1"', accept_ranges=True)
+
+    with pytest.raises(aiohttp.ClientError):
+        asyncio.run(_download(serve, server, path, attempts=1))
+    # Файл выделен целиком, а скачанная часть хранится в записи
+    assert os.path.getsize(path + PARTIAL_SUFFIX) == len(PAYLOAD)
+    left = remaining_size(path, "v1")
+    assert 0 < left < len(PAYLOAD)
+
+    asyncio.run(_download(serve, server, path, attempts=1))
+    assert server.ranges == [0, len(PAYLOAD) - left]
+    with open(path, "rb") as archive:
+        assert archive.read() == PAYLOAD
+
+
+def test_bandwidth_limit(tmp_path, serve):
+    path = str(tmp_path / "mod.zip")
+    server = ArchiveHandler(PAYLOAD, '"v1"')
+    server.drop_next = False
+    rate = len(PAYLOAD) * 2
+    bandwidth = TokenBucket(rate, len(PAYLOAD) // 4)
+    started_at = time.monotonic()
+    asyncio.run(_download(serve, server, path, attempts=1, bandwidth=bandwidth))
+    # Первая четверть идёт без ожидания, остальное - со скоростью rate
+    assert time.monotonic() - started_at >= 0.35
+    with open(path, "rb") as archive:
+        assert archive.read() == PAYLOAD
+
+
+def test_download_to_memory(serve):
+    server = ArchiveHandler(PAYLOAD, '"v1"')
+    server.drop_next = False
+
+    async def download(max_size):
+        async with serve(web.get("/archive.zip", server.handle)) as url:
+            async with HttpClient() as http:
+                return await download_to_memory(
+                    http, url + "/archive.zip", max_size
+                )
+
+    assert asyncio.run(download(len(PAYLOAD))) == PAYLOAD
+    with pytest.raises(ArchiveTooLargeError):
+        asyncio.run(download(len(PAYLOAD) - 1))
@@ -0,0 +1,143 @@
+import asyncio
+import json
+from datetime import datetime, timezone
+
+from src.config import WATCH_MAX_CHECK_INTERVAL, WATCH_MIN_CHECK_INTERVAL
+from src.downloader import Downloader
+from src.retry import RetryBudget
+from src.metadata import LAST_UPDATE_FORMAT
+from src.session import DownloadSession
+from src.watch import Watcher, check_interval
+
+DAY = 24 * 60 * 60
+NOW = 1700000000.0
+
+
+def _dates(*days_ago):
+    return [
+        datetime.fromtimestamp(NOW - days * DAY, timezone.utc).strftime(
+            LAST_UPDATE_FORMAT
+        )
+        for days in days_ago
+    ]
+
+
+def test_frequently_updated_mods_are_checked_more_often():
+    often = _dates(6, 4, 2, 1)
+    rarely = _dates(300, 200, 100)
+    often_interval = check_interval(
+        {"last_update_date": often[-1], "update_history": often}, NOW
+    )
+    rarely_interval = check_interval(
+        {"last_update_date": rarely[-1], "update_history": rarely}, NOW
+    )
+    assert WATCH_MIN_CHECK_INTERVAL <= often_interval < rarely_interval
+    assert rarely_interval == WATCH_MAX_CHECK_INTERVAL
+    assert check_interval(None, NOW) == WATCH_MIN_CHECK_INTERVAL
+
+
+def test_watcher_reloads_configs_and_writes_status(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    configs_dir = tmp_path / "configs"
+    configs_dir.mkdir()
+    config_path = configs_dir / "civ6.yml"
+    config_path.write_text("download_path: mods\nmods: []\n")
+    status_path = tmp_path / "status.json"
+    watcher = Watcher(DownloadSession(), str(configs_dir), None, status_path)
+
+    asyncio.run(watcher.run_once())
+    status = json.loads(status_path.read_text())
+    assert status["configs"] == {
+        "civ6": {
+            "mods": 0,
+            "due": 0,
+            "next_check_at": None,
+            "last_run_at": None,
+        }
+    }
+
+    config_path.unlink()
+    asyncio.run(watcher.run_once())
+    assert json.loads(status_path.read_text())["configs"] == {}
+
+
+def test_failed_step_is_retried_in_next_watch_cycle(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    configs_dir = tmp_path / "configs"
+    configs_dir.mkdir()
+    (configs_dir / "civ6.yml").write_text("download_path: mods\nmods: [1]\n")
+    session = DownloadSession()
+    calls = []
+    results = []
+
+    async def step():
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("нет связи")
+        return "archive.zip"
+
+    async def run(downloader, mod_ids=None):
+        key = ("скачивание", 1, "v1")
+        results.append(await session.single_flight(key, step))
+
+    monkeypatch.setattr(Downloader, "run", run)
+    now = [NOW]
+    watcher = Watcher(
+        session,
+        str(configs_dir),
+        None,
+        tmp_path / "status.json",
+        clock=lambda: now[0],
+    )
+
+    async def two_cycles():
+        await watcher.run_once()
+        now[0] += WATCH_MAX_CHECK_INTERVAL
+        await watcher.run_once()
+
+    asyncio.run(two_cycles())
+    session.mod_cache.close()
+    assert watcher.cycles == 2
+    assert len(calls) == 2
+    assert results == ["archive.zip"]
+
+
+def test_retry_budget_is_restored_in_next_watch_cycle(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    configs_dir = tmp_path / "configs"
+    configs_dir.mkdir()
+    (configs_dir / "civ6.yml").write_text("download_path: mods\nmods: [1]\n")
+    session = DownloadSession()
+    session.retry = RetryBudget(budget=1, base_delay=0, max_delay=0)
+    results = []
+
+    async def run(downloader, mod_ids=None):
+        calls = []
+
+        async def step():
+            calls.append(1)
+            if len(calls) == 1:
+                raise asyncio.TimeoutError()
+            return "archive.zip"
+
+        results.append(await session.retry.run("Скачивание", step))
+
+    monkeypatch.setattr(Downloader, "run", run)
+    now = [NOW]
+    watcher = Watcher(
+        session,
+        str(configs_dir),
+        None,
+        tmp_path / "status.json",
+        clock=lambda: now[0],
+    )
+
+    async def two_cycles():
+        await watcher.run_once()
+        now[0] += WATCH_MAX_CHECK_INTERVAL
+        await watcher.run_once()
+
+    asyncio.run(two_cycles())
+    session.mod_cache.close()
+    assert results == ["archive.zip", "archive.zip"]
+    assert session.retry.retries == 2
@@ -1,11 +1,12 @@
 import json
 import os
+import threading
+import time
 from functools import lru_cache
-from typing import IO, Any, Dict, Union
+from typing import IO, Any, Dict, Optional, Union
 from zipfile import ZipFile
 
-import requests
-from src.config import VERSION
+from src.config import VERSION, VERSION_CHECK_CACHE_PATH, VERSION_CHECK_TTL
 from src.logging import console
 
 
@@ -27,16 +28,57 @@ def handle_update() -> None:
     )
 
 
-def is_running_latest_version() -> bool:
-    """Проверка на то, установлена ли последняя версия программы."""
-    data = _get_latest_release_data()
-    latest_release_version = _get_release_tag(data)
-    return latest_release_version == VERSION
+def get_cached_latest_version() -> Optional[str]:
+    """Последняя версия программы по результату прошлой проверки.
+
+    Returns:
+        Тег последнего релиза или None, если проверки не было или её
+        результат устарел.
+    """
+    try:
+        with open(VERSION_CHECK_CACHE_PATH, encoding="utf-8") as cache_file:
+            cached = json.load(cache_file)
+        if time.time() - cached["checked_at"] > VERSION_CHECK_TTL:
+            return None
+        return cached["tag"]
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def check_latest_version_in_background() -> threading.Thread:
+    """Проверка последней версии программы в фоновом потоке.
+
+    Результат записывается в кеш и используется при следующем запуске.
+    Поток не задерживает завершение программы, а ошибки проверки
+    игнорируются.
+
+    Returns:
+        Запущенный поток.
+    """
+    thread = threading.Thread(
+        target=_cache_latest_version, name="version-check", daemon=True
+    )
+    thread.start()
+    return thread
+
+
+def _cache_latest_version() -> None:
+    try:
+        tag = _get_release_tag(_get_latest_release_data())
+    except Exception:  # noqa: S110
+        return
+    os.makedirs(os.path.dirname(VERSION_CHECK_CACHE_PATH), exist_ok=True)
+    tmp_path = str(VERSION_CHECK_CACHE_PATH) + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as cache_file:
+        json.dump({"tag": tag, "checked_at": time.time()}, cache_file)
+    os.replace(tmp_path, VERSION_CHECK_CACHE_PATH)
 
 
 @lru_cache(1)
 def _get_latest_release_data() -> Dict[str, Any]:
     """Получение данных о последнем релизе программы с GitHub."""
+    import requests  # noqa: WPS433 - импорт долгий, нужен только здесь
+
     url = "https://api.github.com/repos/Hulvdan/steam-workshop-downloader/releases/latest"  # noqa: E501
     response = requests.get(url)
     response.raise_for_status()
@@ -55,6 +97,8 @@ def _get_release_download_link(release_data: Dict[str, Any]) -> str:
 
 def _download_release_archive(url: str, to_file: IO[bytes]) -> None:
     """Скачивание архива."""
+    import requests  # noqa: WPS433
+
     response = requests.get(url)
     to_file.write(response.content)
 